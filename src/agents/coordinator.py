@@ -8,13 +8,25 @@ Responsibilities:
 - Call Diet Agent to generate + save 7-day meal plan.
 - Call Workout Agent to generate + save weekly workout plan.
 - Print a human-readable summary to the console.
+- Write the same week as a shareable report (report.md / report.html).
+- replan_user(...): the same pipeline for one member of the profile store,
+  writing into a per-user directory (used by batch jobs and watch mode).
 
-This is the main entry point for the CLI demo.
+This is the main entry point for the CLI demo:
+    python -m src.agents.coordinator                       # session_profile.json
+    python -m src.agents.coordinator --watch --db profiles.db --out plans
 """
-from src.agents.grocery_agent import generate_and_save_grocery_list
-
+import argparse
+import os
 from dataclasses import asdict
-from typing import Dict
+from typing import Dict, List, Optional
+
+from src.agents.grocery_agent import (
+    generate_and_save_grocery_list,
+    generate_grocery_list,
+    optimize_basket,
+    save_grocery_list,
+)
 
 from src.core.user_profile import load_profile, UserProfile
 from src.core.calorie_calc import (
@@ -100,17 +112,80 @@ def run_from_session():
     print(f"Workouts per week: {workout['days_per_week']}")
     print()
 
-    print("Done. You can now inspect meal_plan.json and workout_plan.json.")
+    # ----- Grocery Agent: weekly grocery list -----
+    print("=== Grocery List (Week 1) ===")
+    grocery = generate_and_save_grocery_list("meal_plan.json")
+    print(grocery)
+    print()
+
+    # ----- Report Agent: shareable Markdown / HTML report -----
+    # imported here: the report agent imports this module for summarize_profile
+    from src.agents.report_agent import build_report_context, write_reports
+    context = build_report_context(summary, meal_plan, workout, grocery, optimize_basket(grocery))
+    report_paths = write_reports(context, "report")
+    print(f"Saved {' and '.join(report_paths)}")
+    print()
+
+    print("Done. You can now inspect meal_plan.json, workout_plan.json and report.html.")
     return {
         "summary": summary,
         "meal_plan": meal_plan,
         "workout_plan": workout,
+        "grocery_list": grocery,
     }
-print("\n=== Grocery List (Week 1) ===")
-grocery = generate_and_save_grocery_list("meal_plan.json")
-print(grocery)
 
 
+def member_dir(out_dir: str, user_id: str) -> str:
+    """Per-member output directory, <out_dir>/<user_id> with the id made filesystem-safe."""
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in user_id) or "_"
+    return os.path.join(out_dir, safe)
+
+
+def replan_user(user_id: str, profile: UserProfile, out_dir: str = "plans") -> Dict:
+    """
+    Regenerate one member's meal plan, workout plan and grocery list (no console output).
+    Files go to <out_dir>/<user_id>/{meal_plan,workout_plan,grocery_list}.json.
+    """
+    user_dir = member_dir(out_dir, user_id)
+    os.makedirs(user_dir, exist_ok=True)
+    summary = summarize_profile(profile)
+    meal_plan = generate_and_save_plan(
+        user_profile=profile,
+        calorie_target=summary["calorie_target"],
+        filepath=os.path.join(user_dir, "meal_plan.json")
+    )
+    workout = generate_weekly_workout(goal=profile.goal, days_per_week=4, equipment="gym", week_index=0)
+    save_weekly_workout(workout, os.path.join(user_dir, "workout_plan.json"))
+    grocery = generate_grocery_list(meal_plan)
+    save_grocery_list(grocery, os.path.join(user_dir, "grocery_list.json"), verbose=False)
+    return {
+        "summary": summary,
+        "meal_plan": meal_plan,
+        "workout_plan": workout,
+        "grocery_list": grocery,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="DesiFit coordinator")
+    parser.add_argument("--watch", action="store_true",
+                        help="daemon mode: replan members of the profile store as their profiles change")
+    parser.add_argument("--db", default="profiles.db", help="profile store to watch")
+    parser.add_argument("--out", default="plans", help="output directory for per-user plans")
+    parser.add_argument("--debounce", type=float, default=2.0, help="seconds to wait for edits to settle")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if not args.watch:
+        return run_from_session()
+
+    # imported here: the daemon itself imports this module for replan_user
+    from src.agents.replan_daemon import ReplanDaemon
+    daemon = ReplanDaemon(args.db, args.out, debounce_s=args.debounce,
+                          batch_size=args.batch_size, workers=args.workers)
+    daemon.run()
+
 
 if __name__ == "__main__":
-    run_from_session()
+    main()
@@ -5,17 +5,31 @@ Provides functions to generate a 7-day Indian-aware meal plan using a local stub
 Replace `analyze_recipe_stub` with a real API call (Spoonacular / Edamam) later.
 
 Key functions:
-- generate_day_plan(calorie_target, day_index, preference)
-- generate_week_plan(user_profile, calorie_target)
+- generate_day_plan(calorie_target, day_index, preference, rng, samplers)
+- week_samplers(preference, ratings, exclude)  <- variety-aware pickers (no-repeat window, ratings)
+- generate_week_plan(user_profile, calorie_target, seed=42, week_index=0)
+- iter_plan_days(user_profile, calorie_target, start_day, num_days)  <- lazy, any horizon
+- iter_days_for_preference(preference, calorie_target, ...)  <- same, without a profile
+- meal_calories(calorie_target)  <- per-meal calorie split
+- plan_day(user_profile, calorie_target, day_index)
+- iter_week_plans(user_profile, calorie_target, num_weeks)
 - generate_weekly_plan(...)  <- alias used by tests
 - save_plan(plan, filepath="meal_plan.json")
 - generate_and_save_plan(user_profile, calorie_target, filepath="meal_plan.json")
+- suggest_substitutes(plan, day, meal_type, k=3)
 """
 
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterator, List, Optional
 import random
 import json
+from src.tools.ingredients import REGISTRY
 from src.tools.nutrition_api_stub import analyze_recipe_stub
+from src.tools.plan_index import PlanIndex
+from src.tools.recipe_sampler import VarietySampler
+from src.tools.recipe_similarity import RecipeIndex
+from src.tools.shared_catalog import attached_catalog
 from src.core.user_profile import UserProfile
 
 # ---------- Sample recipes ----------
@@ -56,84 +70,255 @@ MEAL_DISTRIBUTION = {
     "snack_total": 0.14  # 14% for two snacks
 }
 
-# Helper: filter recipes by preference string (very simple)
-def _filter_by_preference(recipes: List[Dict], preference: Optional[str]) -> List[Dict]:
+# Helper: check a single recipe against a preference string (very simple)
+def _matches_preference(recipe: Dict, preference: Optional[str]) -> bool:
     if not preference:
-        return recipes
+        return True
     pref = preference.lower()
     # Example preferences: 'vegetarian', 'non-veg', 'vegan' (we only support veg/non-veg filtering here)
     if "veg" in pref:
-        return [r for r in recipes if "veg" in r.get("tags", [])]
+        return "veg" in recipe.get("tags", [])
     if "non" in pref or "non-veg" in pref or "nonveg" in pref:
-        return [r for r in recipes if "non-veg" in r.get("tags", [])]
-    # fallback: return original list
-    return recipes
+        return "non-veg" in recipe.get("tags", [])
+    # fallback: everything matches
+    return True
+
+# Helper: filter recipes by preference string (very simple)
+def _filter_by_preference(recipes: List[Dict], preference: Optional[str]) -> List[Dict]:
+    if not preference:
+        return recipes
+    return [r for r in recipes if _matches_preference(r, preference)]
 
-def pick_recipe_for(meal_type: str, preference: Optional[str] = None) -> Dict:
-    """Pick a recipe (random) for a meal_type while applying preference filters."""
+# Meals in a day, in the order they are picked: (plan meal type, SAMPLE_RECIPES key)
+DAY_MEAL_SLOTS = [
+    ("breakfast", "breakfast"),
+    ("lunch", "lunch"),
+    ("dinner", "dinner"),
+    ("snack_1", "snack"),
+    ("snack_2", "snack"),
+]
+
+DAYS_PER_WEEK = 7
+
+# Variety: a recipe picked on day d is not offered again for that meal type before
+# day d + NO_REPEAT_DAYS[type] (1 = only "not twice on the same day", e.g. the two snacks),
+# then comes back at half weight for COOLDOWN_DAYS.
+NO_REPEAT_DAYS = {"breakfast": 2, "lunch": 2, "dinner": 2, "snack": 2}
+COOLDOWN_DAYS = 2
+
+# Generic meal used when a meal type has nothing left to pick from.
+FALLBACK_MEAL = {"name": "Simple meal", "ingredients": ["rice", "veg"], "tags": ["veg"]}
+
+def pick_recipe_for(meal_type: str, preference: Optional[str] = None,
+                    rng: Optional[random.Random] = None) -> Dict:
+    """
+    Pick a recipe (random) for a meal_type while applying preference filters.
+    Uses `rng` when given, otherwise the global `random` module.
+    """
     choices = SAMPLE_RECIPES.get(meal_type, [])
     filtered = _filter_by_preference(choices, preference)
     final_choices = filtered if filtered else choices
     if not final_choices:
         # fallback generic meal
-        return {"name": "Simple meal", "ingredients": ["rice", "veg"], "tags": ["veg"]}
-    return random.choice(final_choices)
+        return FALLBACK_MEAL
+    return (rng or random).choice(final_choices)
+
+def meal_calories(calorie_target: float) -> Dict[str, int]:
+    """Split the daily target across meals using MEAL_DISTRIBUTION."""
+    snacks_total = round(calorie_target * MEAL_DISTRIBUTION["snack_total"])
+    snack_each = round(snacks_total / 2)
+    return {
+        "breakfast": round(calorie_target * MEAL_DISTRIBUTION["breakfast"]),
+        "lunch": round(calorie_target * MEAL_DISTRIBUTION["lunch"]),
+        "dinner": round(calorie_target * MEAL_DISTRIBUTION["dinner"]),
+        "snack_1": snack_each,
+        "snack_2": snack_each,
+    }
+
+def _contains_any(recipe: Dict, exclude: FrozenSet[int]) -> bool:
+    return not exclude.isdisjoint(REGISTRY.ids_for(recipe["ingredients"]))
+
+def _recipe_pool(meal_type: str, preference: Optional[str], exclude: FrozenSet[int] = frozenset()) -> List[Dict]:
+    """SAMPLE_RECIPES for a meal type, filtered; read from the shared catalog when this worker has one attached."""
+    catalog = attached_catalog()
+    if catalog is not None and meal_type in catalog.meal_types():
+        choices = list(catalog.recipes(meal_type))  # decode each recipe once for the filters below
+    else:
+        choices = SAMPLE_RECIPES.get(meal_type, [])
+    pool = _filter_by_preference(choices, preference) or choices
+    return [r for r in pool if not _contains_any(r, exclude)] if exclude else pool
+
+def _ratings_key(ratings: Optional[Dict[str, float]]) -> tuple:
+    return tuple(sorted(ratings.items())) if ratings else ()
+
+@lru_cache(maxsize=256)
+def _sampler_template(meal_type: str, preference: Optional[str], ratings_key: tuple,
+                      exclude: FrozenSet[int], window: int, cooldown: int) -> VarietySampler:
+    """Filtered pool + rating weights, built once per (meal type, preference, ratings, exclusions)."""
+    return VarietySampler(_recipe_pool(meal_type, preference, exclude), dict(ratings_key), window, cooldown)
+
+def week_samplers(preference: Optional[str] = None, ratings: Optional[Dict[str, float]] = None,
+                  exclude: FrozenSet[int] = frozenset()) -> Dict[str, VarietySampler]:
+    """
+    Fresh variety samplers, one per SAMPLE_RECIPES meal type (reset() them to start over).
+    `ratings` maps recipe name -> member rating (0-5; 0 = never pick, unrated = 3).
+    Recipes containing an ingredient ID in `exclude` are left out of the pools; a meal
+    type with nothing left to pick (all excluded or rated 0) gets FALLBACK_MEAL
+    (ValueError if that is excluded too).
+    """
+    key = _ratings_key(ratings)
+    samplers = {}
+    for meal_type in SAMPLE_RECIPES:
+        template = _sampler_template(meal_type, preference, key, exclude,
+                                     NO_REPEAT_DAYS.get(meal_type, 1), COOLDOWN_DAYS)
+        if not template.tree.total and _contains_any(FALLBACK_MEAL, exclude):
+            raise ValueError(f"no {meal_type} recipe is left to pick and the fallback meal is excluded")
+        samplers[meal_type] = template.copy()
+    return samplers
+
+def _pick_indices(day_index: int, rng: Optional[random.Random],
+                  samplers: Dict[str, VarietySampler]) -> List[Optional[int]]:
+    """Sampler index picked for each of DAY_MEAL_SLOTS (None: nothing to pick)."""
+    draw = (rng or random).random
+    return [samplers[catalog_type].pick_index(draw(), day_index) if catalog_type in samplers else None
+            for _, catalog_type in DAY_MEAL_SLOTS]
+
+def _recipes_for(indices: List[Optional[int]], samplers: Dict[str, VarietySampler]) -> List[Dict]:
+    return [samplers[catalog_type].recipes[i] if i is not None else FALLBACK_MEAL
+            for (_, catalog_type), i in zip(DAY_MEAL_SLOTS, indices)]
+
+def _pick_day(day_index: int, preference: Optional[str], rng: Optional[random.Random],
+              samplers: Optional[Dict[str, VarietySampler]]) -> List[Dict]:
+    """Recipes for each of DAY_MEAL_SLOTS, in order."""
+    if samplers is None:
+        return [pick_recipe_for(catalog_type, preference, rng) for _, catalog_type in DAY_MEAL_SLOTS]
+    return _recipes_for(_pick_indices(day_index, rng, samplers), samplers)
 
-def generate_day_plan(calorie_target: float, day_index: int = 0, preference: Optional[str] = None) -> Dict:
+def generate_day_plan(calorie_target: float, day_index: int = 0, preference: Optional[str] = None,
+                      rng: Optional[random.Random] = None,
+                      samplers: Optional[Dict[str, VarietySampler]] = None) -> Dict:
     """
     Generate one day's meal plan:
     - Uses MEAL_DISTRIBUTION to split calories to meals/snacks.
     - Uses analyze_recipe_stub(...) to get a nutrition stub per chosen recipe.
-    - Adds a 'calories_targeted' field per meal so downstream code can tune portion sizes.
+    - Adds a 'calories_targeted' field per meal, and 'servings' of the analysed recipe
+      that portion amounts to (what the grocery list and validation count).
+    - Draws from `rng` when given, otherwise from the global `random` module.
+    - With `samplers` (see week_samplers) picks respect the no-repeat window and ratings;
+      pass the same samplers for consecutive days. Without them each pick is independent.
     """
-    day = {"day": day_index + 1, "meals": []}
+    return _day_plan(calorie_target, day_index, _pick_day(day_index, preference, rng, samplers))
 
-    # Compute calories per meal
-    b = round(calorie_target * MEAL_DISTRIBUTION["breakfast"])
-    l = round(calorie_target * MEAL_DISTRIBUTION["lunch"])
-    d = round(calorie_target * MEAL_DISTRIBUTION["dinner"])
-    snacks_total = round(calorie_target * MEAL_DISTRIBUTION["snack_total"])
-    snack_each = round(snacks_total / 2)
+def _day_plan(calorie_target: float, day_index: int, recipes: List[Dict]) -> Dict:
+    day = {"day": day_index + 1, "meals": []}
+    calories = meal_calories(calorie_target)
 
-    # Breakfast
-    rec = pick_recipe_for("breakfast", preference)
-    analysis = analyze_recipe_stub(rec["ingredients"], servings=1)
-    analysis["calories_targeted"] = b
-    day["meals"].append({"type": "breakfast", "recipe": rec, "nutrition": analysis})
-
-    # Lunch
-    rec = pick_recipe_for("lunch", preference)
-    analysis = analyze_recipe_stub(rec["ingredients"], servings=1)
-    analysis["calories_targeted"] = l
-    day["meals"].append({"type": "lunch", "recipe": rec, "nutrition": analysis})
-
-    # Dinner
-    rec = pick_recipe_for("dinner", preference)
-    analysis = analyze_recipe_stub(rec["ingredients"], servings=1)
-    analysis["calories_targeted"] = d
-    day["meals"].append({"type": "dinner", "recipe": rec, "nutrition": analysis})
-
-    # Snack 1
-    rec = pick_recipe_for("snack", preference)
-    analysis = analyze_recipe_stub(rec["ingredients"], servings=1)
-    analysis["calories_targeted"] = snack_each
-    day["meals"].append({"type": "snack_1", "recipe": rec, "nutrition": analysis})
-
-    # Snack 2
-    rec = pick_recipe_for("snack", preference)
-    analysis = analyze_recipe_stub(rec["ingredients"], servings=1)
-    analysis["calories_targeted"] = snack_each
-    day["meals"].append({"type": "snack_2", "recipe": rec, "nutrition": analysis})
+    for (meal_type, _), rec in zip(DAY_MEAL_SLOTS, recipes):
+        analysis = analyze_recipe_stub(rec["ingredients"], servings=1)
+        analysis["calories_targeted"] = calories[meal_type]
+        per_serving = analysis.get("calories_per_serving")
+        servings = round(calories[meal_type] / per_serving, 2) if per_serving else 1
+        day["meals"].append({"type": meal_type, "recipe": rec, "nutrition": analysis, "servings": servings})
 
     return day
 
-def generate_week_plan(user_profile: UserProfile, calorie_target: float, seed: int = 42) -> Dict:
+def _week_rng(seed: int, week_index: int) -> random.Random:
     """
-    Generate a 7-day meal plan for the given user profile and calorie target.
-    - Uses deterministic random seed by default for reproducible outputs (useful for tests).
-    - Returns a dict with metadata and daily plans.
+    Independent RNG per week. Week 0 uses `seed` itself, so the first week matches
+    `random.seed(seed)` + generate_day_plan with one set of week_samplers.
+    """
+    return random.Random(seed if week_index == 0 else f"{seed}:week{week_index}")
+
+# Each week starts from samplers that have replayed the last TAIL_DAYS days of the
+# week before (the longest no-repeat window + cooldown, i.e. everything that still
+# affects a pick), so the window holds across week boundaries. Those tails are
+# cached per (preference, ratings, seed, week), so seeking to a week whose
+# predecessor's tail is known costs one week of picks.
+TAIL_DAYS = min(max(NO_REPEAT_DAYS.values()) + COOLDOWN_DAYS, DAYS_PER_WEEK)
+_WEEK_TAILS: "OrderedDict[tuple, tuple]" = OrderedDict()
+_WEEK_TAILS_MAX = 65536
+
+def _week_picks(plan_key: tuple, week: int, prev_tail: tuple,
+                samplers: Dict[str, VarietySampler]) -> List[List[Optional[int]]]:
+    """Sampler indices for the 7 days of `week`, given the previous week's tail; caches this week's tail."""
+    seed = plan_key[-1]
+    first = week * DAYS_PER_WEEK
+    for sampler in samplers.values():
+        sampler.reset()
+    for day, indices in zip(range(first - len(prev_tail), first), prev_tail):
+        for (_, catalog_type), i in zip(DAY_MEAL_SLOTS, indices):
+            if i is not None:
+                samplers[catalog_type].use(i, day)
+    rng = _week_rng(seed, week)
+    picks = [_pick_indices(day, rng, samplers) for day in range(first, first + DAYS_PER_WEEK)]
+    _WEEK_TAILS[plan_key + (week,)] = tuple(map(tuple, picks[DAYS_PER_WEEK - TAIL_DAYS:]))
+    if len(_WEEK_TAILS) > _WEEK_TAILS_MAX:
+        _WEEK_TAILS.popitem(last=False)
+    return picks
+
+def _tail_before(plan_key: tuple, week: int, samplers: Dict[str, VarietySampler]) -> tuple:
+    """Tail of week - 1, generating (picks only) from the latest cached week before it."""
+    if week == 0:
+        return ()
+    known = week - 1
+    while known >= 0 and plan_key + (known,) not in _WEEK_TAILS:
+        known -= 1
+    tail = _WEEK_TAILS[plan_key + (known,)] if known >= 0 else ()
+    for w in range(known + 1, week):
+        tail = tuple(map(tuple, _week_picks(plan_key, w, tail, samplers)[DAYS_PER_WEEK - TAIL_DAYS:]))
+    _WEEK_TAILS.move_to_end(plan_key + (week - 1,))
+    return tail
+
+def iter_plan_days(user_profile: UserProfile, calorie_target: float, start_day: int = 0,
+                   num_days: Optional[int] = None, seed: int = 42,
+                   ratings: Optional[Dict[str, float]] = None) -> Iterator[Dict]:
     """
-    plan = {
+    Lazily yield day plans starting at `start_day` (0-based, any horizon).
+    - num_days=None yields forever; callers stop when they have enough.
+    - Picks go through week_samplers: no repeats inside the NO_REPEAT_DAYS window
+      (week boundaries included), weighted by `ratings` (recipe name -> 0-5).
+    - Each week draws from its own seeded RNG, starting from the previous week's last
+      TAIL_DAYS of picks. Those are cached, so seeking to a week usually replays only
+      that week's picks (no analysis); the first seek for a new (preference, ratings,
+      seed) also replays the picks of the weeks before it.
+    - Only the current day is held in memory.
+    """
+    return iter_days_for_preference(user_profile.dietary_preferences, calorie_target,
+                                    start_day, num_days, seed, ratings)
+
+def iter_days_for_preference(preference: Optional[str], calorie_target: float, start_day: int = 0,
+                             num_days: Optional[int] = None, seed: int = 42,
+                             ratings: Optional[Dict[str, float]] = None,
+                             exclude: FrozenSet[int] = frozenset()) -> Iterator[Dict]:
+    """
+    iter_plan_days for a bare preference string (e.g. the shared preference of a household);
+    recipes with an ingredient ID in `exclude` are never picked (see week_samplers).
+    """
+    if start_day < 0:
+        raise ValueError("start_day must be >= 0")
+    plan_key = (preference, _ratings_key(ratings), tuple(sorted(exclude)),
+                tuple(sorted(NO_REPEAT_DAYS.items())), COOLDOWN_DAYS, seed)
+    samplers = week_samplers(preference, ratings, exclude)
+    week = start_day // DAYS_PER_WEEK
+    picks = _week_picks(plan_key, week, _tail_before(plan_key, week, samplers), samplers)
+
+    day = start_day
+    while num_days is None or day < start_day + num_days:
+        if day // DAYS_PER_WEEK != week:
+            week = day // DAYS_PER_WEEK
+            tail = tuple(map(tuple, picks[DAYS_PER_WEEK - TAIL_DAYS:]))
+            picks = _week_picks(plan_key, week, tail, samplers)
+        recipes = _recipes_for(picks[day % DAYS_PER_WEEK], samplers)
+        yield _day_plan(calorie_target, day, recipes)
+        day += 1
+
+def plan_day(user_profile: UserProfile, calorie_target: float, day_index: int, seed: int = 42,
+             ratings: Optional[Dict[str, float]] = None) -> Dict:
+    """Return the plan for a single (0-based) day without generating the days before its week."""
+    return next(iter_plan_days(user_profile, calorie_target, day_index, 1, seed, ratings))
+
+def _plan_header(user_profile: UserProfile, calorie_target: float) -> Dict:
+    return {
         "user": {
             "name": user_profile.name,
             "age": user_profile.age,
@@ -142,31 +327,99 @@ def generate_week_plan(user_profile: UserProfile, calorie_target: float, seed: i
         "calorie_target": calorie_target,
         "days": []
     }
-    random.seed(seed)
-    for i in range(7):
-        day_plan = generate_day_plan(calorie_target, i, user_profile.dietary_preferences)
-        plan["days"].append(day_plan)
+
+def generate_week_plan(user_profile: UserProfile, calorie_target: float, seed: int = 42,
+                       week_index: int = 0, ratings: Optional[Dict[str, float]] = None) -> Dict:
+    """
+    Generate a 7-day meal plan for the given user profile and calorie target.
+    - Uses deterministic random seed by default for reproducible outputs (useful for tests).
+    - week_index picks a later week of a longer horizon (days are numbered across weeks).
+    - ratings (recipe name -> 0-5) bias picks towards the member's favourites.
+    - Returns a dict with metadata and daily plans.
+    """
+    plan = _plan_header(user_profile, calorie_target)
+    plan["days"] = list(iter_plan_days(
+        user_profile, calorie_target, week_index * DAYS_PER_WEEK, DAYS_PER_WEEK, seed, ratings
+    ))
     return plan
 
+def iter_week_plans(user_profile: UserProfile, calorie_target: float, num_weeks: int,
+                    start_week: int = 0, seed: int = 42,
+                    ratings: Optional[Dict[str, float]] = None) -> Iterator[Dict]:
+    """Lazily yield week plans (same shape as generate_week_plan) for a multi-week horizon."""
+    for week in range(start_week, start_week + num_weeks):
+        yield generate_week_plan(user_profile, calorie_target, seed, week, ratings)
+
 # Alias expected by tests and external callers.
 # Tests were importing `generate_weekly_plan`, so provide that name to avoid import errors.
 generate_weekly_plan = generate_week_plan
 
-def save_plan(plan: Dict, filepath: str = "meal_plan.json"):
-    """Save the plan as JSON (pretty printed)."""
+def save_plan(plan: Dict, filepath: str = "meal_plan.json",
+              index: Optional[PlanIndex] = None, user_id: Optional[str] = None):
+    """
+    Save the plan as JSON (pretty printed).
+    If a PlanIndex is given, the plan is also (re)indexed under user_id
+    (defaults to the plan's user name). The replan daemon maintains
+    <out>/plan_index.bin for every plan it writes; other callers opt in here.
+    """
     with open(filepath, "w", encoding="utf-8") as f:
         json.dump(plan, f, indent=2)
+    if index is not None:
+        index.add_plan(user_id or plan["user"]["name"], plan)
     return filepath
 
-def generate_and_save_plan(user_profile: UserProfile, calorie_target: float, filepath: str = "meal_plan.json") -> Dict:
+def generate_and_save_plan(user_profile: UserProfile, calorie_target: float, filepath: str = "meal_plan.json",
+                           index: Optional[PlanIndex] = None, user_id: Optional[str] = None) -> Dict:
     """
     Convenience helper: generate week plan and write to disk.
-    Returns the plan dict (and writes file).
+    Returns the plan dict (and writes file, indexing it when `index` is given).
     """
     plan = generate_week_plan(user_profile, calorie_target)
-    save_plan(plan, filepath)
+    save_plan(plan, filepath, index=index, user_id=user_id)
     return plan
 
+# ---------- Meal substitution ----------
+# One similarity index per catalog meal type, built on first use.
+_RECIPE_INDEXES: Dict[str, RecipeIndex] = {}
+
+def _catalog_meal_type(meal_type: str) -> str:
+    """Map plan meal types ('snack_1', 'snack_2') to SAMPLE_RECIPES keys."""
+    return "snack" if meal_type.startswith("snack") else meal_type
+
+def recipe_index_for(meal_type: str) -> RecipeIndex:
+    """
+    Return the (cached) RecipeIndex over SAMPLE_RECIPES for a meal type.
+    In a pool worker attached to a SharedCatalog, the shared (zero-copy) index is used.
+    """
+    key = _catalog_meal_type(meal_type)
+    catalog = attached_catalog()
+    if catalog is not None and key in catalog.meal_types():
+        return catalog.index(key)
+    if key not in _RECIPE_INDEXES:
+        _RECIPE_INDEXES[key] = RecipeIndex(SAMPLE_RECIPES.get(key, []))
+    return _RECIPE_INDEXES[key]
+
+def suggest_substitutes(plan: Dict, day: int, meal_type: str, k: int = 3) -> List[Dict]:
+    """
+    Suggest up to k replacement recipes for one meal in a plan.
+    - day: the 1-based 'day' value stored in the plan.
+    - meal_type: 'breakfast' | 'lunch' | 'dinner' | 'snack_1' | 'snack_2'.
+    Candidates are ranked by nutrient + ingredient similarity and filtered by the
+    plan's dietary preferences. Raises KeyError if the meal is not in the plan.
+    """
+    for d in plan["days"]:
+        if d["day"] != day:
+            continue
+        for meal in d["meals"]:
+            if meal["type"] == meal_type:
+                preference = plan.get("user", {}).get("dietary_preferences")
+                query = dict(meal["recipe"], nutrition=meal.get("nutrition"))
+                matches = recipe_index_for(meal_type).nearest(
+                    query, k=k, allow=lambda r: _matches_preference(r, preference)
+                )
+                return [recipe for _, recipe in matches]
+    raise KeyError(f"No {meal_type} on day {day} in plan")
+
 # If run as a script for quick manual testing:
 if __name__ == "__main__":
     # Minimal demo (requires `session_profile.json` or create a short UserProfile object)
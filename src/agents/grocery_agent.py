@@ -2,38 +2,57 @@
 
 """
 Grocery List Agent for DesiFit.
-Generates a consolidated grocery list from the weekly meal_plan.json file.
+Generates a consolidated grocery list from the weekly meal_plan.json file,
+and turns it into the cheapest basket of packs for a local price table.
 """
 
 import json
-from typing import Dict, List
+from fractions import Fraction
+from math import ceil, gcd, inf, lcm
+from typing import Dict, List, Optional, Sequence, Tuple
 from collections import defaultdict
 
+from src.tools.grocery_prices import PRICE_TABLE, EQUIVALENTS, CURRENCY
+from src.tools.ingredients import REGISTRY, canonical_name
+
 def load_meal_plan(filepath: str = "meal_plan.json") -> Dict:
     """Load the weekly meal plan JSON."""
     with open(filepath, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def generate_grocery_list(meal_plan: Dict) -> Dict[str, int]:
+def count_ingredient_ids(meal_plan: Dict) -> Dict[int, float]:
     """
-    Extract all ingredients from the weekly meal plan
-    and count occurrences (basic approximation).
+    Servings of each ingredient in a meal plan, keyed by canonical ingredient ID.
+    Synonyms ('wheat' / 'whole wheat flour') land on the same ID.
+    Every meal counts its 'servings' of the recipe (the portion for one member,
+    or the household total); meals without the field count as one serving.
     """
-    grocery = defaultdict(int)
+    counts = defaultdict(int)
+    ids_for = REGISTRY.ids_for
 
     for day in meal_plan["days"]:
         for meal in day["meals"]:
-            ingredients = meal["recipe"]["ingredients"]
-            for ingredient in ingredients:
-                grocery[ingredient] += 1
+            servings = meal.get("servings", 1)
+            for iid in ids_for(meal["recipe"]["ingredients"]):
+                counts[iid] += servings
+
+    return counts
 
-    return dict(grocery)
+def generate_grocery_list(meal_plan: Dict) -> Dict[str, float]:
+    """
+    Extract all ingredients from the weekly meal plan
+    and total the servings they are needed for (basic approximation).
+    Keys are canonical ingredient names, so synonyms are merged.
+    """
+    counts = count_ingredient_ids(meal_plan)
+    return {REGISTRY.name(iid): round(counts[iid], 2) for iid in sorted(counts)}
 
-def save_grocery_list(grocery: Dict[str, int], filepath: str = "grocery_list.json"):
+def save_grocery_list(grocery: Dict[str, float], filepath: str = "grocery_list.json", verbose: bool = True):
     """Save grocery list to disk."""
     with open(filepath, "w", encoding="utf-8") as f:
         json.dump(grocery, f, indent=2)
-    print(f"Saved grocery list to {filepath}")
+    if verbose:
+        print(f"Saved grocery list to {filepath}")
 
 def generate_and_save_grocery_list(meal_plan_path="meal_plan.json"):
     """Convenience function to load meal plan and save grocery list."""
@@ -43,6 +62,147 @@ def generate_and_save_grocery_list(meal_plan_path="meal_plan.json"):
     return grocery
 
 
+# ---------- Budget basket ----------
+
+# Finest pack size fraction PackTable accepts (sizes are multiples of 1/this).
+MAX_PACK_DENOMINATOR = 1000
+
+class PackTable:
+    """
+    Cheapest way to cover a quantity with packs of fixed sizes (unbounded knapsack).
+    Quantities are handled in steps of gcd(pack sizes) - for fractional sizes such
+    as 0.5 kg, the gcd of the exact fractions; `_cost[j]` is the cheapest
+    price for exactly j steps. The table is precomputed for a few large packs and
+    extended on demand, so repeated lookups across a cohort are O(largest pack).
+    """
+
+    def __init__(self, packs: Sequence[Tuple[float, float]], horizon_packs: int = 8):
+        if not packs:
+            raise ValueError("PackTable needs at least one pack")
+        exact = []
+        for size, _ in packs:
+            fraction = Fraction(size).limit_denominator(MAX_PACK_DENOMINATOR)
+            if fraction <= 0 or abs(fraction - Fraction(size)) > 1e-9 * fraction:
+                raise ValueError(f"pack size {size!r} is not a positive multiple of 1/{MAX_PACK_DENOMINATOR}")
+            exact.append(fraction)
+        self.sizes = [int(f) if f.denominator == 1 else float(f) for f in exact]
+        self.prices = [float(price) for _, price in packs]
+        # scale to whole numbers of 1/scale units, so the gcd and the steps stay exact integers
+        scale = lcm(*(f.denominator for f in exact))
+        scaled = [int(f * scale) for f in exact]
+        step = gcd(*scaled)
+        self.step = step / scale
+        self.units = [size // step for size in scaled]
+        self._cost = [0.0]
+        self._last = [-1]  # index of the last pack added to reach j steps
+        self._extend(max(self.units) * horizon_packs)
+
+    def _extend(self, upto: int):
+        cost, last = self._cost, self._last
+        for j in range(len(cost), upto + 1):
+            best, best_pack = inf, -1
+            for p, u in enumerate(self.units):
+                if u <= j:
+                    c = cost[j - u] + self.prices[p]
+                    if c < best:
+                        best, best_pack = c, p
+            cost.append(best)
+            last.append(best_pack)
+
+    def cheapest(self, quantity: float) -> Tuple[float, Dict[float, int]]:
+        """Return (cost, {pack size: count}) for the cheapest packs covering `quantity`."""
+        steps = max(0, ceil(quantity / self.step - 1e-9))
+        # an optimal cover never overshoots by a whole largest pack
+        hi = steps + max(self.units) - 1 if steps else 0
+        if hi >= len(self._cost):
+            self._extend(hi)
+        j = min(range(steps, hi + 1), key=self._cost.__getitem__)
+        total = self._cost[j]
+        counts: Dict[float, int] = {}
+        while j > 0:
+            p = self._last[j]
+            counts[self.sizes[p]] = counts.get(self.sizes[p], 0) + 1
+            j -= self.units[p]
+        return round(total, 2), counts
+
+
+class BasketOptimizer:
+    """Turns servings per ingredient (fractional, portion-scaled) into the cheapest set of packs, with optional swaps."""
+
+    def __init__(self, price_table: Optional[Dict] = None, equivalents: Optional[List[List[str]]] = None,
+                 currency: str = CURRENCY):
+        self.price_table = PRICE_TABLE if price_table is None else price_table
+        self.currency = currency
+        self.pack_tables = {name: PackTable(entry["packs"]) for name, entry in self.price_table.items()}
+        self.group_of: Dict[str, Tuple[str, ...]] = {}
+        for group in (EQUIVALENTS if equivalents is None else equivalents):
+            members = tuple(name for name in group if name in self.price_table)
+            for name in members:
+                self.group_of[name] = members
+
+    def _line(self, needed: List[str], quantity: float, options: Sequence[str]) -> Dict:
+        best = None
+        for name in options:
+            cost, counts = self.pack_tables[name].cheapest(quantity)
+            if best is None or cost < best[0]:
+                best = (cost, name, counts)
+        cost, name, counts = best
+        prices = dict(zip(self.pack_tables[name].sizes, self.pack_tables[name].prices))
+        return {
+            "needed": needed,
+            "buy": name,
+            "quantity": round(quantity, 2),
+            "unit": self.price_table[name]["unit"],
+            "packs": [{"size": size, "price": prices[size], "count": n} for size, n in sorted(counts.items())],
+            "cost": cost,
+        }
+
+    def optimize(self, grocery: Dict[str, float], allow_swaps: bool = True) -> Dict:
+        """
+        grocery: ingredient -> servings needed (output of generate_grocery_list);
+        names are canonicalised, so raw synonyms are merged before pricing.
+        Returns basket lines, unpriced ingredients and the total cost.
+        """
+        lines = []
+        unpriced = []
+        merged: Dict[str, float] = defaultdict(float)
+        for name, count in grocery.items():
+            merged[canonical_name(name)] += count
+        grocery = merged
+        grouped: Dict[Tuple[str, ...], List[str]] = defaultdict(list)
+        for name in sorted(grocery):
+            if name not in self.price_table:
+                unpriced.append(name)
+            elif allow_swaps and name in self.group_of:
+                grouped[self.group_of[name]].append(name)
+            else:
+                quantity = grocery[name] * self.price_table[name]["per_serving"]
+                lines.append(self._line([name], quantity, [name]))
+        for members, needed in grouped.items():
+            quantity = sum(grocery[name] * self.price_table[name]["per_serving"] for name in needed)
+            lines.append(self._line(needed, quantity, members))
+        lines.sort(key=lambda line: line["needed"][0])
+        return {
+            "currency": self.currency,
+            "items": lines,
+            "unpriced": unpriced,
+            "total_cost": round(sum(line["cost"] for line in lines), 2),
+        }
+
+
+_DEFAULT_OPTIMIZER: Optional[BasketOptimizer] = None
+
+def optimize_basket(grocery: Dict[str, float], allow_swaps: bool = True,
+                    optimizer: Optional[BasketOptimizer] = None) -> Dict:
+    """Cheapest basket for a grocery list using the local price table (pack tables built once per process)."""
+    global _DEFAULT_OPTIMIZER
+    if optimizer is None:
+        if _DEFAULT_OPTIMIZER is None:
+            _DEFAULT_OPTIMIZER = BasketOptimizer()
+        optimizer = _DEFAULT_OPTIMIZER
+    return optimizer.optimize(grocery, allow_swaps=allow_swaps)
+
+
 # For manual testing
 if __name__ == "__main__":
     generate_and_save_grocery_list()
@@ -0,0 +1,206 @@
+# src/agents/household_agent.py
+"""
+Household planning for DesiFit.
+
+Members who eat together get one plan instead of one plan each:
+- recipes are picked once per meal for the whole household (the same variety
+  sampler as single plans), using a preference every member can eat;
+  recipes with an ingredient any member excludes ("no peanuts") are left out of
+  the pools entirely (an exclusion that names no known ingredient is refused
+  rather than ignored), and member ratings are combined,
+- each pick is analysed once; every member gets a portion (servings) scaled
+  from their own calorie_target_for_goal (via summarize_profile),
+- one grocery list and one basket for the household, weighted by the total
+  servings cooked per meal.
+
+Per-person work is limited to the calorie summary; everything else is done
+once per household.
+
+Key functions:
+- household_preference(profiles)
+- household_exclusions(profiles)  <- ingredient IDs no shared meal may contain
+- generate_household_plan(profiles, seed=42, week_index=0, ratings=None)
+- plan_household(profiles, out_dir=None, ...)  <- plan + grocery list + basket
+
+Usage:
+    python -m src.agents.household_agent --db profiles.db --members u1 u2 u3 --out plans/family
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, FrozenSet, List, Optional, Sequence
+
+from src.agents.coordinator import summarize_profile
+from src.agents.diet_agent import (
+    DAYS_PER_WEEK,
+    SAMPLE_RECIPES,
+    iter_days_for_preference,
+    meal_calories,
+)
+from src.agents.grocery_agent import generate_grocery_list, optimize_basket, save_grocery_list
+from src.core.profile_store import PROFILE_DB, ProfileStore
+from src.core.user_profile import UserProfile
+from src.tools.plan_validation import diet_rules, excluded_ingredients
+from src.tools.recipe_sampler import DEFAULT_RATING
+
+
+def member_names(profiles: Sequence[UserProfile]) -> List[str]:
+    """Unique display key per member (repeated names get ' #2', ' #3', ...)."""
+    seen: Dict[str, int] = {}
+    names = []
+    for profile in profiles:
+        seen[profile.name] = seen.get(profile.name, 0) + 1
+        names.append(profile.name if seen[profile.name] == 1 else f"{profile.name} #{seen[profile.name]}")
+    return names
+
+
+def household_preference(profiles: Sequence[UserProfile]) -> Optional[str]:
+    """
+    The preference shared meals are filtered by: vegetarian if any member is,
+    non-veg only if every member asks for it, otherwise no filter.
+    """
+    prefs = [p.dietary_preferences for p in profiles]
+    if any("non-veg" in diet_rules(pref)[0] for pref in prefs):
+        return "vegetarian"
+    if prefs and all(pref and "non" in pref.lower() for pref in prefs):
+        return "non-veg"
+    return None
+
+
+def household_exclusions(profiles: Sequence[UserProfile]) -> FrozenSet[int]:
+    """
+    Ingredient IDs any member excludes ("no peanuts"); recipes containing them are never picked.
+    Raises ValueError if an exclusion names nothing known ("no tree nuts"): shared meals
+    are not planned around an allergen that cannot be checked.
+    """
+    excluded = set()
+    for profile in profiles:
+        ids, unresolved = excluded_ingredients(profile.dietary_preferences)
+        if unresolved:
+            raise ValueError(f"{profile.name}: cannot resolve excluded ingredient(s) "
+                             f"{', '.join(map(repr, unresolved))}; name the ingredients explicitly")
+        excluded.update(ids)
+    return frozenset(excluded)
+
+
+def household_ratings(profiles: Sequence[UserProfile], names: Sequence[str],
+                      ratings: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, float]:
+    """
+    Recipe name -> shared rating: the mean of the members' ratings (unrated = default),
+    or 0 if any member rated it 0. Excluded ingredients are handled by household_exclusions.
+    """
+    ratings = ratings or {}
+    shared = {}
+    for recipes in SAMPLE_RECIPES.values():
+        for recipe in recipes:
+            name = recipe["name"]
+            scores = [ratings.get(member, {}).get(name, DEFAULT_RATING) for member in names]
+            if min(scores) <= 0:
+                shared[name] = 0.0
+            elif any(score != DEFAULT_RATING for score in scores):
+                shared[name] = sum(scores) / len(scores)
+    return shared
+
+
+def generate_household_plan(profiles: Sequence[UserProfile], seed: int = 42, week_index: int = 0,
+                            ratings: Optional[Dict[str, Dict[str, float]]] = None,
+                            summaries: Optional[List[Dict]] = None) -> Dict:
+    """
+    One 7-day plan for the household. Each meal carries the shared recipe and
+    per-serving nutrition once, its total 'servings', and per-member 'portions'
+    ({member: {"calories_targeted", "servings"}}).
+    ratings: member name -> {recipe name -> 0-5}.
+    """
+    if not profiles:
+        raise ValueError("a household needs at least one member")
+    names = member_names(profiles)
+    summaries = summaries or [summarize_profile(p) for p in profiles]
+    targets = [s["calorie_target"] for s in summaries]
+    splits = [meal_calories(t) for t in targets]  # per member, reused for every day
+    preference = household_preference(profiles)
+
+    plan = {
+        "household": {
+            "members": [
+                {"name": name, "age": p.age, "dietary_preferences": p.dietary_preferences,
+                 "calorie_target": round(target)}
+                for name, p, target in zip(names, profiles, targets)
+            ],
+            "dietary_preferences": preference,
+        },
+        "calorie_target": round(sum(targets)),
+        "days": [],
+    }
+    days = iter_days_for_preference(preference, sum(targets), week_index * DAYS_PER_WEEK, DAYS_PER_WEEK,
+                                    seed, household_ratings(profiles, names, ratings),
+                                    household_exclusions(profiles))
+    for day in days:
+        for meal in day["meals"]:
+            per_serving = meal["nutrition"]["calories_per_serving"]
+            portions = {}
+            for name, split in zip(names, splits):
+                kcal = split[meal["type"]]
+                portions[name] = {"calories_targeted": kcal, "servings": round(kcal / per_serving, 2)}
+            meal["nutrition"]["calories_targeted"] = sum(p["calories_targeted"] for p in portions.values())
+            meal["servings"] = round(sum(p["servings"] for p in portions.values()), 2)
+            meal["portions"] = portions
+        plan["days"].append(day)
+    return plan
+
+
+def plan_household(profiles: Sequence[UserProfile], out_dir: Optional[str] = None, seed: int = 42,
+                   week_index: int = 0, ratings: Optional[Dict[str, Dict[str, float]]] = None,
+                   with_basket: bool = True) -> Dict:
+    """
+    Household plan, one combined grocery list and (optionally) its cheapest basket.
+    With out_dir, writes household_plan.json, grocery_list.json and basket.json there.
+    """
+    summaries = [summarize_profile(p) for p in profiles]
+    plan = generate_household_plan(profiles, seed, week_index, ratings, summaries)
+    grocery = generate_grocery_list(plan)
+    basket = optimize_basket(grocery) if with_basket else None
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, "household_plan.json"), "w", encoding="utf-8") as f:
+            json.dump(plan, f, indent=2)
+        save_grocery_list(grocery, os.path.join(out_dir, "grocery_list.json"), verbose=False)
+        if basket is not None:
+            with open(os.path.join(out_dir, "basket.json"), "w", encoding="utf-8") as f:
+                json.dump(basket, f, indent=2)
+    return {
+        "summaries": summaries,
+        "meal_plan": plan,
+        "grocery_list": grocery,
+        "basket": basket,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Plan one shared week for a DesiFit household.")
+    parser.add_argument("--db", default=PROFILE_DB, help="profile store holding the members")
+    parser.add_argument("--members", nargs="+", required=True, help="user IDs of the household members")
+    parser.add_argument("--out", default="household", help="output directory")
+    parser.add_argument("--week", type=int, default=0, help="0-based week index")
+    parser.add_argument("--no-basket", action="store_true", help="skip basket pricing")
+    args = parser.parse_args(argv)
+
+    with ProfileStore(args.db) as store:
+        profiles = [store.get(user_id) for user_id in args.members]
+    missing = [user_id for user_id, p in zip(args.members, profiles) if p is None]
+    if missing:
+        parser.error(f"unknown user IDs: {', '.join(missing)}")
+
+    try:
+        result = plan_household(profiles, args.out, week_index=args.week, with_basket=not args.no_basket)
+    except ValueError as e:
+        parser.error(str(e))
+    plan = result["meal_plan"]
+    print(f"Planned {len(plan['days'])} days for {len(profiles)} members "
+          f"({plan['household']['dietary_preferences'] or 'no shared diet filter'}) -> {args.out}/")
+    if result["basket"] is not None:
+        print(f"Basket total: {result['basket']['total_cost']} {result['basket']['currency']}")
+
+
+if __name__ == "__main__":
+    main()
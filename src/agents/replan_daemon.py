@@ -0,0 +1,344 @@
+# src/agents/replan_daemon.py
+"""
+Watch-mode daemon: keep every member's plans in step with the profile store.
+
+The daemon polls ProfileStore.changed_since(revision) and queues the user IDs
+that changed. Repeated edits to the same user are coalesced: a user is only
+replanned once no new edit has arrived for `debounce_s` seconds. Due users are
+sent in batches to a process pool, where each worker regenerates the meal
+plan, workout plan and grocery list (coordinator.replan_user) for the whole
+batch. The workers read recipes and exercises from a SharedCatalog the
+daemon packs once at start-up.
+
+A user is never in two batches at once; edits that arrive while their batch
+is running are queued again and picked up afterwards.
+
+Finished plans are added to a PlanIndex (<out>/plan_index.bin by default) in
+this process as batches complete, so the index always follows the plans on
+disk. It is saved with every metrics report - from a snapshot, on a
+background thread, so the poll loop keeps running while the file is written
+- and once more, synchronously, on shutdown.
+
+Usage:
+    python -m src.agents.replan_daemon --db profiles.db --out plans
+    python -m src.agents.coordinator --watch --db profiles.db --out plans
+
+metrics() reports queue depth, in-flight work, lag (age of the oldest change
+not yet replanned) and throughput over the last minute.
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.agents.coordinator import member_dir, replan_user
+from src.agents.diet_agent import SAMPLE_RECIPES
+from src.agents.grocery_agent import load_meal_plan
+from src.agents.workout_agent import exercise_catalogs
+from src.core.profile_store import PROFILE_DB, ProfileStore
+from src.tools.plan_index import IndexSnapshot, PlanIndex
+from src.tools.shared_catalog import SharedCatalog, init_worker
+
+# Throughput is measured over this trailing window (seconds).
+THROUGHPUT_WINDOW_S = 60.0
+
+# Default index file name inside the output directory.
+INDEX_FILE = "plan_index.bin"
+
+# (users replanned, [(user_id, error), ...])
+BatchResult = Tuple[List[str], List[Tuple[str, str]]]
+
+
+def replan_batch(store_path: str, out_dir: str, user_ids: List[str]) -> BatchResult:
+    """Replan a batch of users (runs inside a pool worker). Profiles are read fresh from the store."""
+    done, errors = [], []
+    with ProfileStore(store_path) as store:
+        for user_id in user_ids:
+            profile = store.get(user_id)
+            if profile is None:
+                continue
+            try:
+                replan_user(user_id, profile, out_dir)
+                done.append(user_id)
+            except Exception as e:  # one bad profile must not sink the batch
+                errors.append((user_id, f"{type(e).__name__}: {e}"))
+    return done, errors
+
+
+class ReplanDaemon:
+    """
+    Polls the profile store and replans changed users in debounced batches.
+    workers=0 runs batches inline in this process (handy for tests and debugging).
+    index_path=None keeps the plan index at <out_dir>/plan_index.bin; "" disables it.
+    """
+
+    def __init__(
+        self,
+        store_path: str = PROFILE_DB,
+        out_dir: str = "plans",
+        debounce_s: float = 2.0,
+        batch_size: int = 100,
+        workers: Optional[int] = None,
+        poll_interval: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        from_revision: Optional[int] = None,
+        index_path: Optional[str] = None,
+    ):
+        self.store_path = store_path
+        self.out_dir = out_dir
+        self.debounce_s = debounce_s
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.clock = clock
+        # opened on first poll, so run() may be driven from another thread
+        self._store: Optional[ProfileStore] = None
+        # by default only changes made after start-up are replanned; pass 0 to replan everyone
+        if from_revision is None:
+            with ProfileStore(store_path) as store:
+                from_revision = store.revision()
+        self.revision = from_revision
+
+        self.index_path = os.path.join(out_dir, INDEX_FILE) if index_path is None else index_path
+        self.index: Optional[PlanIndex] = None
+        if self.index_path:
+            self.index = PlanIndex.load(self.index_path) if os.path.exists(self.index_path) else PlanIndex()
+        self._index_dirty = False
+        self._index_writer: Optional[ThreadPoolExecutor] = None
+        self._index_save: Optional[Tuple[Future, IndexSnapshot]] = None  # background save in progress
+
+        # pool workers attach to one shared copy of the recipe and exercise catalogs
+        self._catalog: Optional[SharedCatalog] = None
+        self._executor = None
+        if workers != 0:
+            self._catalog = SharedCatalog.create(SAMPLE_RECIPES, exercise_catalogs())
+            self._executor = ProcessPoolExecutor(workers, initializer=init_worker, initargs=(self._catalog.name,))
+        self.max_in_flight = 2 * (workers or os.cpu_count() or 1)
+
+        self.pending: Dict[str, List[float]] = {}  # user_id -> [first change seen, last change seen]
+        self._batches: Dict[Future, Tuple[List[str], float]] = {}  # future -> (users, oldest change)
+        self._in_flight_users = set()
+
+        self.started = clock()
+        self.changes_seen = 0
+        self.replanned = 0
+        self.batches_done = 0
+        self.errors = 0
+        self.recent_errors = deque(maxlen=100)
+        self._completions = deque()  # (finish time, users replanned) within THROUGHPUT_WINDOW_S
+
+    # ---------- one tick ----------
+
+    def poll(self) -> int:
+        """Queue users changed since the last poll. Returns the number of changes seen."""
+        if self._store is None:
+            self._store = ProfileStore(self.store_path)
+        changed, self.revision = self._store.changed_since(self.revision)
+        now = self.clock()
+        for user_id in changed:
+            seen = self.pending.get(user_id)
+            if seen is None:
+                self.pending[user_id] = [now, now]
+            else:
+                seen[1] = now
+        self.changes_seen += len(changed)
+        return len(changed)
+
+    def due(self) -> List[str]:
+        """Queued users whose last change is older than the debounce window, oldest first."""
+        cutoff = self.clock() - self.debounce_s
+        ready = [(seen[0], user_id) for user_id, seen in self.pending.items()
+                 if seen[1] <= cutoff and user_id not in self._in_flight_users]
+        return [user_id for _, user_id in sorted(ready)]
+
+    def dispatch(self) -> int:
+        """Send due users to the pool in batches. Returns the number of batches started."""
+        started = 0
+        due = self.due()
+        for i in range(0, len(due), self.batch_size):
+            if len(self._batches) >= self.max_in_flight:
+                break
+            users = due[i:i + self.batch_size]
+            oldest = min(self.pending[u][0] for u in users)
+            for user_id in users:
+                del self.pending[user_id]
+            self._in_flight_users.update(users)
+            if self._executor is None:
+                future = Future()
+                future.set_result(replan_batch(self.store_path, self.out_dir, users))
+            else:
+                future = self._executor.submit(replan_batch, self.store_path, self.out_dir, users)
+            self._batches[future] = (users, oldest)
+            started += 1
+            if self._executor is None:
+                self.reap()
+        return started
+
+    def reap(self) -> int:
+        """Collect finished batches. Returns the number collected."""
+        finished = [f for f in self._batches if f.done()]
+        now = self.clock()
+        for future in finished:
+            users, _ = self._batches.pop(future)
+            self._in_flight_users.difference_update(users)
+            self.batches_done += 1
+            try:
+                done, errors = future.result()
+            except Exception as e:  # the worker itself died
+                done, errors = [], [(user_id, f"{type(e).__name__}: {e}") for user_id in users]
+            self.replanned += len(done)
+            self._completions.append((now, len(done)))
+            self._index_plans(done)
+            self.errors += len(errors)
+            self.recent_errors.extend(errors)
+        return len(finished)
+
+    def _index_plans(self, user_ids: List[str]):
+        if self.index is None:
+            return
+        for user_id in user_ids:
+            path = os.path.join(member_dir(self.out_dir, user_id), "meal_plan.json")
+            try:
+                self.index.add_plan(user_id, load_meal_plan(path))
+            except (OSError, ValueError) as e:
+                self.errors += 1
+                self.recent_errors.append((user_id, f"index: {type(e).__name__}: {e}"))
+                continue
+            self._index_dirty = True
+
+    def save_index(self, background: bool = False):
+        """
+        Write the plan index if plans were added since the last save.
+        background=True writes a snapshot on a thread and returns at once
+        (skipped while the previous background save is still running).
+        """
+        if self._index_save is not None:
+            if background and not self._index_save[0].done():
+                return
+            self._finish_index_save()
+        if self.index is None or not self._index_dirty:
+            return
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        snapshot = self.index.snapshot()
+        self._index_dirty = False
+        if not background:
+            snapshot.write(self.index_path)
+            self.index.keep_packed(snapshot)
+            return
+        if self._index_writer is None:
+            self._index_writer = ThreadPoolExecutor(1)
+        self._index_save = (self._index_writer.submit(snapshot.write, self.index_path), snapshot)
+
+    def _finish_index_save(self):
+        future, snapshot = self._index_save
+        self._index_save = None
+        try:
+            future.result()
+        except OSError as e:
+            self._index_dirty = True  # try again with the next save
+            self.errors += 1
+            self.recent_errors.append(("", f"index save: {type(e).__name__}: {e}"))
+            return
+        self.index.keep_packed(snapshot)
+
+    def step(self):
+        self.reap()
+        self.poll()
+        self.dispatch()
+        self.reap()
+
+    # ---------- metrics ----------
+
+    def metrics(self) -> Dict:
+        now = self.clock()
+        oldest = [seen[0] for seen in self.pending.values()] + [o for _, o in self._batches.values()]
+        while self._completions and self._completions[0][0] < now - THROUGHPUT_WINDOW_S:
+            self._completions.popleft()
+        window = min(THROUGHPUT_WINDOW_S, now - self.started)
+        return {
+            "revision": self.revision,
+            "queue_depth": len(self.pending),
+            "in_flight_batches": len(self._batches),
+            "in_flight_users": len(self._in_flight_users),
+            "lag_s": round(now - min(oldest), 3) if oldest else 0.0,
+            "changes_seen": self.changes_seen,
+            "replanned": self.replanned,
+            "batches": self.batches_done,
+            "errors": self.errors,
+            # users replanned per second over the last THROUGHPUT_WINDOW_S
+            "throughput_per_s": round(sum(n for _, n in self._completions) / window, 2) if window > 0 else 0.0,
+        }
+
+    # ---------- loop ----------
+
+    def run(self, stop_event=None, max_iterations: Optional[int] = None, report_every_s: float = 10.0):
+        """
+        Poll until stop_event is set (or max_iterations ticks), printing metrics
+        every report_every_s seconds. Waits for running batches before returning.
+        """
+        print(f"Watching {self.store_path} from revision {self.revision}; plans go to {self.out_dir}/")
+        last_report = self.clock()
+        iterations = 0
+        try:
+            while not (stop_event and stop_event.is_set()):
+                self.step()
+                iterations += 1
+                if max_iterations is not None and iterations >= max_iterations:
+                    break
+                if report_every_s and self.clock() - last_report >= report_every_s:
+                    self.save_index(background=True)
+                    print(self.metrics())
+                    last_report = self.clock()
+                if stop_event:
+                    stop_event.wait(self.poll_interval)
+                else:
+                    time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+        print(self.metrics())
+
+    def close(self):
+        """Finish running batches and release the pool and the store connection."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._catalog is not None:
+            self._catalog.close()
+            self._catalog.unlink()
+            self._catalog = None
+        self.reap()
+        self.save_index()
+        if self._index_writer is not None:
+            self._index_writer.shutdown(wait=True)
+            self._index_writer = None
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replan DesiFit users as their profiles change.")
+    parser.add_argument("--db", default=PROFILE_DB, help="profile store to watch")
+    parser.add_argument("--out", default="plans", help="output directory for per-user plans")
+    parser.add_argument("--debounce", type=float, default=2.0, help="seconds to wait for edits to settle")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (0 = inline)")
+    parser.add_argument("--poll", type=float, default=0.5, help="poll interval in seconds")
+    parser.add_argument("--all", action="store_true", help="replan every stored profile on start-up")
+    parser.add_argument("--index", default=None, help="plan index file (default: <out>/plan_index.bin)")
+    parser.add_argument("--no-index", action="store_true", help="do not maintain a plan index")
+    args = parser.parse_args(argv)
+
+    daemon = ReplanDaemon(args.db, args.out, debounce_s=args.debounce, batch_size=args.batch_size,
+                          workers=args.workers, poll_interval=args.poll,
+                          from_revision=0 if args.all else None,
+                          index_path="" if args.no_index else args.index)
+    daemon.run()
+
+
+if __name__ == "__main__":
+    main()
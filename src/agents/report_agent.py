@@ -0,0 +1,363 @@
+# src/agents/report_agent.py
+"""
+Report agent for DesiFit: shareable weekly reports in Markdown and HTML.
+
+Key functions:
+- build_report_context(summary, meal_plan, workout_plan, grocery, basket)  <- plain dict for the layouts
+- render_report(context, fmt="md" | "html")
+- write_reports(context, base_path, formats)  <- report.md / report.html
+- render_member_reports(members, out_dir, ...)  <- bulk, across a worker pool
+
+Each format is a layout of str.format patterns, one per report section,
+built once at import and filled by plain loops for every member. Bulk rendering streams (user_id, profile) pairs
+through Pool.imap_unordered; each worker builds the plans, renders and
+writes its member's files itself, so the parent only sees tiny results and
+never holds more than a chunk of members in memory. The recipe and exercise
+catalogs are packed once into a SharedCatalog that every worker attaches to.
+
+Usage:
+    python -m src.agents.report_agent --db profiles.db --out reports --workers 8
+"""
+
+import argparse
+import html
+import os
+import time
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.agents.coordinator import member_dir, summarize_profile
+from src.agents.diet_agent import SAMPLE_RECIPES, generate_week_plan
+from src.agents.grocery_agent import generate_grocery_list, optimize_basket
+from src.agents.workout_agent import exercise_catalogs, generate_weekly_workout
+from src.core.profile_store import PROFILE_DB, ProfileStore
+from src.core.user_profile import UserProfile
+from src.tools.ingredients import REGISTRY
+from src.tools.shared_catalog import SharedCatalog, init_worker
+
+FORMATS = ("md", "html")
+
+MEAL_LABELS = {
+    "breakfast": "Breakfast",
+    "lunch": "Lunch",
+    "dinner": "Dinner",
+    "snack_1": "Snack",
+    "snack_2": "Snack",
+}
+
+# Each report is a fixed sequence of sections; every layout maps a section name to
+# a str.format pattern, filled once per row by render_report's loops (row patterns
+# take their fields positionally, in the order they appear). Values are escaped for
+# the format (Markdown: "|" inside table cells; HTML: html.escape) before they
+# reach the patterns.
+MARKDOWN_LAYOUT = {
+    "head": (
+        "# DesiFit weekly plan: {name}\n\n"
+        "| | |\n|---|---|\n"
+        "| Age | {age} |\n"
+        "| Goal | {goal} |\n"
+        "| Dietary preferences | {preferences} |\n"
+        "| BMR | {bmr} kcal/day |\n"
+        "| TDEE | {tdee} kcal/day |\n"
+        "| Calorie target | {calorie_target} kcal/day |\n"
+        "| Protein / fat / carbs | {protein_g} g / {fat_g} g / {carbs_g} g |\n\n"
+        "## Meal plan\n"
+    ),
+    "day": "\n### Day {} ({} kcal)\n\n| Meal | Recipe | kcal |\n|---|---|---|\n",
+    "meal": "| {} | {} | {} |\n",
+    "day_end": "",
+    "workouts": "\n## Workouts ({} days a week, {})\n",
+    "session": "\n### Session {}: {}\n\n",
+    "exercise": "- {}: {}\n",
+    "session_end": "",
+    "grocery": "\n## Grocery list\n\n| Item | Servings |\n|---|---|\n",
+    "grocery_item": "| {} | {} |\n",
+    "grocery_end": "",
+    "basket": "\n### Estimated basket: {} {}\n\n| Buy | Packs | Cost |\n|---|---|---|\n",
+    "basket_line": "| {} | {} | {} |\n",
+    "basket_end": "",
+    "foot": "",
+}
+
+HTML_LAYOUT = {
+    "head": (
+        "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n"
+        "<title>DesiFit weekly plan: {name}</title>\n"
+        "<style>\n"
+        "body {{ font-family: sans-serif; max-width: 52rem; margin: 2rem auto; }}\n"
+        "table {{ border-collapse: collapse; margin-bottom: 1rem; }}\n"
+        "td, th {{ border: 1px solid #ccc; padding: 0.25rem 0.6rem; text-align: left; }}\n"
+        "</style>\n</head>\n<body>\n"
+        "<h1>DesiFit weekly plan: {name}</h1>\n"
+        "<table>\n"
+        "<tr><th>Age</th><td>{age}</td></tr>\n"
+        "<tr><th>Goal</th><td>{goal}</td></tr>\n"
+        "<tr><th>Dietary preferences</th><td>{preferences}</td></tr>\n"
+        "<tr><th>BMR</th><td>{bmr} kcal/day</td></tr>\n"
+        "<tr><th>TDEE</th><td>{tdee} kcal/day</td></tr>\n"
+        "<tr><th>Calorie target</th><td>{calorie_target} kcal/day</td></tr>\n"
+        "<tr><th>Protein / fat / carbs</th><td>{protein_g} g / {fat_g} g / {carbs_g} g</td></tr>\n"
+        "</table>\n"
+        "<h2>Meal plan</h2>\n"
+    ),
+    "day": "<h3>Day {} ({} kcal)</h3>\n<table>\n<tr><th>Meal</th><th>Recipe</th><th>kcal</th></tr>\n",
+    "meal": "<tr><td>{}</td><td>{}</td><td>{}</td></tr>\n",
+    "day_end": "</table>\n",
+    "workouts": "<h2>Workouts ({} days a week, {})</h2>\n",
+    "session": "<h3>Session {}: {}</h3>\n<ul>\n",
+    "exercise": "<li>{}: {}</li>\n",
+    "session_end": "</ul>\n",
+    "grocery": "<h2>Grocery list</h2>\n<table>\n<tr><th>Item</th><th>Servings</th></tr>\n",
+    "grocery_item": "<tr><td>{}</td><td>{}</td></tr>\n",
+    "grocery_end": "</table>\n",
+    "basket": "<h3>Estimated basket: {} {}</h3>\n<table>\n"
+              "<tr><th>Buy</th><th>Packs</th><th>Cost</th></tr>\n",
+    "basket_line": "<tr><td>{}</td><td>{}</td><td>{}</td></tr>\n",
+    "basket_end": "</table>\n",
+    "foot": "</body>\n</html>\n",
+}
+
+REPORT_LAYOUTS = {
+    "md": (MARKDOWN_LAYOUT, lambda v: str(v).replace("|", "\\|")),
+    "html": (HTML_LAYOUT, lru_cache(maxsize=8192)(lambda v: html.escape(str(v)))),
+}
+
+
+def _label(value) -> str:
+    """'lose_weight' -> 'Lose weight'."""
+    return str(value).replace("_", " ").strip().capitalize()
+
+
+def _number(value, spec: str = ".0f") -> str:
+    return "" if value is None else format(value, spec)
+
+
+def _display_name(ingredient: str) -> str:
+    return REGISTRY.display_name(REGISTRY.intern(ingredient))
+
+
+def _packs_text(line: Dict) -> str:
+    return " + ".join(f"{p['count']} x {p['size']:g} {line['unit']}" for p in line["packs"])
+
+
+def build_report_context(summary: Dict, meal_plan: Dict, workout_plan: Dict, grocery: Dict[str, float],
+                         basket: Optional[Dict] = None) -> Dict:
+    """Flatten the agents' outputs into the values the report layouts use."""
+    profile = summary["profile"]
+    days = []
+    for day in meal_plan["days"]:
+        meals = []
+        for meal in day["meals"]:
+            nutrition = meal.get("nutrition", {})
+            kcal = nutrition.get("calories_targeted", nutrition.get("calories_per_serving", 0))
+            meals.append({
+                "slot": MEAL_LABELS.get(meal["type"], meal["type"].capitalize()),
+                "name": meal["recipe"]["name"],
+                "kcal": round(kcal),
+            })
+        days.append({"day": day["day"], "meals": meals, "kcal": sum(m["kcal"] for m in meals)})
+    workout = {
+        "days_per_week": workout_plan["days_per_week"],
+        "equipment": workout_plan["equipment"],
+        "days": [
+            {"day": d["day_index"] + 1, "focus": d["focus"], "exercises": d["exercises"]}
+            for d in workout_plan["days"]
+        ],
+    }
+    items = sorted(({"name": _display_name(name), "count": count} for name, count in grocery.items()),
+                   key=lambda item: item["name"])
+    context = {
+        "name": (profile.get("name") or "").strip() or "Member",
+        "age": profile.get("age"),
+        "goal": (profile.get("goal") or "").strip(),
+        "preferences": profile.get("dietary_preferences") or "none",
+        "bmr": summary["bmr"],
+        "tdee": summary["tdee"],
+        "calorie_target": summary["calorie_target"],
+        "macros": summary["macros"],
+        "days": days,
+        "workout": workout,
+        "grocery": items,
+        "basket": None,
+    }
+    if basket:
+        context["basket"] = {
+            "currency": basket["currency"],
+            "total": basket["total_cost"],
+            "items": sorted(
+                ({"name": _display_name(line["buy"]), "packs": _packs_text(line), "cost": line["cost"]}
+                 for line in basket["items"]),
+                key=lambda line: line["name"],
+            ),
+        }
+    return context
+
+
+def render_report(context: Dict, fmt: str = "md") -> str:
+    if fmt not in REPORT_LAYOUTS:
+        raise ValueError(f"unknown report format {fmt!r}; expected one of {list(REPORT_LAYOUTS)}")
+    layout, esc = REPORT_LAYOUTS[fmt]
+    macros = context["macros"]
+    out = [layout["head"].format(
+        name=esc(context["name"]), age=esc(context["age"]), goal=esc(_label(context["goal"])),
+        preferences=esc(context["preferences"]), bmr=_number(context["bmr"]), tdee=_number(context["tdee"]),
+        calorie_target=_number(context["calorie_target"]), protein_g=_number(macros["protein_g"], ".1f"),
+        fat_g=_number(macros["fat_g"], ".1f"), carbs_g=_number(macros["carbs_g"], ".1f"),
+    )]
+    day_head, meal_row, day_end = layout["day"].format, layout["meal"].format, layout["day_end"]
+    for day in context["days"]:
+        out.append(day_head(day["day"], day["kcal"]))
+        for meal in day["meals"]:
+            out.append(meal_row(esc(meal["slot"]), esc(meal["name"]), meal["kcal"]))
+        out.append(day_end)
+    workout = context["workout"]
+    out.append(layout["workouts"].format(workout["days_per_week"], esc(workout["equipment"])))
+    exercise_row = layout["exercise"].format
+    for day in workout["days"]:
+        out.append(layout["session"].format(day["day"], esc(_label(day["focus"]))))
+        for ex in day["exercises"]:
+            out.append(exercise_row(esc(ex["name"]), esc(ex["scheme"])))
+        out.append(layout["session_end"])
+    out.append(layout["grocery"])
+    item_row = layout["grocery_item"].format
+    for item in context["grocery"]:
+        out.append(item_row(esc(item["name"]), item["count"]))
+    out.append(layout["grocery_end"])
+    basket = context["basket"]
+    if basket:
+        out.append(layout["basket"].format(esc(basket["currency"]), _number(basket["total"], ".2f")))
+        line_row = layout["basket_line"].format
+        for line in basket["items"]:
+            out.append(line_row(esc(line["name"]), esc(line["packs"]), f"{line['cost']:.2f}"))
+        out.append(layout["basket_end"])
+    out.append(layout["foot"])
+    return "".join(out)
+
+
+def write_reports(context: Dict, base_path: str = "report", formats: Sequence[str] = FORMATS) -> List[str]:
+    """Render and write <base_path>.md / <base_path>.html. Returns the paths written."""
+    paths = []
+    for fmt in formats:
+        path = f"{base_path}.{fmt}"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(render_report(context, fmt))
+        paths.append(path)
+    return paths
+
+
+# ---------- bulk rendering ----------
+
+@lru_cache(maxsize=None)
+def _weekly_workout(goal: str, week_index: int) -> Dict:
+    # depends only on the goal, so it is shared by every member with the same one
+    return generate_weekly_workout(goal=goal, days_per_week=4, equipment="gym", week_index=week_index)
+
+
+def member_report_context(profile: UserProfile, week_index: int = 0, with_basket: bool = True) -> Dict:
+    """Plan one member's week (same pipeline as the coordinator) and build its report context."""
+    summary = summarize_profile(profile)
+    meal_plan = generate_week_plan(profile, summary["calorie_target"], week_index=week_index)
+    grocery = generate_grocery_list(meal_plan)
+    basket = optimize_basket(grocery) if with_basket else None
+    return build_report_context(summary, meal_plan, _weekly_workout(profile.goal, week_index), grocery, basket)
+
+
+# Per-worker job settings, set once by the pool initializer: (out_dir, formats, week_index, with_basket)
+_JOB: Optional[Tuple[str, Tuple[str, ...], int, bool]] = None
+
+
+def _init_worker(out_dir: str, formats: Tuple[str, ...], week_index: int, with_basket: bool,
+                 catalog_name: Optional[str] = None):
+    global _JOB
+    _JOB = (out_dir, formats, week_index, with_basket)
+    if catalog_name:
+        init_worker(catalog_name)
+
+
+def _render_member(member: Tuple[str, UserProfile]) -> Tuple[str, int, Optional[str]]:
+    """Worker task: (user_id, files written, error)."""
+    user_id, profile = member
+    out_dir, formats, week_index, with_basket = _JOB
+    try:
+        context = member_report_context(profile, week_index, with_basket)
+        target = member_dir(out_dir, user_id)
+        os.makedirs(target, exist_ok=True)
+        paths = write_reports(context, os.path.join(target, f"report_week{week_index + 1}"), formats)
+        return user_id, len(paths), None
+    except Exception as e:  # report the member and keep going
+        return user_id, 0, f"{type(e).__name__}: {e}"
+
+
+def render_member_reports(
+    members: Iterable[Tuple[str, UserProfile]],
+    out_dir: str = "reports",
+    formats: Sequence[str] = FORMATS,
+    week_index: int = 0,
+    with_basket: bool = True,
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+) -> Dict:
+    """
+    Render weekly reports for many members into <out_dir>/<user_id>/report_week<N>.<fmt>.
+    workers=0 renders in this process. Returns counts, the first 100 errors and timing.
+    """
+    formats = tuple(formats)
+    for fmt in formats:
+        if fmt not in REPORT_LAYOUTS:
+            raise ValueError(f"unknown report format {fmt!r}")
+    stats = {"members": 0, "files": 0, "failed": 0, "errors": []}
+    start = time.perf_counter()
+    config = (out_dir, formats, week_index, with_basket)
+
+    def collect(results):
+        for user_id, files, error in results:
+            stats["members"] += 1
+            stats["files"] += files
+            if error:
+                stats["failed"] += 1
+                if len(stats["errors"]) < 100:
+                    stats["errors"].append({"user_id": user_id, "error": error})
+
+    if workers == 0:
+        _init_worker(*config)
+        collect(map(_render_member, members))
+    else:
+        # recipes and exercises are packed once and shared by every worker instead of copied per process
+        catalog = SharedCatalog.create(SAMPLE_RECIPES, exercise_catalogs())
+        try:
+            with Pool(workers, initializer=_init_worker, initargs=config + (catalog.name,)) as pool:
+                collect(pool.imap_unordered(_render_member, members, chunksize))
+        finally:
+            catalog.close()
+            catalog.unlink()
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    stats["members_per_s"] = round(stats["members"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Render weekly DesiFit reports for every stored profile.")
+    parser.add_argument("--db", default=PROFILE_DB, help="profile store")
+    parser.add_argument("--out", default="reports", help="output directory")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--week", type=int, default=1, help="week number (1-based)")
+    parser.add_argument("--no-basket", action="store_true", help="skip the priced grocery basket")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (0 = inline)")
+    parser.add_argument("--chunksize", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    with ProfileStore(args.db) as store:
+        stats = render_member_reports(
+            store.iter_profiles(), args.out, args.format, args.week - 1,
+            with_basket=not args.no_basket, workers=args.workers, chunksize=args.chunksize,
+        )
+    print(f"Rendered {stats['files']} files for {stats['members']} members "
+          f"({stats['seconds']}s, {stats['members_per_s']:,.0f} members/s); {stats['failed']} failed")
+    for err in stats["errors"][:10]:
+        print(f"  {err['user_id']}: {err['error']}")
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,8 @@ This is intentionally simple but structured and easy to extend later.
 
 from typing import Dict, List
 
+from src.tools.shared_catalog import attached_catalog
+
 
 def _base_exercises_gym() -> Dict[str, List[str]]:
     """Return a dictionary of basic gym exercises grouped by muscle."""
@@ -80,6 +82,19 @@ def _base_exercises_home() -> Dict[str, List[str]]:
     }
 
 
+def exercise_catalogs() -> Dict[str, Dict[str, List[str]]]:
+    """All exercise lists by equipment type (what SharedCatalog.create packs for worker pools)."""
+    return {"gym": _base_exercises_gym(), "home": _base_exercises_home()}
+
+
+def _base_exercises(equipment: str) -> Dict[str, List[str]]:
+    """Exercise lists for an equipment type; uses the shared catalog when this worker has one attached."""
+    catalog = attached_catalog()
+    if catalog is not None and catalog.exercises(equipment):
+        return catalog.exercises(equipment)
+    return _base_exercises_gym() if equipment == "gym" else _base_exercises_home()
+
+
 def _suggest_sets_reps(goal: str) -> Dict[str, str]:
     """
     Suggest sets/reps based on goal.
@@ -106,7 +121,7 @@ def generate_workout_day(
     - Uses a simple 4-day split pattern if possible.
     """
     equipment = (equipment or "gym").lower()
-    base = _base_exercises_gym() if equipment == "gym" else _base_exercises_home()
+    base = _base_exercises(equipment)
     scheme = _suggest_sets_reps(goal)
 
     # Map day index to focus area. This is a simple pattern:
@@ -0,0 +1,350 @@
+# src/cli/bulk_import.py
+"""
+Bulk, non-interactive profile import (e.g. a corporate wellness roster).
+
+Usage:
+    python -m src.cli.bulk_import employees.csv --db profiles.db --errors bad_rows.csv
+    python -m src.cli.bulk_import employees.jsonl
+
+Input is CSV (with a header row) or JSONL, one profile per row, with a
+`user_id` column plus the UserProfile fields. Rows are streamed, validated
+and coerced a batch at a time, and the whole import is written to the
+ProfileStore as one transaction under one revision (upsert_batches), so the
+replan daemon sees all of it at once. Bad rows are reported (line number +
+reason) and skipped; they never abort the import.
+
+Validation is column-wise: a whole batch column is coerced with one
+map(int, ...) / map(float, ...) and range-checked with min/max. Only a
+column that fails this fast path is re-checked value by value to find the
+offending rows, which are then dropped from every column.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from itertools import compress, islice
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.core.calorie_calc import ACTIVITY_MULTIPLIERS
+from src.core.profile_store import PROFILE_DB, PROFILE_FIELDS, ProfileStore
+
+COLUMNS = ("user_id",) + PROFILE_FIELDS
+REQUIRED = ("user_id", "name", "age", "sex", "height_cm", "weight_kg", "activity_level", "goal")
+
+SEXES = {"male": "male", "m": "male", "female": "female", "f": "female"}
+GOALS = {"lose_weight", "maintain", "gain_weight"}
+
+# (min, max) accepted for numeric fields
+RANGES = {
+    "age": (10, 100),
+    "height_cm": (100.0, 250.0),
+    "weight_kg": (25.0, 300.0),
+    "target_rate_kg_per_week": (0.0, 1.5),
+}
+
+DEFAULT_BATCH_SIZE = 50_000
+
+# (row numbers, rows of raw values in COLUMNS order; None marks a malformed row)
+Batch = Tuple[Sequence[int], List[Optional[Sequence]]]
+
+
+# ---------- readers ----------
+
+def read_csv_batches(f, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Batch]:
+    """
+    Yield batches from a CSV file with a header row.
+    Row numbers count records, with the header as row 1.
+    """
+    reader = csv.reader(f)
+    header = [h.strip() for h in next(reader, [])]
+    positions = {name: i for i, name in enumerate(header)}
+    present = [c for c in COLUMNS if c in positions]
+    if not present:
+        return
+    # header already in COLUMNS order (the usual export): rows are used as they are
+    pick = None if tuple(header) == COLUMNS else itemgetter(*(positions[c] for c in present))
+    width = len(header)
+    first = 2
+    while True:
+        raw = list(islice(reader, batch_size))
+        if not raw:
+            return
+        numbers = range(first, first + len(raw))
+        first += len(raw)
+        if len(present) == len(COLUMNS) and set(map(len, raw)) == {width}:
+            yield numbers, raw if pick is None else list(map(pick, raw))
+            continue
+        # slow path: short/long rows, blank lines or columns missing from the header
+        rows_out, numbers_out = [], []
+        for number, values in zip(numbers, raw):
+            if not values:
+                continue
+            numbers_out.append(number)
+            if len(values) != width:
+                rows_out.append(None)
+                continue
+            if pick is None:
+                rows_out.append(values)
+                continue
+            by_name = dict(zip(present, pick(values) if len(present) > 1 else (pick(values),)))
+            rows_out.append([by_name.get(c) for c in COLUMNS])
+        yield numbers_out, rows_out
+
+
+_ALL_COLUMNS = itemgetter(*COLUMNS)
+
+
+def _json_rows(objs: List) -> List[Optional[Sequence]]:
+    try:
+        return list(map(_ALL_COLUMNS, objs))  # fast path: every object has every column
+    except (KeyError, TypeError):
+        return [[obj.get(c) for c in COLUMNS] if isinstance(obj, dict) else None for obj in objs]
+
+
+def read_jsonl_batches(f, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Batch]:
+    """
+    Yield batches from a JSONL file (row numbers are line numbers).
+    A batch is decoded with one json.loads of the joined lines; only a batch that
+    fails (bad JSON, blank lines) is decoded line by line.
+    """
+    first = 1
+    while True:
+        lines = list(islice(f, batch_size))
+        if not lines:
+            return
+        numbers = range(first, first + len(lines))
+        first += len(lines)
+        try:
+            objs = json.loads("[" + ",".join(lines) + "]")
+            if len(objs) == len(lines):
+                yield numbers, _json_rows(objs)
+                continue
+        except ValueError:
+            pass
+        numbers_out, objs = [], []
+        for number, line in zip(numbers, lines):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                obj = None
+            numbers_out.append(number)
+            objs.append(obj)
+        if objs:
+            yield numbers_out, _json_rows(objs)
+
+
+# ---------- coercion ----------
+
+def _blank(v) -> bool:
+    return v is None or (isinstance(v, str) and not v.strip())
+
+
+def _coerce_str(v) -> str:
+    return str(v).strip()
+
+
+def _coerce_choice(mapping: Dict[str, str], label: str) -> Callable:
+    def coerce(v):
+        key = str(v).strip().lower()
+        if key not in mapping:
+            raise ValueError(f"{label} must be one of {sorted(set(mapping.values()))}")
+        return mapping[key]
+    return coerce
+
+
+def _coerce_number(cast: Callable, field: str) -> Callable:
+    lo, hi = RANGES[field]
+    def coerce(v):
+        x = cast(float(v)) if cast is int and not isinstance(v, int) else cast(v)
+        if not lo <= x <= hi:
+            raise ValueError(f"{field} must be between {lo} and {hi}")
+        return x
+    return coerce
+
+
+COERCERS: Dict[str, Callable] = {
+    "user_id": _coerce_str,
+    "name": _coerce_str,
+    "age": _coerce_number(int, "age"),
+    "sex": _coerce_choice(SEXES, "sex"),
+    "height_cm": _coerce_number(float, "height_cm"),
+    "weight_kg": _coerce_number(float, "weight_kg"),
+    "activity_level": _coerce_choice({k: k for k in ACTIVITY_MULTIPLIERS}, "activity_level"),
+    "goal": _coerce_choice({g: g for g in GOALS}, "goal"),
+    "target_rate_kg_per_week": _coerce_number(float, "target_rate_kg_per_week"),
+    "dietary_preferences": _coerce_str,
+}
+
+
+def coerce_value(column: str, v):
+    """Validate and coerce one value (slow path). Raises ValueError with a readable reason."""
+    if _blank(v):
+        if column in REQUIRED:
+            raise ValueError(f"missing {column}")
+        return None
+    try:
+        return COERCERS[column](v)
+    except (TypeError, ValueError) as e:
+        msg = str(e)
+        raise ValueError(msg if column in msg else f"invalid {column}: {v!r}")
+
+
+def coerce_row(values: Optional[Sequence]) -> Tuple:
+    """Validate and coerce one row. Raises ValueError for its first bad value."""
+    if values is None:
+        raise ValueError("malformed row")
+    return tuple(coerce_value(column, v) for column, v in zip(COLUMNS, values))
+
+
+def _coerce_column(column: str, values: Sequence) -> List:
+    """Fast path for one batch column. Raises on the first problem; the caller then re-checks that column per value."""
+    if column in ("user_id", "name", "dietary_preferences"):
+        try:
+            out = list(map(str.strip, values))
+        except TypeError:  # None / non-string JSON values
+            if column in REQUIRED:
+                raise
+            return [None if _blank(v) else str(v).strip() for v in values]
+        if column in REQUIRED:
+            if not all(out):
+                raise ValueError(column)
+            return out
+        return [v or None for v in out]
+    if column in ("sex", "activity_level", "goal"):
+        allowed = set(SEXES if column == "sex" else (ACTIVITY_MULTIPLIERS if column == "activity_level" else GOALS))
+        out = values
+        if not set(out) <= allowed:  # not already canonical: normalise case and spaces first
+            out = list(map(str.lower, map(str.strip, values)))
+            if not set(out) <= allowed:
+                raise ValueError(column)
+        return list(map(SEXES.__getitem__, out)) if column == "sex" else list(out)
+    lo, hi = RANGES[column]
+    if column == "target_rate_kg_per_week":
+        try:
+            out = present = list(map(float, values))
+        except (TypeError, ValueError):  # blanks are allowed here
+            out = [None if _blank(v) else float(v) for v in values]
+            present = [x for x in out if x is not None]
+        total = sum(present)
+        if present and (total != total or not (lo <= min(present) and max(present) <= hi)):
+            raise ValueError(column)
+        return out
+    out = list(map(int if column == "age" else float, values))
+    total = sum(out)
+    if total != total or not (lo <= min(out) and max(out) <= hi):  # NaN or out of range
+        raise ValueError(column)
+    return out
+
+
+def validate_batch(batch: Batch) -> Tuple[List[List], int, List[Tuple[int, str]]]:
+    """
+    Return (coerced columns in COLUMNS order, number of good rows, [(row number, reason), ...]).
+    Columns are what ProfileStore.upsert_columns expects.
+    """
+    numbers, rows = batch
+    bad = []
+    if not all(rows):  # a None row is malformed; cheaper than `None in rows`, which compares every row
+        bad = [(number, "malformed row") for number, values in zip(numbers, rows) if not values]
+        numbers = [number for number, values in zip(numbers, rows) if values]
+        rows = [values for values in rows if values]
+        if not rows:
+            return [], 0, bad
+    failed: Dict[int, str] = {}  # row position -> its first bad value's reason (columns run in COLUMNS order)
+    columns = []
+    for name, col in zip(COLUMNS, zip(*rows)):
+        try:
+            columns.append(_coerce_column(name, col))
+            continue
+        except (TypeError, ValueError, AttributeError):
+            pass
+        out = []
+        for i, v in enumerate(col):
+            try:
+                out.append(coerce_value(name, v))
+            except ValueError as e:
+                out.append(None)
+                failed.setdefault(i, str(e))
+        columns.append(out)
+    if failed:
+        keep = [i not in failed for i in range(len(rows))]
+        columns = [list(compress(col, keep)) for col in columns]
+        bad.extend((numbers[i], reason) for i, reason in failed.items())
+        bad.sort()
+    return columns, len(rows) - len(failed), bad
+
+
+# ---------- import ----------
+
+def import_profiles(
+    path: str,
+    store: ProfileStore,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_error: Optional[Callable[[int, str], None]] = None,
+) -> Dict:
+    """
+    Stream profiles from a CSV or JSONL file into the store, as one revision.
+    Returns counts, that revision and the first 100 errors; every error is also
+    passed to on_error.
+    """
+    fmt = "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+    stats = {"read": 0, "imported": 0, "rejected": 0, "errors": []}
+    start = time.perf_counter()
+
+    def good_columns(batches: Iterable[Batch]) -> Iterator[List[List]]:
+        for batch in batches:
+            columns, n_good, bad = validate_batch(batch)
+            if n_good:
+                yield columns
+            stats["read"] += len(batch[1])
+            stats["imported"] += n_good
+            stats["rejected"] += len(bad)
+            for line_no, reason in bad:
+                if len(stats["errors"]) < 100:
+                    stats["errors"].append({"line": line_no, "error": reason})
+                if on_error:
+                    on_error(line_no, reason)
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        read_batches = read_jsonl_batches if fmt == "jsonl" else read_csv_batches
+        stats["revision"] = store.upsert_batches(good_columns(read_batches(f, batch_size)))
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk-import DesiFit profiles from CSV or JSONL.")
+    parser.add_argument("path", help="profiles file (.csv or .jsonl)")
+    parser.add_argument("--db", default=PROFILE_DB, help="profile store (SQLite file)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--errors", help="write rejected rows (line, error) to this CSV file")
+    args = parser.parse_args(argv)
+
+    error_file = open(args.errors, "w", encoding="utf-8", newline="") if args.errors else None
+    writer = csv.writer(error_file) if error_file else None
+    if writer:
+        writer.writerow(["line", "error"])
+    try:
+        with ProfileStore(args.db) as store:
+            stats = import_profiles(
+                args.path, store, args.batch_size,
+                on_error=(lambda line, err: writer.writerow([line, err])) if writer else None,
+            )
+    finally:
+        if error_file:
+            error_file.close()
+
+    rate = stats["read"] / stats["seconds"] if stats["seconds"] else 0
+    print(f"Read {stats['read']} rows: imported {stats['imported']}, rejected {stats['rejected']} "
+          f"({stats['seconds']}s, {rate:,.0f} rows/s)")
+    for err in stats["errors"][:10]:
+        print(f"  line {err['line']}: {err['error']}", file=sys.stderr)
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# src/core/profile_store.py
+"""
+Multi-user profile store (SQLite) for DesiFit.
+
+`session_profile.json` holds a single profile for the CLI demo; the store
+holds many profiles keyed by user_id, for bulk onboarding and cohort jobs.
+
+Every write batch gets a new revision number, stamped on the rows it
+touches, so readers can ask for "profiles changed since revision N".
+The number is allocated inside the batch's write transaction (BEGIN
+IMMEDIATE), so concurrent writers (a bulk import and a single edit) never
+share a revision, and revisions become visible in increasing order.
+A bulk load (upsert_batches) is one transaction and one revision however
+many batches it streams.
+"""
+
+import sqlite3
+from dataclasses import fields
+from itertools import chain, repeat
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.core.user_profile import UserProfile
+
+PROFILE_DB = "profiles.db"
+
+# Column order used for rows passed to / returned from the store (after user_id).
+PROFILE_FIELDS = tuple(f.name for f in fields(UserProfile))
+
+_SQL_TYPES = {int: "INTEGER", float: "REAL", str: "TEXT"}
+
+
+def _column_type(field) -> str:
+    for py_type, sql_type in _SQL_TYPES.items():
+        if field.type is py_type or py_type.__name__ in str(field.type):
+            return sql_type
+    return "TEXT"
+
+
+class ProfileStore:
+    """SQLite-backed store of UserProfile rows keyed by user_id."""
+
+    def __init__(self, filepath: str = PROFILE_DB):
+        self.filepath = filepath
+        # iter_profiles() may be consumed by a helper thread (e.g. a Pool's task feeder)
+        self.conn = sqlite3.connect(filepath, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f"{f.name} {_column_type(f)}" for f in fields(UserProfile))
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS profiles (user_id TEXT PRIMARY KEY, {columns}, revision INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS profiles_revision ON profiles (revision)")
+        self.conn.commit()
+        placeholders = ", ".join("?" for _ in range(len(PROFILE_FIELDS) + 2))
+        self._upsert_sql = (
+            f"INSERT OR REPLACE INTO profiles (user_id, {', '.join(PROFILE_FIELDS)}, revision) "
+            f"VALUES ({placeholders})"
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def revision(self) -> int:
+        """Highest revision written so far (0 for an empty store)."""
+        row = self.conn.execute("SELECT MAX(revision) FROM profiles").fetchone()
+        return row[0] or 0
+
+    def _write_batch(self, params: Callable[[int], Iterable[Sequence]]) -> int:
+        """Run one upsert batch under the write lock; params(rev) yields the rows."""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")  # take the write lock before reading the revision
+        try:
+            rev = self.revision() + 1
+            conn.executemany(self._upsert_sql, params(rev))
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return rev
+
+    def upsert_rows(self, rows: Sequence[Sequence]) -> int:
+        """
+        Insert or replace rows of (user_id, *PROFILE_FIELDS) in one transaction.
+        Rows must already be validated. Returns the revision stamped on them.
+        """
+        return self._write_batch(lambda rev: ((*row, rev) for row in rows))
+
+    def upsert_columns(self, columns: Sequence[Sequence]) -> int:
+        """
+        Same as upsert_rows, for column-oriented input: columns[0] is user_id,
+        then one sequence per PROFILE_FIELDS entry. Avoids building row tuples.
+        """
+        return self._write_batch(lambda rev: zip(*columns, repeat(rev)))
+
+    def upsert_batches(self, batches: Iterable[Sequence[Sequence]]) -> int:
+        """
+        upsert_columns for a stream of column batches, as one transaction stamped with
+        one revision: readers see the whole load or none of it. Runs with
+        synchronous=OFF (an OS crash mid-load may lose the load; re-run it) and holds
+        the write lock throughout, so other writers wait for it.
+        """
+        self.conn.execute("PRAGMA synchronous=OFF")
+        try:
+            return self._write_batch(
+                lambda rev: chain.from_iterable(zip(*columns, repeat(rev)) for columns in batches)
+            )
+        finally:
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def save(self, user_id: str, profile: UserProfile) -> int:
+        """Insert or replace one profile."""
+        return self.upsert_rows([(user_id, *(getattr(profile, name) for name in PROFILE_FIELDS))])
+
+    def get(self, user_id: str) -> Optional[UserProfile]:
+        row = self.conn.execute(
+            f"SELECT {', '.join(PROFILE_FIELDS)} FROM profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return UserProfile(*row) if row else None
+
+    def iter_profiles(self) -> Iterator[Tuple[str, UserProfile]]:
+        """Yield (user_id, UserProfile) for every stored profile."""
+        cursor = self.conn.execute(f"SELECT user_id, {', '.join(PROFILE_FIELDS)} FROM profiles ORDER BY user_id")
+        for user_id, *values in cursor:
+            yield user_id, UserProfile(*values)
+
+    def changed_since(self, revision: int) -> Tuple[List[str], int]:
+        """Return (user_ids written after `revision`, latest revision)."""
+        rows = self.conn.execute(
+            "SELECT user_id, revision FROM profiles WHERE revision > ? ORDER BY revision", (revision,)
+        ).fetchall()
+        latest = max((rev for _, rev in rows), default=revision)
+        return [user_id for user_id, _ in rows], latest
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
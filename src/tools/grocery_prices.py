@@ -0,0 +1,58 @@
+# src/tools/grocery_prices.py
+"""
+Local price and pack-size table for the grocery optimizer.
+Prices are rough UK supermarket / Indian grocer prices in GBP.
+Replace with a real price feed (or a per-city table) later.
+
+Keys are canonical ingredient names (see src.tools.ingredients).
+
+Each entry:
+- unit: 'g', 'ml' or 'pc'
+- per_serving: how much one serving of a recipe uses (in `unit`); grocery lists
+  count fractional servings (a 1.5-portion meal needs 1.5 x per_serving)
+- packs: list of (pack size in `unit`, price)
+"""
+
+CURRENCY = "GBP"
+
+PRICE_TABLE = {
+    "poha": {"unit": "g", "per_serving": 60, "packs": [(500, 1.29), (1000, 2.29)]},
+    "peanuts": {"unit": "g", "per_serving": 30, "packs": [(200, 0.99), (500, 1.99), (1000, 3.49)]},
+    "onion": {"unit": "g", "per_serving": 75, "packs": [(1000, 0.89), (3000, 2.20)]},
+    "turmeric": {"unit": "g", "per_serving": 2, "packs": [(100, 0.99), (400, 2.49)]},
+    "eggs": {"unit": "pc", "per_serving": 2, "packs": [(6, 1.45), (12, 2.65), (15, 3.10)]},
+    "tomato": {"unit": "g", "per_serving": 100, "packs": [(500, 0.95), (1000, 1.75)]},
+    "bread": {"unit": "g", "per_serving": 70, "packs": [(400, 0.75), (800, 1.25)]},
+    "semolina": {"unit": "g", "per_serving": 60, "packs": [(500, 0.99), (1500, 2.49)]},
+    "carrot": {"unit": "g", "per_serving": 60, "packs": [(1000, 0.55)]},
+    "peas": {"unit": "g", "per_serving": 60, "packs": [(900, 1.35)]},
+    "mustard seeds": {"unit": "g", "per_serving": 3, "packs": [(100, 0.79), (400, 1.99)]},
+    "curd": {"unit": "g", "per_serving": 150, "packs": [(500, 1.10), (1000, 1.85)]},
+    "banana": {"unit": "pc", "per_serving": 1, "packs": [(1, 0.18), (5, 0.85)]},
+    "whole wheat flour": {"unit": "g", "per_serving": 80, "packs": [(1000, 1.50), (5000, 5.49), (10000, 9.99)]},
+    "flour": {"unit": "g", "per_serving": 80, "packs": [(1500, 0.90)]},
+    "lentils": {"unit": "g", "per_serving": 60, "packs": [(500, 1.25), (1000, 2.20), (2000, 3.99)]},
+    "brown rice": {"unit": "g", "per_serving": 75, "packs": [(500, 1.10), (1000, 1.95)]},
+    "rice": {"unit": "g", "per_serving": 75, "packs": [(1000, 1.49), (5000, 6.50)]},
+    "mixed vegetables": {"unit": "g", "per_serving": 150, "packs": [(1000, 1.30)]},
+    "kidney beans": {"unit": "g", "per_serving": 60, "packs": [(500, 1.35), (2000, 4.49)]},
+    "cucumber": {"unit": "pc", "per_serving": 0.5, "packs": [(1, 0.59)]},
+    "chicken": {"unit": "g", "per_serving": 150, "packs": [(300, 2.40), (650, 4.50), (1000, 6.25)]},
+    "spices": {"unit": "g", "per_serving": 5, "packs": [(100, 1.49)]},
+    "paneer": {"unit": "g", "per_serving": 100, "packs": [(226, 2.00), (1000, 7.49)]},
+    "fish": {"unit": "g", "per_serving": 150, "packs": [(250, 2.95), (500, 5.25)]},
+    "lemon": {"unit": "pc", "per_serving": 0.5, "packs": [(1, 0.30), (4, 0.90)]},
+    "spinach": {"unit": "g", "per_serving": 100, "packs": [(240, 1.20), (1000, 2.50)]},
+    "chickpeas": {"unit": "g", "per_serving": 60, "packs": [(500, 1.20), (2000, 3.99)]},
+    "roasted chana": {"unit": "g", "per_serving": 30, "packs": [(300, 1.49), (1000, 3.99)]},
+    "apple": {"unit": "pc", "per_serving": 1, "packs": [(1, 0.35), (6, 1.60)]},
+    "jaggery": {"unit": "g", "per_serving": 20, "packs": [(500, 1.79), (1000, 2.99)]},
+    "buttermilk": {"unit": "ml", "per_serving": 250, "packs": [(500, 0.95), (1000, 1.60)]},
+    "makhana": {"unit": "g", "per_serving": 20, "packs": [(100, 1.99), (250, 3.99)]},
+}
+
+# Groups of interchangeable ingredients (same unit). The optimizer may buy any
+# member of a group to cover the combined need of the whole group.
+EQUIVALENTS = [
+    ["rice", "brown rice"],
+]
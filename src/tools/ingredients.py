@@ -0,0 +1,201 @@
+# src/tools/ingredients.py
+"""
+Canonical ingredient registry.
+
+Recipes use free-text ingredient names ("wheat", "whole wheat flour", "mixed veg").
+The registry maps every known alias to one small integer ID per canonical
+ingredient, with interned canonical and display names, so downstream code can
+count, hash and compare plain ints instead of strings.
+
+Lookup of a raw name goes:
+1. exact match on the normalised text (hash lookup, cached),
+2. singular form of the last word ("onions" -> "onion"),
+3. longest alias in the phrase via a word trie, provided every other word
+   is a known modifier (MODIFIERS: "finely chopped onion" -> onion,
+   "organic whole wheat flour" -> whole wheat flour). A phrase that names a
+   different product ("rice flour", "peanut oil", "chicken stock") does not
+   match, so it is never merged into - or priced as - the base ingredient.
+
+`intern()` registers names that still do not match as new canonical entries,
+so nothing is ever dropped from a grocery list.
+"""
+
+import re
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.tools.recipe_templates import DISPLAY_NAMES
+
+# Canonical name -> extra aliases. Canonical names are the DISPLAY_NAMES keys.
+ALIASES = {
+    "poha": ["flattened rice", "beaten rice", "aval"],
+    "peanuts": ["peanut", "groundnuts", "groundnut", "moongphali"],
+    "oats": ["oatmeal", "rolled oats"],
+    "onion": ["pyaz", "pyaaz"],
+    "turmeric": ["haldi", "turmeric powder"],
+    "eggs": ["egg", "anda"],
+    "tomato": ["tomatoes", "tamatar"],
+    "semolina": ["sooji", "suji", "rava", "rawa"],
+    "peas": ["green peas", "matar", "mutter"],
+    "mustard seeds": ["mustard seed", "rai", "sarson"],
+    "curd": ["dahi", "yogurt", "yoghurt"],
+    "whole wheat flour": ["wheat", "atta", "wheat flour", "chapati flour", "whole wheat"],
+    "flour": ["maida", "plain flour", "all purpose flour", "refined flour"],
+    "lentils": ["dal", "daal", "dhal", "toor dal", "moong dal", "masoor dal", "lentil"],
+    "rice": ["white rice", "basmati rice", "chawal"],
+    "mixed vegetables": ["mixed veg", "mix veg", "veg", "vegetables", "sabzi", "mixed vegetable"],
+    "kidney beans": ["rajma", "kidney bean", "red kidney beans"],
+    "spices": ["masala", "garam masala", "spice mix"],
+    "paneer": ["cottage cheese", "indian cottage cheese"],
+    "lemon": ["nimbu"],
+    "spinach": ["palak"],
+    "chickpeas": ["chickpea", "chole", "kabuli chana", "garbanzo beans"],
+    "roasted chana": ["roasted gram", "bhuna chana"],
+    "jaggery": ["gur", "gud"],
+    "buttermilk": ["chaas", "chhaas"],
+    "makhana": ["fox nuts", "lotus seeds"],
+}
+
+# Words that describe how an ingredient is bought or prepared without making it a
+# different product; only these may surround an alias in a phrase match. Colours are
+# left out: "red rice", "green onion" and "yellow lentils" are products of their own.
+MODIFIERS = frozenset({
+    "fresh", "freshly", "finely", "roughly", "thinly", "chopped", "diced", "sliced", "minced",
+    "grated", "crushed", "peeled", "soaked", "boiled", "cooked", "raw", "organic", "ripe",
+    "large", "small", "medium", "big",
+})
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+# Raw names cached per registry before the cache is reset.
+CACHE_LIMIT = 100_000
+
+
+def normalize(raw: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace: ' Whole-Wheat  Flour ' -> 'whole wheat flour'."""
+    return " ".join(_NON_WORD_RE.sub(" ", raw.lower()).split())
+
+
+def _singular(word: str) -> str:
+    if word.endswith("oes") or word.endswith("ches"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+class IngredientRegistry:
+    """Maps ingredient aliases to integer IDs with interned canonical and display names."""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.display_names: List[str] = []
+        self._aliases: Dict[str, int] = {}
+        self._trie: Dict = {}
+        self._cache: Dict[str, Optional[int]] = {}
+        self._tuple_cache: Dict[Tuple[str, ...], Tuple[int, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, canonical: str, display: Optional[str] = None, aliases: Sequence[str] = ()) -> int:
+        """Register a canonical ingredient (or return its existing ID) and attach aliases."""
+        key = normalize(canonical)
+        iid = self._aliases.get(key)
+        if iid is None or self.names[iid] != key:
+            iid = len(self.names)
+            self.names.append(sys.intern(key))
+            self.display_names.append(sys.intern(display or key.capitalize()))
+            self.add_alias(key, iid)
+        for alias in aliases:
+            self.add_alias(alias, iid)
+        return iid
+
+    def add_alias(self, alias: str, iid: int):
+        """Point an alias at an existing ID (exact lookup + word trie)."""
+        key = normalize(alias)
+        if not key:
+            return
+        self._aliases[key] = iid
+        node = self._trie
+        for word in key.split():
+            node = node.setdefault(word, {})
+        node[None] = iid
+        self._cache.clear()
+        self._tuple_cache.clear()
+
+    def _trie_match(self, words: List[str]) -> Optional[int]:
+        """Longest alias whose surrounding words are all MODIFIERS."""
+        n = len(words)
+        # suffix_ok[i]: words[i:] are all modifiers
+        suffix_ok = [True] * (n + 1)
+        for i in range(n - 1, -1, -1):
+            suffix_ok[i] = suffix_ok[i + 1] and words[i] in MODIFIERS
+        best_len, best = 0, None
+        for start in range(n):
+            node = self._trie
+            for pos in range(start, n):
+                node = node.get(words[pos]) or node.get(_singular(words[pos]))
+                if node is None:
+                    break
+                if None in node and suffix_ok[pos + 1] and pos - start + 1 > best_len:
+                    best_len, best = pos - start + 1, node[None]
+            if words[start] not in MODIFIERS:
+                break  # a non-modifier word may only start the alias itself
+        return best
+
+    def lookup(self, raw: str) -> Optional[int]:
+        """Return the ID for a raw ingredient name, or None if nothing matches."""
+        try:
+            return self._cache[raw]
+        except KeyError:
+            pass
+        key = normalize(raw)
+        iid = self._aliases.get(key)
+        if iid is None and key:
+            words = key.split()
+            iid = self._aliases.get(" ".join(words[:-1] + [_singular(words[-1])]))
+            if iid is None:
+                iid = self._trie_match(words)
+        if len(self._cache) >= CACHE_LIMIT:
+            self._cache.clear()
+        self._cache[raw] = iid
+        return iid
+
+    def intern(self, raw: str) -> int:
+        """Return the ID for a raw name, registering it as a new canonical ingredient if unknown."""
+        iid = self.lookup(raw)
+        if iid is None:
+            iid = self.add(raw)
+        return iid
+
+    def ids_for(self, ingredients: Sequence[str]) -> Tuple[int, ...]:
+        """IDs for a recipe's ingredient list (cached per list, order kept, duplicates merged)."""
+        key = tuple(ingredients)
+        ids = self._tuple_cache.get(key)
+        if ids is None:
+            ids = tuple(dict.fromkeys(self.intern(name) for name in key))
+            self._tuple_cache[key] = ids
+        return ids
+
+    def name(self, iid: int) -> str:
+        return self.names[iid]
+
+    def display_name(self, iid: int) -> str:
+        return self.display_names[iid]
+
+
+def _default_registry() -> IngredientRegistry:
+    registry = IngredientRegistry()
+    for canonical, display in DISPLAY_NAMES.items():
+        registry.add(canonical, display, ALIASES.get(canonical, ()))
+    return registry
+
+
+# Shared process-wide registry.
+REGISTRY = _default_registry()
+
+
+def canonical_name(raw: str) -> str:
+    """Canonical name for a raw ingredient ('wheat' -> 'whole wheat flour')."""
+    return REGISTRY.name(REGISTRY.intern(raw))
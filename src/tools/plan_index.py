@@ -0,0 +1,531 @@
+# src/tools/plan_index.py
+"""
+Inverted index over saved meal plans.
+
+Every meal in a plan becomes one posting: (user, day, meal type). Postings are
+indexed under terms such as:
+- ingredient:chicken   (canonicalised: ingredient:dal matches recipes listing 'lentils')
+- recipe:"dal + brown rice + sabzi"
+- meal:lunch          (snack_1 / snack_2 are also indexed as meal:snack)
+- day:2               (the 1-based 'day' value stored in the plan)
+- user:<user id>
+
+Queries are boolean expressions over terms, e.g.
+    ingredient:chicken AND day:2
+    ingredient:peanuts OR ingredient:"peanut butter"
+    meal:lunch AND NOT ingredient:rice
+Adjacent terms without an operator are ANDed.
+
+Postings are slots in flat columns; each plan starts on a multiple of 8 slots,
+so every byte of a slot bitmap belongs to one user. A term's postings are a
+sorted slot array while the term is rare and a bitmap once it covers more than
+1/DENSE_RATIO of the slots. Queries run on bitmaps as Python ints, so AND, OR
+and AND NOT are single C-level operations over the whole index; NOT is always
+a difference against the other terms of its AND (or against the live-posting
+bitmap), never a set of every posting id. Matching users come from the
+result's non-zero bytes (one owner per byte).
+
+The index is built incrementally (`add_plan`) - re-adding a user replaces
+their previous plan, whose slots are simply dropped from the live bitmap -
+and is saved as a single compact file: columns as raw arrays, each term
+delta-encoded (arrays) or as a bitmap, zlib compressed. Terms are only
+decoded when a query first touches them, and their packed form is kept, so a
+save only re-packs the terms that changed since the last save or load.
+Replaced plans are compacted away on save once they make up more than
+COMPACT_FRACTION of the slots. `snapshot()` captures the index cheaply so the
+file can be written from another thread while indexing carries on.
+"""
+
+import json
+import os
+import re
+import struct
+import zlib
+from array import array
+from collections import OrderedDict
+from itertools import accumulate, chain, compress
+from operator import sub
+from typing import Dict, List, Tuple, Union
+
+from src.tools.ingredients import REGISTRY
+
+MAGIC = b"DFPI2\n"
+
+# A term becomes a bitmap once it has more than 1/DENSE_RATIO of the slots (and DENSE_MIN postings).
+DENSE_RATIO = 32
+DENSE_MIN = 1024
+# Term bitmaps kept decoded as ints for queries.
+CACHE_TERMS = 256
+# Saving compacts first once replaced plans hold more than this fraction of the slots.
+COMPACT_FRACTION = 0.5
+
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|([A-Za-z_]+):(?:"([^"]*)"|([^\s()]+))|(\S+))')
+
+# term postings: sorted slot ids, a slot bitmap, or (straight after load) the packed blob
+Postings = Union[array, bytearray, bytes]
+
+
+def _term(field: str, value) -> str:
+    field = field.lower()
+    value = str(value).strip().lower()
+    if field == "ingredient":
+        iid = REGISTRY.lookup(value)
+        if iid is not None:
+            value = REGISTRY.name(iid)
+    return f"{field}:{value}"
+
+
+def _meal_terms(meal_type: str) -> Tuple[str, ...]:
+    """meal:<type>, plus meal:snack for snack_1 / snack_2."""
+    if meal_type.startswith("snack"):
+        return _term("meal", meal_type), _term("meal", "snack")
+    return (_term("meal", meal_type),)
+
+
+def _bitmap(ids: array) -> bytearray:
+    bits = bytearray((ids[-1] >> 3) + 1 if ids else 0)
+    for pid in ids:
+        bits[pid >> 3] |= 1 << (pid & 7)
+    return bits
+
+
+def _pack_postings(ids: Union[array, bytearray]) -> bytes:
+    if isinstance(ids, bytearray):
+        return b"B" + zlib.compress(ids, 1)
+    deltas = array("I", map(sub, ids, chain((0,), ids)))
+    return b"A" + zlib.compress(deltas.tobytes(), 1)
+
+
+def _unpack_postings(blob: bytes) -> Union[array, bytearray]:
+    raw = zlib.decompress(blob[1:])
+    if blob[:1] == b"B":
+        return bytearray(raw)
+    deltas = array("I")
+    deltas.frombytes(raw)
+    return array("I", accumulate(deltas))
+
+
+class PlanIndex:
+    """Incrementally built inverted index from terms to (user, day, meal) postings."""
+
+    def __init__(self):
+        self.users: List[str] = []
+        self._user_ids: Dict[str, int] = {}
+        self.meal_types: List[str] = []
+        self._meal_ids: Dict[str, int] = {}
+        self._meal_terms: List[Tuple[str, ...]] = []  # meal id -> its meal: terms
+        # slot columns, indexed by posting id (padding slots are never live)
+        self.p_user = array("I")
+        self.p_day = array("H")
+        self.p_meal = array("B")
+        self._owner = array("I")    # user of each 8-slot byte
+        self._live = bytearray()    # bitmap of postings that belong to a current plan
+        self._live_count = 0
+        self._deleted = 0           # postings of replaced plans still in the columns
+        self._terms: Dict[str, Postings] = {}
+        self._user_postings: Dict[int, Tuple[int, int]] = {}  # uid -> [start, stop) of live postings
+        self._recipe_terms: Dict[Tuple, Tuple[str, ...]] = {}
+        self._cache: "OrderedDict[str, int]" = OrderedDict()  # term -> bitmap as int
+        self._live_bits = None
+        self._changes = 0                     # bumped by every add_plan / compact
+        self._packed: Dict[str, bytes] = {}   # term -> blob, for terms unchanged since it was packed
+        self._changed: Dict[str, int] = {}    # term -> self._changes when it last changed
+
+    def __len__(self) -> int:
+        """Number of live postings."""
+        return self._live_count
+
+    # ---------- building ----------
+
+    def _postings(self, term: str) -> Union[array, bytearray]:
+        ids = self._terms.get(term)
+        if ids is None:
+            ids = self._terms[term] = array("I")
+        elif isinstance(ids, bytes):
+            ids = self._terms[term] = _unpack_postings(ids)
+        return ids
+
+    def _add_postings(self, term: str, pids: List[int]):
+        """Append a plan's (ascending) postings to a term."""
+        ids = self._postings(term)
+        self._packed.pop(term, None)
+        self._changed[term] = self._changes
+        if isinstance(ids, bytearray):
+            last = pids[-1] >> 3
+            if last >= len(ids):
+                ids.extend(bytes(last + 1 - len(ids)))
+            for pid in pids:
+                ids[pid >> 3] |= 1 << (pid & 7)
+            return
+        ids.extend(pids)
+        if len(ids) >= DENSE_MIN and len(ids) * DENSE_RATIO > len(self.p_user):
+            self._terms[term] = _bitmap(ids)
+
+    def _terms_for_recipe(self, recipe: Dict) -> Tuple[str, ...]:
+        """Recipe and ingredient terms for a recipe (cached: catalogs repeat the same recipes)."""
+        key = (recipe.get("name", ""), tuple(recipe.get("ingredients", [])))
+        terms = self._recipe_terms.get(key)
+        if terms is None:
+            terms = (_term("recipe", key[0]),) + tuple(_term("ingredient", ing) for ing in key[1])
+            self._recipe_terms[key] = terms
+        return terms
+
+    def add_plan(self, user_id: str, plan: Dict):
+        """Index every meal of `plan` for `user_id`, replacing any plan indexed earlier for that user."""
+        self._changes += 1
+        uid = self._user_ids.get(user_id)
+        if uid is None:
+            uid = self._user_ids[user_id] = len(self.users)
+            self.users.append(user_id)
+        if uid in self._user_postings:
+            old_start, old_stop = self._user_postings[uid]
+            # plans start on a byte, and the bits after `stop` in its last byte are padding
+            self._live[old_start >> 3:(old_stop + 7) >> 3] = bytes(((old_stop + 7) >> 3) - (old_start >> 3))
+            self._live_count -= old_stop - old_start
+            self._deleted += old_stop - old_start
+
+        start = len(self.p_user)
+        postings: Dict[str, List[int]] = {}  # term -> this plan's posting ids
+        user_term = _term("user", user_id)
+        for day in plan.get("days", []):
+            day_no = day["day"]
+            day_term = _term("day", day_no)
+            for meal in day.get("meals", []):
+                meal_type = meal["type"]
+                mid = self._meal_ids.get(meal_type)
+                if mid is None:
+                    mid = self._meal_ids[meal_type] = len(self.meal_types)
+                    self.meal_types.append(meal_type)
+                    self._meal_terms.append(_meal_terms(meal_type))
+                pid = len(self.p_user)
+                self.p_user.append(uid)
+                self.p_day.append(day_no)
+                self.p_meal.append(mid)
+
+                for term in chain((user_term, day_term), self._meal_terms[mid],
+                                  self._terms_for_recipe(meal.get("recipe", {}))):
+                    pids = postings.get(term)
+                    if pids is None:
+                        postings[term] = [pid]
+                    elif pids[-1] != pid:  # a recipe may list an ingredient twice
+                        pids.append(pid)
+        for term, pids in postings.items():
+            self._add_postings(term, pids)
+        stop = len(self.p_user)
+        pad = -stop % 8
+        self.p_user.extend(array("I", [uid]) * pad)
+        self.p_day.extend(array("H", [0]) * pad)
+        self.p_meal.extend(array("B", [0]) * pad)
+        n_bytes = len(self.p_user) >> 3
+        self._owner.extend(array("I", [uid]) * (n_bytes - len(self._owner)))
+        full, rest = divmod(stop - start, 8)
+        self._live.extend(b"\xff" * full + (bytes([(1 << rest) - 1]) if rest else b""))
+        self._live_count += stop - start
+        self._user_postings[uid] = (start, stop)
+
+        # the old plan's postings stay in the term bitmaps; the live mask hides them
+        for term in postings:
+            self._cache.pop(term, None)
+        self._live_bits = None
+
+    def compact(self):
+        """Drop the slots of replaced plans and renumber the rest (8-slot aligned, so bitmaps move bytewise)."""
+        if not self._deleted:
+            return
+        n_bytes = len(self._owner)
+        new_byte = array("i", [-1]) * n_bytes
+        runs, placed = [], 0  # (old first byte, old stop byte), copied in order
+        user_postings = {}
+        for uid, (start, stop) in sorted(self._user_postings.items(), key=lambda item: item[1]):
+            first, last = start >> 3, (stop + 7) >> 3
+            user_postings[uid] = (placed << 3, (placed << 3) + stop - start)
+            if last > first:
+                if runs and runs[-1][1] == first:
+                    runs[-1][1] = last
+                else:
+                    runs.append([first, last])
+                for byte in range(first, last):
+                    new_byte[byte] = placed + byte - first
+                placed += last - first
+
+        def keep(column):
+            step = 8 if len(column) != n_bytes else 1
+            out = column[:0]
+            for first, last in runs:
+                out += column[first * step:last * step]
+            return out
+
+        self.p_user, self.p_day, self.p_meal = keep(self.p_user), keep(self.p_day), keep(self.p_meal)
+        self._owner, self._live = keep(self._owner), keep(self._live)
+        for term in list(self._terms):
+            ids = self._postings(term)
+            if isinstance(ids, bytearray):
+                ids.extend(bytes(n_bytes - len(ids)))
+                ids = keep(ids)
+                live = ids.rstrip(b"\0")
+            else:
+                ids = live = array("I", [(new_byte[pid >> 3] << 3) | (pid & 7)
+                                         for pid in ids if new_byte[pid >> 3] >= 0])
+            if live:
+                self._terms[term] = ids
+            else:
+                del self._terms[term]
+        self._user_postings = user_postings
+        self._deleted = 0
+        self._cache.clear()
+        self._live_bits = None
+        # every posting moved: no packed blob is current any more
+        self._changes += 1
+        self._packed.clear()
+        self._changed = dict.fromkeys(self._terms, self._changes)
+
+    # ---------- persistence ----------
+
+    def snapshot(self) -> "IndexSnapshot":
+        """
+        Capture the index for writing (compacting first past COMPACT_FRACTION).
+        Cheap: columns and postings only grow until the next compaction, which
+        replaces them, so the snapshot keeps references and lengths; only the
+        live bitmap and the small per-user tables are copied.
+        """
+        if self._deleted > COMPACT_FRACTION * len(self.p_user):
+            self.compact()
+        return IndexSnapshot(self)
+
+    def keep_packed(self, snapshot: "IndexSnapshot"):
+        """Reuse the blobs a written snapshot packed, for terms that have not changed since."""
+        for term, blob in snapshot.packed.items():
+            if term in self._terms and self._changed.get(term, 0) <= snapshot.changes:
+                self._packed[term] = blob
+                self._changed.pop(term, None)
+
+    def save(self, filepath: str = "plan_index.bin") -> str:
+        """Write the index to a single binary file."""
+        snapshot = self.snapshot()
+        snapshot.write(filepath)
+        self.keep_packed(snapshot)
+        return filepath
+
+    @classmethod
+    def load(cls, filepath: str = "plan_index.bin") -> "PlanIndex":
+        """Load an index written by `save`. Term postings stay packed until used."""
+        with open(filepath, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{filepath} is not a plan index file (or was written by an older version)")
+        pos = len(MAGIC)
+        (header_len,) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        header = json.loads(data[pos:pos + header_len].decode("utf-8"))
+        pos += header_len
+
+        index = cls()
+        index.users = header["users"]
+        index._user_ids = {user: uid for uid, user in enumerate(index.users)}
+        index.meal_types = header["meal_types"]
+        index._meal_ids = {meal: mid for mid, meal in enumerate(index.meal_types)}
+        index._meal_terms = [_meal_terms(meal) for meal in index.meal_types]
+        index._user_postings = {uid: (start, stop) for uid, start, stop in header["user_postings"]}
+        index._live_count, index._deleted = header["live"], header["deleted"]
+        n = header["slots"]
+        for column, count in ((index.p_user, n), (index.p_day, n), (index.p_meal, n), (index._owner, n >> 3)):
+            size = count * column.itemsize
+            column.frombytes(data[pos:pos + size])
+            pos += size
+        index._live = bytearray(data[pos:pos + (n >> 3)])
+        pos += n >> 3
+        for term, offset, length in header["terms"]:
+            index._terms[term] = index._packed[term] = data[pos + offset:pos + offset + length]
+        return index
+
+    # ---------- queries ----------
+
+    def _term_bits(self, term: str) -> int:
+        bits = self._cache.get(term)
+        if bits is not None:
+            self._cache.move_to_end(term)
+            return bits
+        ids = self._postings(term) if term in self._terms else array("I")
+        bits = int.from_bytes(ids if isinstance(ids, bytearray) else _bitmap(ids), "little")
+        self._cache[term] = bits
+        if len(self._cache) > CACHE_TERMS:
+            self._cache.popitem(last=False)
+        return bits
+
+    def _live_mask(self) -> int:
+        if self._live_bits is None:
+            self._live_bits = int.from_bytes(self._live, "little")
+        return self._live_bits
+
+    def _parse(self, query: str):
+        tokens = []
+        pos = 0
+        while pos < len(query):
+            m = _TOKEN_RE.match(query, pos)
+            if not m or m.end() == pos:
+                break
+            pos = m.end()
+            lparen, rparen, field, quoted, bare, word = m.groups()
+            if lparen:
+                tokens.append(("(", None))
+            elif rparen:
+                tokens.append((")", None))
+            elif field:
+                tokens.append(("TERM", _term(field, quoted if quoted is not None else bare)))
+            elif word.upper() in ("AND", "OR", "NOT"):
+                tokens.append((word.upper(), None))
+            else:
+                raise ValueError(f"Unexpected token {word!r} in query (terms look like field:value)")
+        if query[pos:].strip():
+            raise ValueError(f"Could not parse query near {query[pos:]!r}")
+
+        def peek():
+            return tokens[0][0] if tokens else None
+
+        def parse_or():
+            node = parse_and()
+            while peek() == "OR":
+                tokens.pop(0)
+                node = ("OR", node, parse_and())
+            return node
+
+        def parse_and():
+            node = parse_not()
+            while peek() in ("AND", "NOT", "TERM", "("):
+                if peek() == "AND":
+                    tokens.pop(0)
+                node = ("AND", node, parse_not())
+            return node
+
+        def parse_not():
+            if peek() == "NOT":
+                tokens.pop(0)
+                return ("NOT", parse_not())
+            return parse_primary()
+
+        def parse_primary():
+            if not tokens:
+                raise ValueError("Query ended unexpectedly")
+            kind, value = tokens.pop(0)
+            if kind == "TERM":
+                return ("TERM", value)
+            if kind == "(":
+                node = parse_or()
+                if peek() != ")":
+                    raise ValueError("Missing closing parenthesis in query")
+                tokens.pop(0)
+                return node
+            raise ValueError(f"Unexpected {kind} in query")
+
+        if not tokens:
+            raise ValueError("Empty query")
+        tree = parse_or()
+        if tokens:
+            raise ValueError(f"Unexpected {tokens[0][0]} in query")
+        return tree
+
+    def _eval(self, node) -> int:
+        kind = node[0]
+        if kind == "TERM":
+            return self._term_bits(node[1])
+        if kind == "OR":
+            return self._eval(node[1]) | self._eval(node[2])
+        # AND (a lone NOT is an AND with no positive terms): AND the positives,
+        # then subtract the negatives from that; only without positives is the
+        # live-posting bitmap the starting point
+        positives, negatives, stack = [], [], [node]
+        while stack:
+            n = stack.pop()
+            if n[0] == "AND":
+                stack.extend(n[1:])
+            elif n[0] == "NOT":
+                negatives.append(n[1])
+            else:
+                positives.append(n)
+        result = None
+        for n in positives:
+            bits = self._eval(n)
+            result = bits if result is None else result & bits
+            if not result:
+                return 0
+        if result is None:
+            result = self._live_mask()
+        for n in negatives:
+            result &= ~self._eval(n)
+            if not result:
+                return 0
+        return result
+
+    def _matches(self, query: str) -> bytes:
+        """Bitmap (one bit per slot) of the live postings matching `query`."""
+        bits = self._eval(self._parse(query)) & self._live_mask()
+        return bits.to_bytes(len(self._live), "little")
+
+    def search(self, query: str) -> List[Tuple[str, int, str]]:
+        """Return matching (user, day, meal type) postings, in indexing order."""
+        matches = self._matches(query)
+        out = []
+        for byte in compress(range(len(matches)), matches):
+            bits, base = matches[byte], byte << 3
+            for bit in range(8):
+                if bits >> bit & 1:
+                    pid = base + bit
+                    out.append((self.users[self.p_user[pid]], self.p_day[pid], self.meal_types[self.p_meal[pid]]))
+        return out
+
+    def users_matching(self, query: str) -> List[str]:
+        """Return the distinct users with at least one matching meal."""
+        return sorted(self.users[uid] for uid in set(compress(self._owner, self._matches(query))))
+
+    def count_plans(self, query: str) -> int:
+        """Number of indexed plans (users) with at least one matching meal."""
+        return len(set(compress(self._owner, self._matches(query))))
+
+
+class IndexSnapshot:
+    """A point-in-time copy of a PlanIndex that can be written from another thread."""
+
+    def __init__(self, index: PlanIndex):
+        self.changes = index._changes
+        self.slots = len(index.p_user)
+        self.header = {
+            "users": index.users[:],
+            "meal_types": index.meal_types[:],
+            "user_postings": [[uid, start, stop] for uid, (start, stop) in index._user_postings.items()],
+            "slots": self.slots,
+            "live": index._live_count,
+            "deleted": index._deleted,
+        }
+        # (column, length): columns only grow until a compaction replaces them
+        self.columns = [(column, self.slots) for column in (index.p_user, index.p_day, index.p_meal)]
+        self.columns.append((index._owner, self.slots >> 3))
+        self.live = bytes(index._live)
+        # packed blob, or (postings, length) to pack while writing
+        self.terms = {term: index._packed.get(term) or (ids, len(ids)) for term, ids in index._terms.items()}
+        self.packed: Dict[str, bytes] = {}  # blobs packed by write(), for PlanIndex.keep_packed
+
+    def write(self, filepath: str) -> str:
+        """Pack the changed terms and write the file (via a temporary file, so readers never see half of it)."""
+        n_bytes = self.slots >> 3
+        blobs, terms, offset = [], [], 0
+        for term in sorted(self.terms):
+            blob = self.terms[term]
+            if not isinstance(blob, bytes):
+                ids, length = blob
+                blob = self.packed[term] = _pack_postings(ids[:n_bytes if isinstance(ids, bytearray) else length])
+            terms.append([term, offset, len(blob)])
+            blobs.append(blob)
+            offset += len(blob)
+        header = json.dumps(dict(self.header, terms=terms)).encode("utf-8")
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for column, length in self.columns:
+                f.write(column[:length].tobytes())
+            f.write(self.live)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp_path, filepath)
+        return filepath
@@ -0,0 +1,423 @@
+# src/tools/plan_validation.py
+"""
+Cohort-wide nutrition totals and plan validation.
+
+Meal nutrition from many plans is summed per day while packing and stored
+column-wise in flat arrays (calories, protein, fat, carbs per plan day),
+with CSR-style offsets marking where each week and plan starts. Totals and
+deviations are then computed in whole-column passes: one prefix sum
+(itertools.accumulate) per column, with every week or plan total taken as
+the difference of two prefix sums at its offsets, instead of walking nested
+plan dicts or slicing per user.
+Large cohorts can be packed in shards (e.g. one per worker) and joined
+with CohortNutrition.extend().
+
+Checks:
+- per-day and per-week totals against daily targets (macro_split_daily),
+- diet-constraint violations: meat for vegetarian/vegan users, and
+  ingredients the user excludes ("no onion", "without peanuts"),
+- outlier users: any violation, a weekly calorie deviation beyond tolerance,
+  or a macro deviation far (in z-score) from the rest of the cohort.
+
+Meals are counted as served: the analysed per-serving nutrition times the
+meal's 'servings' (1 when absent). calories_targeted is not used, so a plan
+whose portions do not add up to its target shows up as a deviation.
+
+Usage:
+    cohort = CohortNutrition()
+    for user_id, profile in store.iter_profiles():
+        cohort.add_plan(user_id, plan_for[user_id], daily_targets(profile))
+    report = validate_cohort(cohort)
+
+    python -m src.tools.plan_validation --plans plans --db profiles.db
+"""
+
+import argparse
+import glob
+import heapq
+import json
+import math
+import os
+import re
+from array import array
+from itertools import accumulate, chain, repeat
+from operator import gt, lt
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from src.core.calorie_calc import bmr_mifflin_st_jeor, calorie_target_for_goal, macro_split_daily, tdee_from_bmr
+from src.core.user_profile import UserProfile
+from src.tools.ingredients import REGISTRY, normalize
+
+FIELDS = ("calories", "protein_g", "fat_g", "carbs_g")
+
+# Allowed relative deviation from the daily/weekly target, per field.
+TOLERANCE = {"calories": 0.10, "protein_g": 0.20, "fat_g": 0.25, "carbs_g": 0.25}
+
+OUTLIER_Z = 3.0
+# ...and at least this far (absolute) from the cohort mean deviation, so rounding noise is never flagged.
+MIN_OUTLIER_GAP = 0.05
+
+_NAN = float("nan")
+# Exclusions: "no peanuts or tree nuts", "without onion & garlic", "peanut allergy", "nut-free".
+_CLAUSE_SPLIT_RE = re.compile(r"[,;/.()]")
+_EXCLUDE_RE = re.compile(r"\b(?:no|without|avoid|exclude|excluding|allergic to)\s+([a-z][a-z &'-]*)")
+_ALLERGY_RE = re.compile(r"([a-z][a-z &'-]*?)[\s-]*\b(?:allergy|allergies|allergic|intolerance|intolerant|free)\b")
+_ITEM_SPLIT_RE = re.compile(r"\s+(?:and|or|nor)\s+|&")
+_DIET_WORDS = frozenset({"veg", "vegetarian", "vegan", "non veg", "nonveg", "eggetarian", "meat", "diet"})
+
+# (forbidden tags, forbidden ingredient IDs)
+DietRules = Tuple[FrozenSet[str], FrozenSet[int]]
+
+
+def excluded_ingredients(preference: Optional[str]) -> Tuple[FrozenSet[int], Tuple[str, ...]]:
+    """
+    Ingredient IDs a free-text preference excludes, plus the excluded items that did
+    not resolve to any known ingredient (callers that must keep allergens out refuse
+    to plan when that is not empty). An item that is not a known name as a whole
+    excludes every word of it that is ("peanut butter" -> peanuts).
+    """
+    if not preference:
+        return frozenset(), ()
+    ids, unresolved = set(), []
+    for clause in _CLAUSE_SPLIT_RE.split(preference.lower()):
+        found = [m.group(1) for m in _EXCLUDE_RE.finditer(clause)]
+        found += [m.group(1) for m in _ALLERGY_RE.finditer(clause) if not _EXCLUDE_RE.search(m.group(1))]
+        for text in found:
+            for item in _ITEM_SPLIT_RE.split(text):
+                key = normalize(item)
+                if not key or key in _DIET_WORDS:
+                    continue
+                iid = REGISTRY.lookup(key)
+                words = [iid] if iid is not None else [REGISTRY.lookup(w) for w in key.split()]
+                matched = [w for w in words if w is not None]
+                if matched:
+                    ids.update(matched)
+                else:
+                    unresolved.append(key)
+    return frozenset(ids), tuple(unresolved)
+
+
+def diet_rules(preference: Optional[str]) -> DietRules:
+    """Parse a free-text dietary preference into forbidden recipe tags and ingredient IDs."""
+    if not preference:
+        return frozenset(), frozenset()
+    pref = preference.lower()
+    tags = set()
+    if ("veg" in pref or "vegan" in pref) and "non" not in pref:
+        tags.add("non-veg")
+    return frozenset(tags), excluded_ingredients(pref)[0]
+
+
+def daily_targets(profile: UserProfile) -> Dict[str, float]:
+    """Daily calorie and macro targets for a profile (same formulas as the coordinator)."""
+    bmr = bmr_mifflin_st_jeor(profile.sex, profile.weight_kg, profile.height_cm, profile.age)
+    tdee = tdee_from_bmr(bmr, profile.activity_level)
+    rate = profile.target_rate_kg_per_week if profile.target_rate_kg_per_week is not None else 0.5
+    target = calorie_target_for_goal(tdee, profile.goal, rate)
+    return macro_split_daily(target, profile.weight_kg)
+
+
+def _prefix_sums(values) -> List[float]:
+    """prefix[i] = sum(values[:i]), in one pass."""
+    return list(accumulate(values, initial=0.0))
+
+
+def _segment_sums(values, offsets, prefix: Optional[List[float]] = None) -> array:
+    """Sum of values[offsets[i]:offsets[i+1]] for every segment: differences of prefix sums at the offsets."""
+    if prefix is None:
+        prefix = _prefix_sums(values)
+    at = [prefix[offset] for offset in offsets]
+    return array("d", [stop - start for start, stop in zip(at, at[1:])])
+
+
+def _lengths(offsets) -> List[int]:
+    """Segment lengths of a CSR offset array."""
+    return [stop - start for start, stop in zip(offsets, offsets[1:])]
+
+
+def _expand(values, counts: List[int]) -> Sequence[float]:
+    """values[i] repeated counts[i] times, e.g. a per-plan target as one entry per plan day."""
+    k = counts[0] if counts else 0
+    if k and counts.count(k) == len(counts):
+        # every plan the same length (the usual 7 days): fill k strided slices
+        out = array("d", bytes(8 * k * len(counts)))
+        column = array("d", values)
+        for j in range(k):
+            out[j::k] = column
+        return out
+    return list(chain.from_iterable(map(repeat, values, counts)))  # a list builds ~3x faster than an array
+
+
+class CohortNutrition:
+    """Daily nutrition totals of many plans, packed column-wise."""
+
+    def __init__(self):
+        self.user_ids: List[str] = []
+        self.days = {field: array("d") for field in FIELDS}  # one entry per plan day
+        self.day_violations = array("H")       # diet-breaking meals per day
+        self.week_offsets = array("I", [0])    # days of week w: week_offsets[w]:week_offsets[w + 1]
+        self.plan_day_offsets = array("I", [0])
+        self.plan_week_offsets = array("I", [0])
+        self.targets = {field: array("d") for field in FIELDS}  # daily target per plan (NaN = unknown)
+        self.meal_count = 0
+        self._violation_cache: Dict[DietRules, Dict[Tuple[tuple, tuple], int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def add_plan(self, user_id: str, plan: Dict, targets: Optional[Dict[str, float]] = None):
+        """
+        Append one meal plan. `targets` is a macro_split_daily() dict; without it
+        only calories are checked, against plan["calorie_target"].
+        """
+        targets = targets or {}
+        calorie_target = targets.get("calorie_target", plan.get("calorie_target"))
+        for field, value in zip(FIELDS, (calorie_target, targets.get("protein_g"),
+                                         targets.get("fat_g"), targets.get("carbs_g"))):
+            self.targets[field].append(float(value) if value else _NAN)
+
+        rules = diet_rules((plan.get("user") or {}).get("dietary_preferences"))
+        breaks = self._violation_cache.setdefault(rules, {})
+        kcal_col, protein_col, fat_col, carbs_col = (self.days[f] for f in FIELDS)
+        violations = self.day_violations
+
+        days = plan.get("days", [])
+        for day in days:
+            kcal_sum = protein_sum = fat_sum = carbs_sum = 0.0
+            bad_meals = 0
+            meals = day.get("meals", [])
+            for meal in meals:
+                n = meal.get("nutrition") or {}
+                scale = meal.get("servings", 1)
+                kcal_sum += n.get("calories_per_serving", 0.0) * scale
+                protein_sum += n.get("protein_g", 0.0) * scale
+                fat_sum += n.get("fat_g", 0.0) * scale
+                carbs_sum += n.get("carbs_g", 0.0) * scale
+                recipe = meal.get("recipe") or {}
+                # keyed by contents, not name: plans from other catalogue versions reuse names
+                key = (tuple(recipe.get("ingredients", ())), tuple(recipe.get("tags", ())))
+                bad = breaks.get(key)
+                if bad is None:
+                    bad = breaks[key] = self._breaks(recipe, rules)
+                bad_meals += bad
+            kcal_col.append(kcal_sum)
+            protein_col.append(protein_sum)
+            fat_col.append(fat_sum)
+            carbs_col.append(carbs_sum)
+            violations.append(bad_meals)
+            self.meal_count += len(meals)
+
+        n_days = len(violations)
+        first_day = self.plan_day_offsets[-1]
+        self.week_offsets.extend(range(first_day + 7, n_days, 7))
+        if n_days > first_day:
+            self.week_offsets.append(n_days)
+        self.plan_day_offsets.append(n_days)
+        self.plan_week_offsets.append(len(self.week_offsets) - 1)
+        self.user_ids.append(user_id)
+
+    @staticmethod
+    def _breaks(recipe: Dict, rules: DietRules) -> int:
+        tags, ingredients = rules
+        if tags.intersection(recipe.get("tags", ())):
+            return 1
+        if ingredients and ingredients.intersection(REGISTRY.ids_for(recipe.get("ingredients", ()))):
+            return 1
+        return 0
+
+    def extend(self, other: "CohortNutrition"):
+        """Append another cohort, e.g. a shard packed in a worker process."""
+        day_base, week_base = len(self.day_violations), len(self.week_offsets) - 1
+        self.user_ids.extend(other.user_ids)
+        for field in FIELDS:
+            self.days[field].extend(other.days[field])
+            self.targets[field].extend(other.targets[field])
+        self.day_violations.extend(other.day_violations)
+        self.week_offsets.extend(offset + day_base for offset in other.week_offsets[1:])
+        self.plan_day_offsets.extend(offset + day_base for offset in other.plan_day_offsets[1:])
+        self.plan_week_offsets.extend(offset + week_base for offset in other.plan_week_offsets[1:])
+        self.meal_count += other.meal_count
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_violation_cache"] = {}  # DietRules hold registry IDs, only valid in this process
+        return state
+
+    # ---------- totals ----------
+
+    def day_totals(self, field: str) -> array:
+        return self.days[field]
+
+    def week_totals(self, field: str) -> array:
+        return _segment_sums(self.days[field], self.week_offsets)
+
+    def plan_totals(self, field: str) -> array:
+        return _segment_sums(self.days[field], self.plan_day_offsets)
+
+    def plan_violations(self) -> array:
+        """Number of diet-breaking meals per plan."""
+        return _segment_sums(self.day_violations, self.plan_day_offsets)
+
+
+def _cohort_stats(values) -> Tuple[float, float]:
+    """Mean and population std-dev of the non-NaN values."""
+    present = [v for v in values if v == v]
+    if not present:
+        return _NAN, 0.0
+    mean = math.fsum(present) / len(present)
+    var = math.fsum(v * v for v in present) / len(present) - mean * mean
+    return mean, math.sqrt(max(var, 0.0))
+
+
+def _days_out(cohort: CohortNutrition, i: int, field: str, tol: float) -> int:
+    """Days of plan i outside the field's tolerance (only needed for the listed outliers)."""
+    target = cohort.targets[field][i]
+    start, stop = cohort.plan_day_offsets[i], cohort.plan_day_offsets[i + 1]
+    hi, lo = 1 + tol, 1 - tol
+    return sum(1 for total in cohort.days[field][start:stop] if total > target * hi or total < target * lo)
+
+
+def validate_cohort(cohort: CohortNutrition, tolerance: Optional[Dict[str, float]] = None,
+                    outlier_z: float = OUTLIER_Z, max_listed: int = 100) -> Dict:
+    """
+    Validate every plan in the cohort. Returns a summary dict:
+    cohort-wide deviation stats per field, share of days within tolerance,
+    violation counts and the flagged (outlier) users, worst first.
+    """
+    tolerance = {**TOLERANCE, **(tolerance or {})}
+    n_plans = len(cohort)
+    days_per_plan = _lengths(cohort.plan_day_offsets)
+    days_per_week = _lengths(cohort.week_offsets)
+    weeks_per_plan = _lengths(cohort.plan_week_offsets)
+    one_week_plans = cohort.week_offsets == cohort.plan_day_offsets  # the common case: skip the week pass
+
+    fields = {}
+    flags = {}  # field -> (mean daily deviation per plan, mean |weekly deviation| per plan, mean, std)
+    for field in FIELDS:
+        targets = cohort.targets[field]
+        days = cohort.days[field]
+        hi, lo = 1 + tolerance[field], 1 - tolerance[field]
+
+        # unknown targets are NaN: every comparison with them is False and every quotient NaN
+        days_out = (sum(map(gt, days, _expand([target * hi for target in targets], days_per_plan)))
+                    + sum(map(lt, days, _expand([target * lo for target in targets], days_per_plan))))
+        checked_days = sum(n for n, target in zip(days_per_plan, targets) if target == target)
+
+        prefix = _prefix_sums(days)
+        plan_totals = _segment_sums(days, cohort.plan_day_offsets, prefix)
+        plan_dev = [(total / n - target) / target if n else _NAN
+                    for total, n, target in zip(plan_totals, days_per_plan, targets)]
+
+        if one_week_plans:
+            # a one-week plan's weekly deviation is its mean daily deviation, unsigned
+            plan_week_dev = list(map(abs, plan_dev))
+        else:
+            week_totals = _segment_sums(days, cohort.week_offsets, prefix)
+            week_targets = [target * n for target, n in zip(_expand(targets, weeks_per_plan), days_per_week)]
+            week_dev = [abs(total - target) / target for total, target in zip(week_totals, week_targets)]
+            plan_week_dev = [total / n if n else _NAN
+                             for total, n in zip(_segment_sums(week_dev, cohort.plan_week_offsets), weeks_per_plan)]
+
+        mean, std = _cohort_stats(plan_dev)
+        fields[field] = {
+            "mean_deviation": round(mean, 4) if mean == mean else None,
+            "std_deviation": round(std, 4),
+            "days_checked": checked_days,
+            "days_within_tolerance": round(1 - days_out / checked_days, 4) if checked_days else None,
+        }
+        flags[field] = (plan_dev, plan_week_dev, mean, std)
+
+    violations = cohort.plan_violations()
+
+    # severity per plan (0 = fine); unknown (NaN) deviations never count
+    tol_cal = tolerance["calories"]
+    calorie_week_dev = flags["calories"][1]
+    gaps = {field: max(outlier_z * std, MIN_OUTLIER_GAP) for field, (_, _, _, std) in flags.items()}
+    severity = [10.0 * v for v in violations]
+    severity = [score + (dev - tol_cal) / tol_cal if dev > tol_cal else score
+                for score, dev in zip(severity, calorie_week_dev)]
+    for field, (plan_dev, _, mean, _) in flags.items():
+        if mean != mean:  # no plan has this target
+            continue
+        excess = [abs(dev - mean) / gaps[field] - 1 for dev in plan_dev]
+        severity = [score + e if e > 0 else score for score, e in zip(severity, excess)]  # False for NaN
+    flagged = [i for i in range(n_plans) if severity[i]]
+    worst = heapq.nlargest(max_listed, flagged, key=severity.__getitem__)
+
+    outliers = []
+    for i in worst:
+        reasons = []
+        if violations[i]:
+            reasons.append(f"{int(violations[i])} meal(s) break the diet")
+        if calorie_week_dev[i] > tol_cal:
+            reasons.append(f"weekly calories off by {calorie_week_dev[i]:.0%}")
+        for field, (plan_dev, _, mean, _) in flags.items():
+            if abs(plan_dev[i] - mean) > gaps[field]:
+                reasons.append(f"{field} {plan_dev[i]:+.0%} vs cohort {mean:+.0%}")
+        outliers.append({
+            "user_id": cohort.user_ids[i],
+            "severity": round(severity[i], 3),
+            "reasons": reasons,
+            "deviation": {f: round(flags[f][0][i], 4) if flags[f][0][i] == flags[f][0][i] else None
+                          for f in FIELDS},
+            "days_out_of_tolerance": {f: _days_out(cohort, i, f, tolerance[f]) for f in FIELDS},
+            "violations": int(violations[i]),
+        })
+
+    return {
+        "plans": n_plans,
+        "days": len(cohort.day_violations),
+        "meals": cohort.meal_count,
+        "fields": fields,
+        "violations": int(sum(violations)),
+        "plans_with_violations": sum(1 for v in violations if v),
+        "outlier_count": len(flagged),
+        "outliers": outliers,
+    }
+
+def load_cohort(plans_dir: str, profiles: Optional[Iterable[Tuple[str, UserProfile]]] = None) -> CohortNutrition:
+    """
+    Pack <plans_dir>/<user_id>/meal_plan.json files (as written by the replan daemon).
+    Profiles, when given, supply macro targets; otherwise only calories are checked.
+    """
+    targets = {user_id: daily_targets(profile) for user_id, profile in profiles or ()}
+    cohort = CohortNutrition()
+    for path in sorted(glob.glob(os.path.join(plans_dir, "*", "meal_plan.json"))):
+        user_id = os.path.basename(os.path.dirname(path))
+        with open(path, "r", encoding="utf-8") as f:
+            cohort.add_plan(user_id, json.load(f), targets.get(user_id))
+    return cohort
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Validate generated meal plans against nutrition targets.")
+    parser.add_argument("--plans", default="plans", help="directory of per-user plans")
+    parser.add_argument("--db", help="profile store with the users' profiles (for macro targets)")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        from src.core.profile_store import ProfileStore
+        with ProfileStore(args.db) as store:
+            cohort = load_cohort(args.plans, store.iter_profiles())
+    else:
+        cohort = load_cohort(args.plans)
+    report = validate_cohort(cohort)
+
+    print(f"Validated {report['plans']} plans ({report['days']} days, {report['meals']} meals)")
+    for field, stats in report["fields"].items():
+        if stats["days_checked"]:
+            print(f"  {field:<10} mean deviation {stats['mean_deviation']:+.1%}, "
+                  f"{stats['days_within_tolerance']:.1%} of days within ±{TOLERANCE[field]:.0%}")
+    print(f"  diet violations: {report['violations']} in {report['plans_with_violations']} plans")
+    print(f"  outliers: {report['outlier_count']}")
+    for o in report["outliers"][:10]:
+        print(f"    {o['user_id']}: {'; '.join(o['reasons'])}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
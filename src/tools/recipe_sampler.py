@@ -0,0 +1,180 @@
+# src/tools/recipe_sampler.py
+"""
+Variety-aware recipe sampling.
+
+VarietySampler draws recipes for one meal pool (e.g. vegetarian snacks)
+with weights held in a Fenwick (binary indexed) tree, so every draw and
+every weight change is O(log n) however large the catalog is:
+
+- a recipe picked on day d gets weight 0 until day d + no_repeat_days
+  (so no_repeat_days=1 only forbids a second pick on the same day),
+- it then comes back at half weight for cooldown_days ("recently eaten"),
+- base weights come from member ratings (0 = never pick, 5 = favourite).
+
+Weights are integers, so the tree sums stay exact and a recipe with weight
+0 can never be drawn. Pending unblock / recover steps sit in two queues
+ordered by day; each pick schedules exactly one of each, so the upkeep is
+O(log n) per pick too, and reset() only undoes the recipes actually picked.
+If every recipe is blocked (the pool is smaller than the window needs), the
+longest-blocked recipe is released early. If every recipe is rated 0 there is
+nothing to pick and the caller gets None (it never falls back to one of them).
+"""
+
+from array import array
+from collections import deque
+from typing import Dict, Optional, Sequence
+
+DEFAULT_RATING = 3.0
+MAX_RATING = 5.0
+_RATING_SCALE = 20  # integer weight units per rating point
+
+
+class FenwickTree:
+    """Integer weights with O(log n) update, prefix sums and weighted search."""
+
+    def __init__(self, weights: Sequence[int]):
+        n = len(weights)
+        self.n = n
+        self.weights = array("q", weights)
+        tree = array("q", [0]) + self.weights
+        for i in range(1, n + 1):
+            j = i + (i & -i)
+            if j <= n:
+                tree[j] += tree[i]
+        self._tree = tree
+        self._top = 1 << (n.bit_length() - 1) if n else 0
+        self.total = sum(self.weights)
+
+    def copy(self) -> "FenwickTree":
+        clone = FenwickTree.__new__(FenwickTree)
+        clone.n, clone._top, clone.total = self.n, self._top, self.total
+        clone.weights = array("q", self.weights)
+        clone._tree = array("q", self._tree)
+        return clone
+
+    def set(self, i: int, weight: int):
+        delta = weight - self.weights[i]
+        if not delta:
+            return
+        self.weights[i] = weight
+        self.total += delta
+        tree, n = self._tree, self.n
+        j = i + 1
+        while j <= n:
+            tree[j] += delta
+            j += j & -j
+
+    def find(self, u: int) -> int:
+        """Index i with prefix(i) <= u < prefix(i + 1), for 0 <= u < total."""
+        tree, n = self._tree, self.n
+        pos, step = 0, self._top
+        while step:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] <= u:
+                pos = nxt
+                u -= tree[nxt]
+            step >>= 1
+        return pos
+
+
+def rating_weight(rating: Optional[float]) -> int:
+    """Integer base weight for a 0-5 rating (None = unrated)."""
+    r = DEFAULT_RATING if rating is None else min(max(float(rating), 0.0), MAX_RATING)
+    return round(r * _RATING_SCALE)
+
+
+class VarietySampler:
+    """Weighted recipe picks with a no-repeat window and recency cooldown (O(log n) per pick)."""
+
+    def __init__(self, recipes: Sequence[Dict], ratings: Optional[Dict[str, float]] = None,
+                 no_repeat_days: int = 2, cooldown_days: int = 2):
+        self.recipes = recipes
+        ratings = ratings or {}
+        self._base = array("q", (rating_weight(ratings.get(r.get("name"))) for r in recipes))
+        # full weight is 2x base so the cooldown (half weight) stays an integer
+        self.tree = FenwickTree([2 * w for w in self._base])
+        self.no_repeat_days = max(1, no_repeat_days)
+        self.cooldown_days = max(0, cooldown_days)
+        self._stamp = array("I", bytes(4 * len(recipes)))  # picks per recipe; drops stale queue entries
+        self._blocked = deque()  # (release day, index, stamp)
+        self._cooling = deque()  # (recover day, index, stamp)
+        self._touched = set()  # recipes whose weight changed since the last reset
+
+    def copy(self) -> "VarietySampler":
+        """Independent sampler with the same weights and state (cheap: two array copies)."""
+        clone = VarietySampler.__new__(VarietySampler)
+        clone.recipes = self.recipes
+        clone._base = self._base
+        clone.tree = self.tree.copy()
+        clone.no_repeat_days, clone.cooldown_days = self.no_repeat_days, self.cooldown_days
+        clone._stamp = array("I", self._stamp)
+        clone._blocked, clone._cooling = deque(self._blocked), deque(self._cooling)
+        clone._touched = set(self._touched)
+        return clone
+
+    def __len__(self) -> int:
+        return len(self.recipes)
+
+    def _release(self, i: int, day: int):
+        """Blocked -> cooling (half weight), or straight to full weight without a cooldown."""
+        if self.cooldown_days:
+            self.tree.set(i, self._base[i])
+            self._cooling.append((day + self.cooldown_days, i, self._stamp[i]))
+        else:
+            self.tree.set(i, 2 * self._base[i])
+
+    def _advance(self, day: int):
+        blocked, cooling, stamp = self._blocked, self._cooling, self._stamp
+        while blocked and blocked[0][0] <= day:
+            release_day, i, s = blocked.popleft()
+            if stamp[i] == s:
+                self._release(i, release_day)
+        while cooling and cooling[0][0] <= day:
+            _, i, s = cooling.popleft()
+            if stamp[i] == s:
+                self.tree.set(i, 2 * self._base[i])
+
+    def reset(self):
+        """Back to the freshly built state; O(k log n) for the k recipes picked since."""
+        for i in self._touched:
+            self.tree.set(i, 2 * self._base[i])
+        self._touched.clear()
+        self._blocked.clear()
+        self._cooling.clear()
+
+    def _mark(self, i: int, day: int):
+        self.tree.set(i, 0)
+        self._touched.add(i)
+        self._stamp[i] += 1
+        self._blocked.append((day + self.no_repeat_days, i, self._stamp[i]))
+
+    def use(self, i: int, day: int):
+        """Record that recipe i was eaten on `day` without drawing (replaying earlier picks)."""
+        self._advance(day)
+        self._mark(i, day)
+
+    def pick_index(self, u: float, day: int) -> Optional[int]:
+        """
+        Index of the recipe picked for `day` (days must not go backwards) using one
+        uniform draw u in [0, 1). Returns None for an empty pool or one where
+        every recipe is rated 0.
+        """
+        if not self.recipes:
+            return None
+        self._advance(day)
+        tree = self.tree
+        while not tree.total and self._blocked:
+            # everything is blocked: release the recipe that has waited longest
+            _, i, s = self._blocked.popleft()
+            if self._stamp[i] == s:
+                self._release(i, day)
+        if not tree.total:  # every recipe is rated 0
+            return None
+        i = tree.find(int(u * tree.total))
+        self._mark(i, day)
+        return i
+
+    def pick(self, u: float, day: int) -> Optional[Dict]:
+        """Like pick_index, but returns the recipe."""
+        i = self.pick_index(u, day)
+        return None if i is None else self.recipes[i]
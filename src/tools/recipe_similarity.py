@@ -0,0 +1,380 @@
+# src/tools/recipe_similarity.py
+"""
+Nearest-neighbour recipe search for meal substitution.
+
+Every recipe is turned into one unit-length vector with two blocks:
+- a nutrient block (calories, protein, fat, carbs), scaled per dimension by
+  the catalog maximum and normalised to unit length,
+- an ingredient block (one-hot over canonical ingredient IDs from
+  src.tools.ingredients, divided by sqrt(number of ingredients)).
+
+The blocks are weighted by sqrt(w) and sqrt(1 - w), so the cosine similarity
+of two recipes is simply:
+
+    w * (nutrient cosine) + (1 - w) * |shared ingredients| / sqrt(|A| * |B|)
+
+Search never scans the whole catalog when it does not have to:
+- recipes sharing an ingredient with the query are found through an
+  inverted index (ingredient -> recipe ids). Each ingredient's recipes are
+  also kept as a bitmap (a Python int, one bit per recipe), so counting how
+  many query ingredients every recipe shares is a few whole-catalog integer
+  operations. Recipes sharing s ingredients out of n have the same
+  ingredient score, so these (s, n) groups are scored best group first and
+  the search moves on once a group cannot beat the current k-th best,
+- recipes sharing nothing can score at most `w * nutrient cosine`, so they are
+  streamed best-first from a KD-tree over the nutrient block and the stream
+  stops as soon as it can no longer beat the current k-th best.
+"""
+
+import heapq
+from array import array
+from collections import OrderedDict
+from itertools import compress
+from math import sqrt
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.tools.ingredients import REGISTRY
+from src.tools.nutrition_api_stub import analyze_recipe_stub
+
+NUTRIENT_KEYS = ("calories_per_serving", "protein_g", "fat_g", "carbs_g")
+DIMS = len(NUTRIENT_KEYS)
+
+# Recipes per KD-tree leaf. Small leaves keep the best-first stream tight.
+LEAF_SIZE = 16
+
+# Ingredient bitmaps kept decoded for queries (each is one bit per recipe).
+CACHE_INGREDIENTS = 256
+
+# Flat buffers that make up a built index: (attribute, array typecode).
+# Together with `recipes`, `nutrient_weight` and `scale` they fully describe it,
+# which is what lets src.tools.shared_catalog place an index in shared memory.
+ARRAY_FIELDS = (
+    ("nutrients", "d"),
+    ("ing_offsets", "I"),
+    ("ing_ids", "I"),
+    ("inv_sqrt_len", "d"),
+    ("post_offsets", "I"),
+    ("post_ids", "I"),
+    ("kd_perm", "I"),
+    ("kd_lo", "i"),
+    ("kd_hi", "i"),
+    ("kd_dim", "i"),
+    ("kd_split", "d"),
+    ("kd_left", "i"),
+    ("kd_right", "i"),
+)
+
+
+def _raw_nutrients(recipe: Dict) -> List[float]:
+    """Nutrient values for a recipe: its own 'nutrition' block if present, else the stub."""
+    nutrition = recipe.get("nutrition") or analyze_recipe_stub(recipe.get("ingredients", []), servings=1)
+    return [float(nutrition.get(key, 0.0) or 0.0) for key in NUTRIENT_KEYS]
+
+
+def _set_bits(x: int) -> Iterator[int]:
+    """Positions of the set bits of x, lowest first."""
+    if x.bit_count() <= 32:
+        while x:
+            low = x & -x
+            yield low.bit_length() - 1
+            x ^= low
+        return
+    data = x.to_bytes((x.bit_length() + 7) >> 3, "little")
+    for byte in compress(range(len(data)), data):
+        bits, base = data[byte], byte << 3
+        for bit in range(8):
+            if bits >> bit & 1:
+                yield base + bit
+
+
+def _unit(values: Sequence[float]) -> List[float]:
+    norm = sqrt(sum(v * v for v in values))
+    if norm == 0:
+        return [0.0] * len(values)
+    return [v / norm for v in values]
+
+
+class RecipeIndex:
+    """
+    Precomputed similarity index over a list of recipes (e.g. SAMPLE_RECIPES["lunch"]).
+
+    All per-recipe data lives in flat `array` buffers (see ARRAY_FIELDS):
+    - `nutrients`: n * DIMS unit nutrient vectors (row-major),
+    - `ing_offsets` / `ing_ids`: CSR layout of each recipe's ingredient ids,
+    - `post_offsets` / `post_ids`: CSR layout of ingredient id -> recipe ids,
+    - `kd_*`: the KD-tree nodes.
+    Queries only index and slice these buffers, so read-only memoryviews work too.
+    """
+
+    def __init__(self, recipes: List[Dict], nutrient_weight: float = 0.5):
+        if not 0.0 <= nutrient_weight <= 1.0:
+            raise ValueError("nutrient_weight must be between 0 and 1")
+        self.recipes = list(recipes)
+        self.nutrient_weight = nutrient_weight
+
+        raw = [_raw_nutrients(r) for r in self.recipes]
+        self.scale = [max((row[d] for row in raw), default=0.0) or 1.0 for d in range(DIMS)]
+        self.nutrients = array("d")
+        for row in raw:
+            self.nutrients.extend(_unit([row[d] / self.scale[d] for d in range(DIMS)]))
+
+        self.ing_offsets = array("I", [0])
+        self.ing_ids = array("I")
+        for r in self.recipes:
+            ids = sorted(REGISTRY.ids_for(r.get("ingredients", [])))
+            self.ing_ids.extend(ids)
+            self.ing_offsets.append(len(self.ing_ids))
+        self.inv_sqrt_len = array("d", (
+            1.0 / sqrt(hi - lo) if hi > lo else 0.0
+            for lo, hi in zip(self.ing_offsets, self.ing_offsets[1:])
+        ))
+
+        postings: List[List[int]] = [[] for _ in range(max(self.ing_ids, default=-1) + 1)]
+        for rid in range(len(self.recipes)):
+            for pos in range(self.ing_offsets[rid], self.ing_offsets[rid + 1]):
+                postings[self.ing_ids[pos]].append(rid)
+        self.post_offsets = array("I", [0])
+        self.post_ids = array("I")
+        for plist in postings:
+            self.post_ids.extend(plist)
+            self.post_offsets.append(len(self.post_ids))
+
+        self._build_kdtree()
+        self._reset_caches()
+
+    @classmethod
+    def from_arrays(cls, recipes, nutrient_weight: float, scale: Sequence[float], arrays: Dict) -> "RecipeIndex":
+        """Rebuild an index around existing buffers (arrays or memoryviews) without copying them."""
+        index = cls.__new__(cls)
+        index.recipes = recipes
+        index.nutrient_weight = nutrient_weight
+        index.scale = list(scale)
+        for name, _ in ARRAY_FIELDS:
+            setattr(index, name, arrays[name])
+        index._reset_caches()
+        return index
+
+    def arrays(self) -> Dict[str, array]:
+        """The flat buffers of this index, keyed by ARRAY_FIELDS name."""
+        return {name: getattr(self, name) for name, _ in ARRAY_FIELDS}
+
+    # ---------- recipe bitmaps ----------
+
+    def _reset_caches(self):
+        self._ingredient_bits: "OrderedDict[int, int]" = OrderedDict()
+        self._length_bits: Optional[Dict[int, int]] = None
+
+    def _bits_for_ingredient(self, iid: int) -> int:
+        """Bitmap of the recipes using ingredient `iid`."""
+        bits = self._ingredient_bits.get(iid)
+        if bits is not None:
+            self._ingredient_bits.move_to_end(iid)
+            return bits
+        data = bytearray((len(self.recipes) + 7) >> 3)
+        for rid in self.post_ids[self.post_offsets[iid]:self.post_offsets[iid + 1]]:
+            data[rid >> 3] |= 1 << (rid & 7)
+        bits = self._ingredient_bits[iid] = int.from_bytes(data, "little")
+        if len(self._ingredient_bits) > CACHE_INGREDIENTS:
+            self._ingredient_bits.popitem(last=False)
+        return bits
+
+    def _bits_by_length(self) -> Dict[int, int]:
+        """Bitmap of the recipes with n ingredients, for every n > 0 in the catalog."""
+        if self._length_bits is None:
+            by_length: Dict[int, bytearray] = {}
+            size = (len(self.recipes) + 7) >> 3
+            offsets = self.ing_offsets
+            for rid in range(len(self.recipes)):
+                n = offsets[rid + 1] - offsets[rid]
+                if n:
+                    data = by_length.get(n)
+                    if data is None:
+                        data = by_length[n] = bytearray(size)
+                    data[rid >> 3] |= 1 << (rid & 7)
+            self._length_bits = {n: int.from_bytes(data, "little") for n, data in by_length.items()}
+        return self._length_bits
+
+    # ---------- KD-tree over the nutrient block ----------
+
+    def _build_kdtree(self):
+        """Build an implicit KD-tree: nodes are parallel lists, leaves are ranges of `kd_perm`."""
+        n = len(self.recipes)
+        self.kd_perm = array("I", range(n))
+        self.kd_lo = array("i")
+        self.kd_hi = array("i")
+        self.kd_dim = array("i")
+        self.kd_split = array("d")
+        self.kd_left = array("i")
+        self.kd_right = array("i")
+
+        def new_node(lo: int, hi: int) -> int:
+            self.kd_lo.append(lo)
+            self.kd_hi.append(hi)
+            self.kd_dim.append(-1)
+            self.kd_split.append(0.0)
+            self.kd_left.append(-1)
+            self.kd_right.append(-1)
+            return len(self.kd_lo) - 1
+
+        if n == 0:
+            return
+        nut = self.nutrients
+        stack = [new_node(0, n)]
+        while stack:
+            node = stack.pop()
+            lo, hi = self.kd_lo[node], self.kd_hi[node]
+            if hi - lo <= LEAF_SIZE:
+                continue
+            ids = self.kd_perm[lo:hi]
+            # split on the dimension with the widest spread
+            spreads = []
+            for d in range(DIMS):
+                vals = [nut[rid * DIMS + d] for rid in ids]
+                spreads.append(max(vals) - min(vals))
+            dim = max(range(DIMS), key=spreads.__getitem__)
+            if spreads[dim] == 0:
+                continue  # all points identical: keep as a leaf
+            ordered = sorted(ids, key=lambda rid: nut[rid * DIMS + dim])
+            mid = len(ordered) // 2
+            self.kd_perm[lo:hi] = array("I", ordered)
+            self.kd_dim[node] = dim
+            self.kd_split[node] = nut[ordered[mid] * DIMS + dim]
+            self.kd_left[node] = new_node(lo, lo + mid)
+            self.kd_right[node] = new_node(lo + mid, hi)
+            stack.append(self.kd_left[node])
+            stack.append(self.kd_right[node])
+
+    def _iter_by_nutrient_distance(self, q: Sequence[float]) -> Iterator[Tuple[float, int]]:
+        """Yield (squared distance, recipe id) in increasing distance from `q` (best-first KD-tree walk)."""
+        if not self.kd_lo:
+            return
+        nut = self.nutrients
+        heap: List[Tuple[float, int, int]] = [(0.0, 0, 0)]  # (lower bound, is_point, node or recipe id)
+        while heap:
+            bound, is_point, x = heapq.heappop(heap)
+            if is_point:
+                yield bound, x
+                continue
+            dim = self.kd_dim[x]
+            if dim < 0:
+                for pos in range(self.kd_lo[x], self.kd_hi[x]):
+                    rid = self.kd_perm[pos]
+                    base = rid * DIMS
+                    dist = 0.0
+                    for d in range(DIMS):
+                        diff = q[d] - nut[base + d]
+                        dist += diff * diff
+                    heapq.heappush(heap, (dist, 1, rid))
+                continue
+            diff = q[dim] - self.kd_split[x]
+            near, far = (self.kd_left[x], self.kd_right[x]) if diff < 0 else (self.kd_right[x], self.kd_left[x])
+            heapq.heappush(heap, (bound, 0, near))
+            heapq.heappush(heap, (max(bound, diff * diff), 0, far))
+
+    # ---------- queries ----------
+
+    def _query_vectors(self, recipe: Dict) -> Tuple[List[float], List[int], int]:
+        row = _raw_nutrients(recipe)
+        q = _unit([row[d] / self.scale[d] for d in range(DIMS)])
+        ids, unknown = set(), set()
+        for name in recipe.get("ingredients", []):
+            iid = REGISTRY.lookup(name)
+            if iid is None:
+                unknown.add(name)
+            else:
+                ids.add(iid)
+        known = [iid for iid in ids if iid < len(self.post_offsets) - 1]
+        return q, known, len(ids) + len(unknown)
+
+    def _nutrient_cosine(self, q: Sequence[float], rid: int) -> float:
+        base = rid * DIMS
+        nut = self.nutrients
+        return sum(q[d] * nut[base + d] for d in range(DIMS))
+
+    def nearest(
+        self,
+        recipe: Dict,
+        k: int = 3,
+        allow: Optional[Callable[[Dict], bool]] = None,
+        exclude_same_name: bool = True,
+    ) -> List[Tuple[float, Dict]]:
+        """
+        Return up to k (similarity, recipe) pairs most similar to `recipe`, best first.
+        - allow: optional predicate (e.g. diet constraints); recipes failing it are skipped.
+        - exclude_same_name: skip catalog entries with the query's name (the meal being replaced).
+        """
+        if k <= 0 or not self.recipes:
+            return []
+        w = self.nutrient_weight
+        q, known, q_len = self._query_vectors(recipe)
+        name = recipe.get("name") if exclude_same_name else None
+
+        def eligible(rid: int) -> bool:
+            r = self.recipes[rid]
+            if name is not None and r.get("name") == name:
+                return False
+            return allow is None or allow(r)
+
+        # 1) recipes sharing at least one ingredient. levels[c] holds the recipes sharing
+        # more than c of the query's ingredients; a recipe sharing s of its n ingredients
+        # scores at most w + ing_weight * s / sqrt(n), so (s, n) groups go best bound first.
+        levels: List[int] = []
+        for iid in known:
+            bits = self._bits_for_ingredient(iid)
+            for c in range(len(levels) - 1, -1, -1):
+                hit = levels[c] & bits
+                if not hit:
+                    continue
+                if c + 1 == len(levels):
+                    levels.append(hit)
+                else:
+                    levels[c + 1] |= hit
+            if levels:
+                levels[0] |= bits
+            else:
+                levels.append(bits)
+        top: List[Tuple[float, int]] = []  # min-heap of (score, -rid)
+        nut = self.nutrients
+        q0, q1, q2, q3 = q
+        ing_weight = (1 - w) / sqrt(q_len) if q_len else 0.0
+        by_length = self._bits_by_length() if levels else {}
+        groups = sorted(((shared * (1.0 / sqrt(n)), shared, n) for shared in range(1, len(levels) + 1)
+                         for n in by_length if n >= shared), reverse=True)
+        for ratio, shared, n in groups:
+            ing_score = ing_weight * ratio
+            if len(top) >= k and w + ing_score <= top[0][0]:
+                break
+            exact = levels[shared - 1] & ~levels[shared] if shared < len(levels) else levels[shared - 1]
+            for rid in _set_bits(exact & by_length[n]):
+                if not eligible(rid):
+                    continue
+                b = rid * DIMS
+                score = w * (q0 * nut[b] + q1 * nut[b + 1] + q2 * nut[b + 2] + q3 * nut[b + 3]) + ing_score
+                item = (score, -rid)
+                if len(top) < k:
+                    heapq.heappush(top, item)
+                elif item > top[0]:
+                    heapq.heapreplace(top, item)
+
+        # 2) recipes sharing nothing score w * nutrient cosine; stream them best-first.
+        # For unit q and |m| <= 1: q.m <= 1 - |q - m|^2 / 2, which only shrinks along the stream.
+        q_is_zero = not any(q)
+        shares = levels[0] if levels else 0
+        if w > 0 or len(top) < k:
+            for dist, rid in self._iter_by_nutrient_distance(q):
+                bound = 0.0 if q_is_zero else w * (1.0 - dist / 2.0)
+                if len(top) >= k and bound <= top[0][0]:
+                    break
+                if shares >> rid & 1:
+                    continue
+                score = w * self._nutrient_cosine(q, rid)
+                if not eligible(rid):
+                    continue
+                item = (score, -rid)
+                if len(top) < k:
+                    heapq.heappush(top, item)
+                elif item > top[0]:
+                    heapq.heapreplace(top, item)
+
+        top.sort(reverse=True)
+        return [(round(score, 6), self.recipes[-neg_rid]) for score, neg_rid in top]
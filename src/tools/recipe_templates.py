@@ -1,14 +1,40 @@
 # src/tools/recipe_templates.py
-# Small helper to map token to nicer display names
+# Small helper to map canonical ingredient tokens to nicer display names.
+# Keys are the canonical names used by src.tools.ingredients (aliases such as
+# 'wheat', 'dal' or 'mixed veg' are resolved to these keys there).
 DISPLAY_NAMES = {
-    "poha": "Poha",
+    "poha": "Poha (flattened rice)",
     "peanuts": "Roasted peanuts",
-    "oatmeal": "Oatmeal",
-    "upma": "Upma",
-    "dal": "Dal (lentils)",
-    "paneer_curry": "Paneer curry",
-    "chicken_curry": "Chicken curry",
-    "fish_curry": "Fish curry",
-    "roti": "Roti",
-    "rice": "Rice"
+    "oats": "Oatmeal",
+    "onion": "Onion",
+    "turmeric": "Turmeric (haldi)",
+    "eggs": "Eggs",
+    "tomato": "Tomato",
+    "bread": "Bread",
+    "semolina": "Semolina (sooji)",
+    "carrot": "Carrot",
+    "peas": "Green peas (matar)",
+    "mustard seeds": "Mustard seeds (rai)",
+    "curd": "Curd (dahi)",
+    "banana": "Banana",
+    "whole wheat flour": "Whole wheat flour (atta)",
+    "flour": "Plain flour (maida)",
+    "lentils": "Dal (lentils)",
+    "brown rice": "Brown rice",
+    "rice": "Rice",
+    "mixed vegetables": "Mixed vegetables (sabzi)",
+    "kidney beans": "Rajma (kidney beans)",
+    "cucumber": "Cucumber",
+    "chicken": "Chicken",
+    "spices": "Spices (masala)",
+    "paneer": "Paneer",
+    "fish": "Fish",
+    "lemon": "Lemon",
+    "spinach": "Spinach (palak)",
+    "chickpeas": "Chole (chickpeas)",
+    "roasted chana": "Roasted chana",
+    "apple": "Apple",
+    "jaggery": "Jaggery (gur)",
+    "buttermilk": "Buttermilk (chaas)",
+    "makhana": "Makhana (fox nuts)",
 }
@@ -0,0 +1,257 @@
+# src/tools/shared_catalog.py
+"""
+Recipe and exercise catalogs packed once into shared memory for worker pools.
+
+The parent process packs everything into one `multiprocessing.shared_memory`
+block:
+- a string table (all recipe names, ingredient names and tags, UTF-8),
+- per meal type: recipe records as flat int arrays plus the RecipeIndex
+  buffers (nutrient vectors, posting lists, KD-tree),
+- exercise lists per equipment type (small, kept in the header).
+
+Workers attach by name and get read-only memoryviews straight into that block:
+nothing is copied or unpickled per worker, and recipe dicts are only built
+when a worker actually reads a recipe.
+
+Typical use:
+
+    catalog = SharedCatalog.create(SAMPLE_RECIPES, {"gym": ..., "home": ...})
+    with Pool(32, initializer=init_worker, initargs=(catalog.name,)) as pool:
+        ...
+    catalog.close(); catalog.unlink()
+
+Inside a worker, `attached_catalog()` returns the attached catalog (and the
+diet agent's recipe_index_for() uses it automatically).
+"""
+
+import json
+import struct
+from array import array
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence
+
+from src.tools.ingredients import REGISTRY
+from src.tools.recipe_similarity import ARRAY_FIELDS, RecipeIndex
+
+MAGIC = b"DFCAT1\0\0"
+_ALIGN = 8
+
+# Per meal type recipe record arrays (CSR offsets index into the *_str arrays).
+_RECORD_FIELDS = (
+    ("name_str", "I"),
+    ("ing_off", "I"),
+    ("ing_str", "I"),
+    ("tag_off", "I"),
+    ("tag_str", "I"),
+)
+
+
+def _data_start(header_len: int) -> int:
+    """Sections start at the first 8-byte boundary after magic + header length + header."""
+    return -(-(len(MAGIC) + 4 + header_len) // _ALIGN) * _ALIGN
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.offsets = array("I", [0])
+        self.blob = bytearray()
+
+    def add(self, text: str) -> int:
+        sid = self.ids.get(text)
+        if sid is None:
+            sid = self.ids[text] = len(self.offsets) - 1
+            self.blob += text.encode("utf-8")
+            self.offsets.append(len(self.blob))
+        return sid
+
+
+class SharedRecipes(Sequence):
+    """Read-only, lazily decoded view of one meal type's recipes in a SharedCatalog."""
+
+    def __init__(self, catalog: "SharedCatalog", meal_type: str):
+        self._catalog = catalog
+        self._prefix = f"{meal_type}/"
+        self._len = len(catalog._view(self._prefix + "name_str"))
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._len))]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        view, text = self._catalog._view, self._catalog.string
+        p = self._prefix
+        ing_off, tag_off = view(p + "ing_off"), view(p + "tag_off")
+        ing_str, tag_str = view(p + "ing_str"), view(p + "tag_str")
+        return {
+            "name": text(view(p + "name_str")[i]),
+            "ingredients": [text(s) for s in ing_str[ing_off[i]:ing_off[i + 1]]],
+            "tags": [text(s) for s in tag_str[tag_off[i]:tag_off[i + 1]]],
+        }
+
+
+class SharedCatalog:
+    """Catalogs in one shared-memory block. Use `create` in the parent and `attach` in workers."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"shared memory block {shm.name} is not a DesiFit catalog")
+        (header_len,) = struct.unpack_from("<I", buf, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(bytes(buf[start:start + header_len]).decode("utf-8"))
+        self._data_start = _data_start(header_len)
+        self._buf = buf.toreadonly()
+        self._views: Dict[str, memoryview] = {}
+        self._indexes: Dict[str, RecipeIndex] = {}
+        self._strings = self._view("strings/blob")
+        self._string_offsets = self._view("strings/offsets")
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    # ---------- building ----------
+
+    @classmethod
+    def create(cls, recipes_by_type: Dict[str, List[Dict]],
+               exercises_by_equipment: Optional[Dict[str, Dict[str, List[str]]]] = None,
+               nutrient_weight: float = 0.5, name: Optional[str] = None) -> "SharedCatalog":
+        """Pack catalogs (and their similarity indexes) into a new shared-memory block."""
+        strings = _StringTable()
+        sections: Dict[str, array] = {}
+        meal_types = {}
+        for meal_type, recipes in recipes_by_type.items():
+            records = {field: array(code) for field, code in _RECORD_FIELDS}
+            records["ing_off"].append(0)
+            records["tag_off"].append(0)
+            for r in recipes:
+                records["name_str"].append(strings.add(r.get("name", "")))
+                records["ing_str"].extend(strings.add(x) for x in r.get("ingredients", []))
+                records["ing_off"].append(len(records["ing_str"]))
+                records["tag_str"].extend(strings.add(x) for x in r.get("tags", []))
+                records["tag_off"].append(len(records["tag_str"]))
+            index = RecipeIndex(recipes, nutrient_weight)
+            for field, arr in list(records.items()) + list(index.arrays().items()):
+                sections[f"{meal_type}/{field}"] = arr
+            meal_types[meal_type] = {"nutrient_weight": nutrient_weight, "scale": index.scale}
+        sections["strings/offsets"] = strings.offsets
+        sections["strings/blob"] = array("B", bytes(strings.blob))
+
+        header = {
+            "meal_types": meal_types,
+            "exercises": exercises_by_equipment or {},
+            # ingredient IDs inside the indexes are only valid against this registry order
+            "registry": list(REGISTRY.names),
+            "sections": {},
+        }
+        # lay out sections after the header, each aligned to 8 bytes
+        layout = []
+        offset = 0
+        for key, arr in sections.items():
+            offset = -(-offset // _ALIGN) * _ALIGN
+            layout.append((key, offset, arr))
+            header["sections"][key] = [offset, arr.typecode, len(arr)]
+            offset += len(arr) * arr.itemsize
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = _data_start(len(header_bytes))
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(1, data_start + offset))
+        buf = shm.buf
+        buf[:len(MAGIC)] = MAGIC
+        struct.pack_into("<I", buf, len(MAGIC), len(header_bytes))
+        buf[len(MAGIC) + 4:len(MAGIC) + 4 + len(header_bytes)] = header_bytes
+        for key, off, arr in layout:
+            raw = arr.tobytes()
+            buf[data_start + off:data_start + off + len(raw)] = raw
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedCatalog":
+        """Attach to an existing block (zero-copy, read-only) and sync ingredient IDs."""
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        catalog = cls(shm, owner=False)
+        catalog._sync_registry()
+        return catalog
+
+    def _sync_registry(self):
+        for iid, name in enumerate(self.header["registry"]):
+            if iid >= len(REGISTRY):
+                REGISTRY.add(name)
+            if REGISTRY.name(iid) != name:
+                raise RuntimeError("ingredient registry differs from the one the catalog was built with")
+
+    # ---------- reading ----------
+
+    def _view(self, key: str) -> memoryview:
+        view = self._views.get(key)
+        if view is None:
+            offset, typecode, count = self.header["sections"][key]
+            start = self._data_start + offset
+            size = count * array(typecode).itemsize
+            view = self._buf[start:start + size].cast(typecode)
+            self._views[key] = view
+        return view
+
+    def string(self, sid: int) -> str:
+        return bytes(self._strings[self._string_offsets[sid]:self._string_offsets[sid + 1]]).decode("utf-8")
+
+    def meal_types(self) -> List[str]:
+        return list(self.header["meal_types"])
+
+    def recipes(self, meal_type: str) -> SharedRecipes:
+        return SharedRecipes(self, meal_type)
+
+    def index(self, meal_type: str) -> RecipeIndex:
+        """RecipeIndex whose buffers are views into shared memory."""
+        index = self._indexes.get(meal_type)
+        if index is None:
+            meta = self.header["meal_types"][meal_type]
+            arrays = {field: self._view(f"{meal_type}/{field}") for field, _ in ARRAY_FIELDS}
+            index = RecipeIndex.from_arrays(self.recipes(meal_type), meta["nutrient_weight"], meta["scale"], arrays)
+            self._indexes[meal_type] = index
+        return index
+
+    def exercises(self, equipment: str) -> Dict[str, List[str]]:
+        return self.header["exercises"].get(equipment, {})
+
+    # ---------- lifecycle ----------
+
+    def close(self):
+        """Release this process's views and mapping."""
+        self._indexes.clear()
+        for view in self._views.values():
+            view.release()
+        self._views.clear()
+        self._strings = self._string_offsets = None
+        self._buf.release()
+        self.shm.close()
+
+    def unlink(self):
+        """Destroy the block (owner only, after every worker is done)."""
+        if self.owner:
+            self.shm.unlink()
+
+
+_ATTACHED: Optional[SharedCatalog] = None
+
+
+def init_worker(name: str):
+    """Pool initializer: attach this worker to the shared catalog."""
+    global _ATTACHED
+    _ATTACHED = SharedCatalog.attach(name)
+
+
+def attached_catalog() -> Optional[SharedCatalog]:
+    """The catalog attached by init_worker in this process, if any."""
+    return _ATTACHED
@@ -0,0 +1,85 @@
+# tests/test_bulk_import.py
+import json
+
+from src.cli.bulk_import import coerce_row, import_profiles, validate_batch
+from src.core.profile_store import ProfileStore
+from src.core.user_profile import UserProfile
+
+HEADER = "user_id,name,age,sex,height_cm,weight_kg,activity_level,goal,target_rate_kg_per_week,dietary_preferences\n"
+
+def test_csv_import_reports_bad_rows(tmp_path):
+    path = tmp_path / "people.csv"
+    path.write_text(
+        HEADER
+        + "e1,Asha,29,F,160,62.5,light,lose_weight,0.5,vegetarian\n"
+        + "e2,Ravi,abc,male,175,80,moderate,maintain,,\n"       # bad age
+        + "e3,Meera,41,female,158,70,couch,lose_weight,0.5,\n"  # bad activity level
+        + "e4,Kabir,35,male,180,85,active,gain_weight\n"        # short row
+        + "e5,Sana,33,female,165,58,sedentary,maintain,,non-veg\n"
+    )
+    with ProfileStore(str(tmp_path / "p.db")) as store:
+        stats = import_profiles(str(path), store, batch_size=2)
+        assert (stats["read"], stats["imported"], stats["rejected"]) == (5, 2, 3)
+        assert [e["line"] for e in stats["errors"]] == [3, 4, 5]
+        assert "age" in stats["errors"][0]["error"]
+        assert "activity_level" in stats["errors"][1]["error"]
+        assert store.get("e1") == UserProfile("Asha", 29, "female", 160.0, 62.5, "light", "lose_weight", 0.5, "vegetarian")
+        assert store.get("e5").target_rate_kg_per_week is None
+        assert store.get("e2") is None
+        assert len(store) == 2
+        assert store.changed_since(0) == (["e1", "e5"], stats["revision"])  # every batch, one revision
+
+def test_failing_column_is_rechecked_alone():
+    good = ["e1", "Asha", "29", "F", "160", "62.5", "light", "lose_weight", "", "vegetarian"]
+    rows = [list(good) for _ in range(6)]
+    rows[1][2] = "abc"                      # bad age
+    rows[2][5], rows[2][7] = "900", "bulk"  # bad weight and goal: the earlier column is reported
+    rows[3] = None
+    rows[4][7] = "Maintain "                # fine once normalised
+    columns, n_good, bad = validate_batch((range(10, 16), rows))
+    assert bad == [(11, "invalid age: 'abc'"), (12, "weight_kg must be between 25.0 and 300.0"),
+                   (13, "malformed row")]
+    assert n_good == 3
+    assert list(zip(*columns)) == [coerce_row(rows[i]) for i in (0, 4, 5)]
+
+def test_jsonl_import_and_revisions(tmp_path):
+    rows = [
+        {"user_id": "u1", "name": "Asha", "age": 29, "sex": "female", "height_cm": 160, "weight_kg": 62,
+         "activity_level": "light", "goal": "lose_weight"},
+        {"user_id": "u2", "name": "Ravi", "age": 40, "sex": "male", "height_cm": 175, "weight_kg": 80,
+         "activity_level": "moderate", "goal": "maintain", "dietary_preferences": "non-veg"},
+    ]
+    path = tmp_path / "people.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\nnot json\n")
+    with ProfileStore(str(tmp_path / "p.db")) as store:
+        stats = import_profiles(str(path), store)
+        assert (stats["imported"], stats["rejected"]) == (2, 1)
+        rev = store.revision()
+        assert rev == stats["revision"]
+        store.save("u1", UserProfile("Asha", 30, "female", 160.0, 61.0, "light", "lose_weight"))
+        changed, latest = store.changed_since(rev)
+        assert changed == ["u1"] and latest == rev + 1
+        assert [uid for uid, _ in store.iter_profiles()] == ["u1", "u2"]
+
+def test_concurrent_writers_never_share_a_revision(tmp_path):
+    import threading
+    db = str(tmp_path / "p.db")
+    profile = UserProfile("Asha", 30, "female", 160.0, 61.0, "light", "lose_weight")
+    revs = {}
+
+    def writer(prefix):
+        with ProfileStore(db) as store:
+            revs[prefix] = [store.save(f"{prefix}{i}", profile) for i in range(40)]
+
+    with ProfileStore(db):
+        pass
+    threads = [threading.Thread(target=writer, args=(p,)) for p in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stamped = revs["a"] + revs["b"]
+    assert len(set(stamped)) == len(stamped) == 80
+    with ProfileStore(db) as store:
+        changed, latest = store.changed_since(0)
+        assert len(changed) == 80 and latest == max(stamped)
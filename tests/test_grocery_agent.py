@@ -0,0 +1,62 @@
+# tests/test_grocery_agent.py
+from itertools import product
+
+import pytest
+
+from src.agents.grocery_agent import BasketOptimizer, PackTable, generate_grocery_list, optimize_basket
+
+def brute_force_cover(packs, quantity):
+    best = float("inf")
+    ranges = [range(0, int(quantity // size) + 2) for size, _ in packs]
+    for counts in product(*ranges):
+        if sum(n * size for n, (size, _) in zip(counts, packs)) >= quantity:
+            best = min(best, sum(n * price for n, (_, price) in zip(counts, packs)))
+    return round(best, 2)
+
+def test_pack_table_matches_brute_force():
+    packs = [(300, 2.40), (650, 4.50), (1000, 6.25)]
+    table = PackTable(packs)
+    for quantity in (0, 1, 150, 299, 301, 600, 900, 1250, 1999, 3150, 9000):
+        cost, counts = table.cheapest(quantity)
+        assert cost == brute_force_cover(packs, quantity)
+        assert sum(size * n for size, n in counts.items()) >= quantity
+
+def test_pack_table_with_fractional_sizes():
+    packs = [(0.5, 1.0), (1.5, 2.5)]
+    table = PackTable(packs)
+    assert table.step == 0.5 and table.sizes == [0.5, 1.5]
+    for quantity in (0, 0.2, 0.5, 1.2, 2.0, 2.6, 4.5):
+        cost, counts = table.cheapest(quantity)
+        assert cost == brute_force_cover(packs, quantity)
+        assert sum(size * n for size, n in counts.items()) >= quantity
+    with pytest.raises(ValueError):
+        PackTable([(0.0001, 1.0)])
+
+def test_swaps_pool_equivalent_ingredients():
+    prices = {
+        "rice": {"unit": "g", "per_serving": 100, "packs": [(1000, 1.00)]},
+        "brown rice": {"unit": "g", "per_serving": 100, "packs": [(500, 1.10), (1000, 2.00)]},
+    }
+    optimizer = BasketOptimizer(prices, [["rice", "brown rice"]])
+    grocery = {"rice": 3, "brown rice": 4, "saffron": 1}
+
+    swapped = optimizer.optimize(grocery)
+    assert swapped["unpriced"] == ["saffron"]
+    [line] = swapped["items"]
+    assert line["buy"] == "rice" and line["quantity"] == 700
+    assert swapped["total_cost"] == 1.00
+
+    strict = optimizer.optimize(grocery, allow_swaps=False)
+    assert [line["buy"] for line in strict["items"]] == ["brown rice", "rice"]
+    assert strict["total_cost"] == 2.10
+
+def test_optimize_basket_for_sample_plan():
+    plan = {"days": [{"day": 1, "meals": [
+        {"type": "lunch", "recipe": {"name": "Dal + brown rice + sabzi", "ingredients": ["lentils", "brown rice", "mixed veg"]}},
+        {"type": "dinner", "recipe": {"name": "Rajma + rice + salad", "ingredients": ["kidney beans", "rice", "cucumber"]}},
+    ]}]}
+    basket = optimize_basket(generate_grocery_list(plan))
+    assert basket["currency"] == "GBP"
+    assert basket["unpriced"] == []
+    assert basket["total_cost"] == round(sum(line["cost"] for line in basket["items"]), 2)
+    assert any(set(line["needed"]) == {"rice", "brown rice"} for line in basket["items"])
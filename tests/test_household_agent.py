@@ -0,0 +1,95 @@
+# tests/test_household_agent.py
+from src.agents.coordinator import summarize_profile
+from src.agents.grocery_agent import generate_grocery_list
+from src.agents.household_agent import generate_household_plan, household_preference, plan_household
+from src.core.user_profile import UserProfile
+
+
+def make_member(name, weight_kg=70.0, sex="female", goal="maintain", pref=None):
+    return UserProfile(name=name, age=35, sex=sex, height_cm=165.0, weight_kg=weight_kg,
+                       activity_level="light", goal=goal, target_rate_kg_per_week=0.5,
+                       dietary_preferences=pref)
+
+
+def make_family():
+    return [
+        make_member("Asha", 62.0, pref="vegetarian, no peanuts"),
+        make_member("Ravi", 80.0, sex="male", goal="lose_weight", pref="non-veg"),
+        make_member("Meera", 45.0),
+        make_member("Meera", 50.0),
+    ]
+
+
+def test_shared_recipes_and_scaled_portions():
+    family = make_family()
+    assert household_preference(family) == "vegetarian"
+    plan = generate_household_plan(family)
+    names = [m["name"] for m in plan["household"]["members"]]
+    assert names == ["Asha", "Ravi", "Meera", "Meera #2"]
+    assert len(plan["days"]) == 7
+    targets = [summarize_profile(p)["calorie_target"] for p in family]
+    for day in plan["days"]:
+        for meal in day["meals"]:
+            assert "veg" in meal["recipe"]["tags"]
+            assert "peanuts" not in meal["recipe"]["ingredients"]
+            assert set(meal["portions"]) == set(names)
+            assert abs(meal["servings"] - sum(p["servings"] for p in meal["portions"].values())) < 0.02
+    day_kcal = [sum(m["portions"][name]["calories_targeted"] for m in plan["days"][0]["meals"])
+                for name in names]
+    for kcal, target in zip(day_kcal, targets):
+        assert abs(kcal - target) <= 3
+    assert day_kcal[1] != day_kcal[2]  # portions follow each member's own target
+
+
+def test_one_grocery_list_weighted_by_servings(tmp_path):
+    family = make_family()
+    result = plan_household(family, out_dir=str(tmp_path))
+    plan = result["meal_plan"]
+    single = generate_grocery_list({"days": [{"meals": [dict(m, servings=1) for m in d["meals"]]}
+                                             for d in plan["days"]]})
+    assert set(result["grocery_list"]) == set(single)
+    for name, count in single.items():
+        assert result["grocery_list"][name] > count  # four people eat more than one
+    assert result["basket"]["total_cost"] > 0
+    assert {p.name for p in tmp_path.iterdir()} == {"household_plan.json", "grocery_list.json", "basket.json"}
+
+
+def test_single_member_household_matches_personal_grocery_list():
+    from src.agents.diet_agent import generate_week_plan
+    member = make_member("Asha", 62.0, pref="vegetarian")
+    personal = generate_week_plan(member, summarize_profile(member)["calorie_target"])
+    household = plan_household([member], with_basket=False)
+    assert household["grocery_list"] == generate_grocery_list(personal)
+
+
+def test_excluded_ingredients_never_reach_the_plan():
+    import pytest
+    from src.tools.ingredients import REGISTRY
+    # every snack has one of these, so snacks fall back to the generic meal
+    pref = "vegetarian, no peanuts, no curd, no roasted chana, no makhana"
+    plan = generate_household_plan([make_member("Asha", pref=pref), make_member("Ravi")], week_index=3)
+    banned = {REGISTRY.lookup(name) for name in ("peanuts", "curd", "roasted chana", "makhana")}
+    for day in plan["days"]:
+        for meal in day["meals"]:
+            assert not banned & set(REGISTRY.ids_for(meal["recipe"]["ingredients"])), meal["recipe"]["name"]
+            if meal["type"].startswith("snack"):
+                assert meal["recipe"]["name"] == "Simple meal"
+    with pytest.raises(ValueError):
+        generate_household_plan([make_member("Asha", pref=pref + ", no rice")])
+
+
+def test_unresolved_exclusions_refuse_to_plan():
+    import pytest
+    from src.tools.ingredients import REGISTRY
+    from src.tools.plan_validation import excluded_ingredients
+    assert excluded_ingredients("vegetarian, no peanuts or tree nuts") == (
+        frozenset({REGISTRY.lookup("peanuts")}), ("tree nuts",))
+    assert excluded_ingredients("peanut allergy")[0] == {REGISTRY.lookup("peanuts")}
+    assert excluded_ingredients("no nuts")[1] == ("nuts",)
+    with pytest.raises(ValueError, match="tree nuts"):
+        generate_household_plan([make_member("Asha", pref="vegetarian, no peanuts or tree nuts"),
+                                 make_member("Ravi")])
+    plan = generate_household_plan([make_member("Asha", pref="vegetarian, no peanuts or onion")])
+    banned = {REGISTRY.lookup("peanuts"), REGISTRY.lookup("onion")}
+    assert not any(banned & set(REGISTRY.ids_for(m["recipe"]["ingredients"]))
+                   for d in plan["days"] for m in d["meals"])
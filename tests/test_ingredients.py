@@ -0,0 +1,48 @@
+# tests/test_ingredients.py
+from src.agents.grocery_agent import generate_grocery_list
+from src.tools.ingredients import REGISTRY, IngredientRegistry, canonical_name, normalize
+from src.tools.recipe_templates import DISPLAY_NAMES
+
+def test_aliases_resolve_to_one_id():
+    wheat = REGISTRY.lookup("wheat")
+    assert wheat is not None
+    assert REGISTRY.lookup("Whole-Wheat Flour") == wheat
+    assert REGISTRY.lookup("atta") == wheat
+    assert REGISTRY.lookup("flour") != wheat
+    assert canonical_name("mixed veg") == "mixed vegetables"
+    assert REGISTRY.display_name(REGISTRY.lookup("dal")) == DISPLAY_NAMES["lentils"]
+
+def test_plural_and_phrase_matching():
+    assert canonical_name("Tomatoes") == "tomato"
+    assert canonical_name("finely chopped onions") == "onion"
+    assert canonical_name("organic whole wheat flour") == "whole wheat flour"
+    assert normalize("  Brown   Rice! ") == "brown rice"
+    assert canonical_name("fresh spinach, chopped") == "spinach"
+
+def test_phrases_naming_other_products_stay_separate():
+    registry = IngredientRegistry()
+    for canonical in ("whole wheat flour", "rice", "eggs", "peanuts", "chicken", "lemon", "flour", "onion"):
+        registry.add(canonical, aliases=["wheat"] if canonical == "whole wheat flour" else ())
+    for raw in ("whole wheat bread", "rice flour", "rice bran oil", "egg noodles",
+                "peanut oil", "chicken stock", "lemon grass", "red rice", "green onion"):
+        assert registry.lookup(raw) is None, raw
+        assert registry.name(registry.intern(raw)) == raw
+    assert registry.lookup("organic brown eggs") is None  # 'brown' is not a known modifier
+    assert registry.lookup("large eggs") == registry.lookup("eggs")
+    assert REGISTRY.lookup("lime") != REGISTRY.lookup("lemon")  # a different fruit, priced apart
+
+def test_intern_registers_unknown_names():
+    registry = IngredientRegistry()
+    a = registry.intern("Saffron")
+    assert registry.intern("saffron") == a
+    assert registry.name(a) == "saffron"
+    assert registry.ids_for(["saffron", "Saffron", "cardamom"]) == (a, registry.lookup("cardamom"))
+
+def test_grocery_list_merges_synonyms():
+    plan = {"days": [{"day": 1, "meals": [
+        {"type": "lunch", "recipe": {"name": "Chicken curry + roti", "ingredients": ["chicken", "wheat"]}},
+        {"type": "breakfast", "recipe": {"name": "Parathas", "ingredients": ["curd", "whole wheat flour"]}},
+        {"type": "dinner", "recipe": {"name": "Veg curry", "ingredients": ["mixed veg", "dahi"]}},
+    ]}]}
+    grocery = generate_grocery_list(plan)
+    assert grocery == {"chicken": 1, "whole wheat flour": 2, "curd": 2, "mixed vegetables": 1}
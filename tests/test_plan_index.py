@@ -0,0 +1,94 @@
+# tests/test_plan_index.py
+import pytest
+
+from src.agents.diet_agent import generate_and_save_plan
+from src.core.user_profile import UserProfile
+from src.tools.plan_index import PlanIndex
+
+def make_plan(days):
+    """days: list of {meal_type: (recipe name, [ingredients])}"""
+    return {
+        "days": [
+            {"day": i + 1, "meals": [
+                {"type": t, "recipe": {"name": name, "ingredients": ings}} for t, (name, ings) in meals.items()
+            ]}
+            for i, meals in enumerate(days)
+        ]
+    }
+
+@pytest.fixture
+def index():
+    idx = PlanIndex()
+    idx.add_plan("asha", make_plan([
+        {"lunch": ("Chicken curry + roti", ["chicken", "wheat"]), "snack_1": ("Peanut chikki", ["peanuts", "jaggery"])},
+        {"lunch": ("Chicken curry + roti", ["chicken", "wheat"])},
+    ]))
+    idx.add_plan("ravi", make_plan([
+        {"lunch": ("Rajma + rice", ["kidney beans", "rice"])},
+        {"dinner": ("Grilled fish + veg", ["fish", "spinach"]), "snack_2": ("Poha", ["poha", "peanuts"])},
+    ]))
+    return idx
+
+def test_boolean_queries(index):
+    assert index.search("ingredient:chicken AND day:2") == [("asha", 2, "lunch")]
+    assert index.users_matching("ingredient:peanuts") == ["asha", "ravi"]
+    assert index.count_plans("meal:snack AND NOT ingredient:jaggery") == 1
+    assert index.users_matching('recipe:"rajma + rice" OR ingredient:fish') == ["ravi"]
+    assert index.search("ingredient:fish day:1") == []
+    assert len(index.search("NOT (meal:lunch OR meal:dinner)")) == 2
+
+def test_replacing_a_plan(index):
+    index.add_plan("asha", make_plan([{"lunch": ("Dal", ["lentils"])}]))
+    assert index.users_matching("ingredient:chicken") == []
+    assert index.search("user:asha") == [("asha", 1, "lunch")]
+    index.compact()
+    assert index.users_matching("ingredient:lentils OR ingredient:peanuts") == ["asha", "ravi"]
+
+def test_replacing_a_plan_after_querying(index):
+    assert index.users_matching("ingredient:chicken") == ["asha"]
+    assert index.count_plans("ingredient:peanuts") == 2
+    index.add_plan("asha", make_plan([{"lunch": ("Dal", ["lentils"])}]))
+    assert index.users_matching("ingredient:chicken") == []
+    assert index.search("ingredient:chicken") == []
+    assert index.count_plans("ingredient:peanuts") == 1
+
+def test_save_and_load_roundtrip(index, tmp_path):
+    index.add_plan("ravi", make_plan([{"breakfast": ("Poha", ["poha", "peanuts"])}]))
+    path = index.save(str(tmp_path / "plans.idx"))
+    loaded = PlanIndex.load(path)
+    for query in ("ingredient:peanuts", "meal:lunch AND NOT user:ravi", "day:1"):
+        assert loaded.search(query) == index.search(query)
+    loaded.add_plan("meera", make_plan([{"lunch": ("Chicken curry + roti", ["chicken"])}]))
+    assert loaded.users_matching("ingredient:chicken") == ["asha", "meera"]
+
+def test_bad_query(index):
+    with pytest.raises(ValueError):
+        index.search("ingredient:chicken AND (day:1")
+    with pytest.raises(ValueError):
+        index.search("chicken")
+
+def test_diet_agent_indexes_saved_plans(tmp_path):
+    profile = UserProfile(
+        name="Test", age=30, sex="female", height_cm=160.0, weight_kg=60.0,
+        activity_level="light", goal="lose_weight", target_rate_kg_per_week=0.5,
+        dietary_preferences="vegetarian",
+    )
+    idx = PlanIndex()
+    generate_and_save_plan(profile, 1600, filepath=str(tmp_path / "meal_plan.json"), index=idx, user_id="u1")
+    assert len(idx) == 35
+    assert idx.users_matching("meal:breakfast") == ["u1"]
+
+def test_snapshot_writes_the_index_as_it_was(index, tmp_path):
+    path = str(tmp_path / "plans.idx")
+    index.save(path)
+    snapshot = index.snapshot()
+    index.add_plan("asha", make_plan([{"lunch": ("Dal", ["lentils"])}]))
+    index.add_plan("meera", make_plan([{"lunch": ("Chicken curry + roti", ["chicken"])}]))
+    snapshot.write(path)
+    index.keep_packed(snapshot)
+    assert PlanIndex.load(path).users_matching("ingredient:chicken") == ["asha"]
+    index.save(path)  # few replaced postings: saved without compacting
+    loaded = PlanIndex.load(path)
+    assert loaded.users_matching("ingredient:chicken") == ["meera"]
+    assert loaded.search("user:asha") == [("asha", 1, "lunch")] and len(loaded) == len(index) == 5
+    assert loaded._deleted == 3
@@ -0,0 +1,110 @@
+# tests/test_plan_validation.py
+import copy
+import math
+
+from src.agents.diet_agent import generate_week_plan
+from src.core.user_profile import UserProfile
+from src.tools.plan_validation import CohortNutrition, daily_targets, diet_rules, validate_cohort
+from src.tools.ingredients import REGISTRY
+
+def make_profile(preference="vegetarian", weight=65.0):
+    return UserProfile("Test", 30, "female", 160.0, weight, "light", "lose_weight", 0.5, preference)
+
+def test_day_and_week_totals_follow_served_portions():
+    profile = make_profile()
+    targets = daily_targets(profile)
+    plan = generate_week_plan(profile, targets["calorie_target"])
+    cohort = CohortNutrition()
+    cohort.add_plan("u1", plan, targets)
+
+    expected = [sum(400 * m["servings"] for m in d["meals"]) for d in plan["days"]]
+    assert list(cohort.day_totals("calories")) == expected
+    assert math.isclose(cohort.week_totals("calories")[0], sum(expected))
+    # protein is scaled with the portion: 25 g per 400 kcal serving
+    assert math.isclose(cohort.day_totals("protein_g")[0], expected[0] * 25 / 400)
+
+    report = validate_cohort(cohort)
+    assert (report["plans"], report["days"], report["meals"]) == (1, 7, 35)
+    assert report["fields"]["calories"]["days_within_tolerance"] == 1.0
+    assert report["violations"] == 0 and report["outlier_count"] == 0
+
+def test_portions_that_miss_the_target_are_caught():
+    profile = make_profile()
+    targets = daily_targets(profile)
+    plan = generate_week_plan(profile, targets["calorie_target"])
+    for day in plan["days"]:
+        for meal in day["meals"]:
+            del meal["servings"]  # one serving of everything, calories_targeted left as planned
+    cohort = CohortNutrition()
+    cohort.add_plan("u1", plan, targets)
+    assert list(cohort.day_totals("calories")) == [2000.0] * 7
+    report = validate_cohort(cohort)
+    assert report["fields"]["calories"]["days_within_tolerance"] == 0.0
+    assert report["outliers"][0]["reasons"][0].startswith("weekly calories off by")
+
+def test_diet_violations_and_outliers_are_flagged():
+    cohort = CohortNutrition()
+    for i in range(30):
+        profile = make_profile(weight=60.0 + i % 5)
+        targets = daily_targets(profile)
+        cohort.add_plan(f"u{i}", generate_week_plan(profile, targets["calorie_target"], seed=i), targets)
+
+    veg = make_profile()
+    targets = daily_targets(veg)
+    plan = generate_week_plan(veg, targets["calorie_target"])
+    plan["days"][2]["meals"][2]["recipe"] = {"name": "Grilled fish + veg", "ingredients": ["fish"], "tags": ["non-veg"]}
+    cohort.add_plan("meat", plan, targets)
+
+    doubled = copy.deepcopy(generate_week_plan(veg, targets["calorie_target"], seed=7))
+    for day in doubled["days"]:
+        for meal in day["meals"]:
+            meal["servings"] *= 2
+    cohort.add_plan("doubled", doubled, targets)
+
+    report = validate_cohort(cohort)
+    assert report["violations"] == 1 and report["plans_with_violations"] == 1
+    flagged = {o["user_id"]: o for o in report["outliers"]}
+    assert set(flagged) == {"meat", "doubled"} and report["outlier_count"] == 2
+    assert flagged["meat"]["violations"] == 1
+    assert flagged["doubled"]["days_out_of_tolerance"]["calories"] == 7
+    assert any("weekly calories" in r for r in flagged["doubled"]["reasons"])
+
+def test_excluded_ingredients_and_unknown_targets():
+    tags, ingredients = diet_rules("Vegetarian, no onion")
+    assert tags == {"non-veg"} and ingredients == {REGISTRY.lookup("onion")}
+    assert diet_rules("non-veg") == (frozenset(), frozenset())
+
+    profile = make_profile("no onion")
+    plan = generate_week_plan(profile, 1800)
+    onion_meals = sum("onion" in m["recipe"]["ingredients"] for d in plan["days"] for m in d["meals"])
+    cohort = CohortNutrition()
+    cohort.add_plan("u1", plan)  # no macro targets: only calories are checked
+    report = validate_cohort(cohort)
+    assert report["violations"] == onion_meals > 0
+    assert report["fields"]["calories"]["days_checked"] == 7
+    assert report["fields"]["protein_g"]["days_checked"] == 0
+
+def test_extend_matches_packing_in_one_go():
+    plans = [generate_week_plan(make_profile(), 1700 + 50 * i, seed=i) for i in range(6)]
+    whole, left, right = CohortNutrition(), CohortNutrition(), CohortNutrition()
+    for i, plan in enumerate(plans):
+        whole.add_plan(f"u{i}", plan)
+        (left if i < 2 else right).add_plan(f"u{i}", plan)
+    plans[0]["days"] = plans[0]["days"][:3]  # uneven plan lengths take the general path
+    whole.add_plan("short", plans[0])
+    right.add_plan("short", plans[0])
+    left.extend(right)
+    assert validate_cohort(left) == validate_cohort(whole)
+    assert list(left.week_offsets) == list(whole.week_offsets)
+
+def test_same_recipe_name_with_different_contents():
+    def plan_with(recipe):
+        return {"user": {"dietary_preferences": "vegetarian"}, "calorie_target": 2000, "days": [
+            {"day": 1, "meals": [{"type": "dinner", "recipe": recipe, "servings": 1,
+                                  "nutrition": {"calories_per_serving": 2000}}]}]}
+    cohort = CohortNutrition()
+    cohort.add_plan("veg", plan_with({"name": "Curry", "ingredients": ["paneer"], "tags": ["veg"]}))
+    cohort.add_plan("meat", plan_with({"name": "Curry", "ingredients": ["chicken"], "tags": ["non-veg"]}))
+    report = validate_cohort(cohort)
+    assert report["violations"] == 1
+    assert [o["user_id"] for o in report["outliers"]] == ["meat"]
@@ -0,0 +1,56 @@
+# tests/test_recipe_sampler.py
+import random
+from collections import Counter
+
+from src.tools.recipe_sampler import FenwickTree, VarietySampler
+
+
+def test_fenwick_find_matches_prefix_sums():
+    weights = [3, 0, 5, 1, 0, 7, 2]
+    tree = FenwickTree(weights)
+    expected = [i for i, w in enumerate(weights) for _ in range(w)]
+    assert [tree.find(u) for u in range(tree.total)] == expected
+    tree.set(2, 0)
+    tree.set(4, 4)
+    weights[2], weights[4] = 0, 4
+    expected = [i for i, w in enumerate(weights) for _ in range(w)]
+    assert tree.total == sum(weights)
+    assert [tree.find(u) for u in range(tree.total)] == expected
+
+
+def test_no_repeat_window_on_large_catalog():
+    recipes = [{"name": f"r{i}"} for i in range(5000)]
+    sampler = VarietySampler(recipes, no_repeat_days=30, cooldown_days=5)
+    rng = random.Random(1)
+    last_day = {}
+    for day in range(200):
+        for _ in range(5):
+            name = sampler.pick(rng.random(), day)["name"]
+            assert day - last_day.get(name, -30) >= 30
+            last_day[name] = day
+
+
+def test_small_pool_releases_longest_blocked():
+    recipes = [{"name": "a"}, {"name": "b"}]
+    sampler = VarietySampler(recipes, no_repeat_days=3)
+    rng = random.Random(0)
+    picks = [sampler.pick(rng.random(), day)["name"] for day in range(6)]
+    assert all(x != y for x, y in zip(picks, picks[1:]))
+
+
+def test_ratings_weight_picks():
+    recipes = [{"name": "liked"}, {"name": "plain"}, {"name": "banned"}]
+    ratings = {"liked": 5, "plain": 1, "banned": 0}
+    counts = Counter()
+    rng = random.Random(3)
+    for _ in range(500):
+        sampler = VarietySampler(recipes, ratings)
+        counts[sampler.pick(rng.random(), 0)["name"]] += 1
+    assert counts["banned"] == 0
+    assert counts["liked"] > 3 * counts["plain"]
+
+
+def test_all_zero_ratings_pick_nothing():
+    sampler = VarietySampler([{"name": "a"}, {"name": "b"}], {"a": 0, "b": 0})
+    assert sampler.pick(0.5, 0) is None
+    assert sampler.pick(0.0, 1) is None
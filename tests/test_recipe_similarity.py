@@ -0,0 +1,77 @@
+# tests/test_recipe_similarity.py
+import random
+from math import sqrt
+
+from src.agents.diet_agent import SAMPLE_RECIPES, generate_week_plan, suggest_substitutes
+from src.core.user_profile import UserProfile
+from src.tools.recipe_similarity import RecipeIndex
+
+def make_catalog(n, seed=7):
+    rng = random.Random(seed)
+    pantry = [f"ing{i}" for i in range(60)]
+    catalog = []
+    for i in range(n):
+        catalog.append({
+            "name": f"Recipe {i}",
+            "ingredients": rng.sample(pantry, rng.randint(1, 5)),
+            "nutrition": {
+                "calories_per_serving": rng.uniform(100, 700),
+                "protein_g": rng.uniform(0, 50),
+                "fat_g": rng.uniform(0, 30),
+                "carbs_g": rng.uniform(0, 90),
+            },
+            "tags": ["veg"] if i % 3 else ["non-veg"],
+        })
+    return catalog
+
+def brute_force_scores(index, query, k, allow=None):
+    w = index.nutrient_weight
+    q, _, q_len = index._query_vectors(query)
+    q_names = set(query["ingredients"])
+    scores = []
+    for rid, r in enumerate(index.recipes):
+        if r["name"] == query["name"] or (allow and not allow(r)):
+            continue
+        shared = len(q_names & set(r["ingredients"]))
+        r_len = len(set(r["ingredients"]))
+        score = w * index._nutrient_cosine(q, rid)
+        if shared:
+            score += (1 - w) * shared / sqrt(q_len * r_len)
+        scores.append(round(score, 6))
+    return sorted(scores, reverse=True)[:k]
+
+def test_nearest_matches_brute_force():
+    catalog = make_catalog(500)
+    index = RecipeIndex(catalog)
+    veg_only = lambda r: "veg" in r["tags"]
+    for query in catalog[:25]:
+        got = index.nearest(query, k=5, allow=veg_only)
+        assert [s for s, _ in got] == brute_force_scores(index, query, 5, veg_only)
+        assert all(veg_only(r) and r["name"] != query["name"] for _, r in got)
+
+def test_nearest_scores_large_groups_exactly():
+    catalog = make_catalog(2000, seed=3)
+    index = RecipeIndex(catalog, nutrient_weight=0.2)
+    for query in catalog[:5]:
+        got = index.nearest(query, k=80)
+        assert [s for s, _ in got] == brute_force_scores(index, query, 80)
+
+def test_nearest_without_shared_ingredients():
+    catalog = make_catalog(200)
+    index = RecipeIndex(catalog)
+    query = dict(catalog[0], name="New dish", ingredients=["something unseen"])
+    got = index.nearest(query, k=4)
+    assert [s for s, _ in got] == brute_force_scores(index, query, 4)
+
+def test_suggest_substitutes_respects_preference():
+    profile = UserProfile(
+        name="Test", age=30, sex="female", height_cm=160.0, weight_kg=60.0,
+        activity_level="light", goal="lose_weight", target_rate_kg_per_week=0.5,
+        dietary_preferences="vegetarian",
+    )
+    plan = generate_week_plan(profile, 1600)
+    current = plan["days"][0]["meals"][1]["recipe"]
+    subs = suggest_substitutes(plan, day=1, meal_type="lunch", k=3)
+    assert subs
+    assert all(r in SAMPLE_RECIPES["lunch"] for r in subs)
+    assert all("veg" in r["tags"] and r["name"] != current["name"] for r in subs)
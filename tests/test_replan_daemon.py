@@ -0,0 +1,72 @@
+# tests/test_replan_daemon.py
+import json
+
+from src.agents.replan_daemon import ReplanDaemon
+from src.core.profile_store import ProfileStore
+from src.core.user_profile import UserProfile
+from src.tools.plan_index import PlanIndex
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _profile(weight):
+    return UserProfile("Asha", 29, "female", 160.0, weight, "light", "lose_weight", 0.5, "vegetarian")
+
+
+def test_edits_are_debounced_and_batched(tmp_path):
+    db, out = str(tmp_path / "p.db"), str(tmp_path / "plans")
+    clock = FakeClock()
+    with ProfileStore(db) as store:
+        store.save("u0", _profile(60))
+        daemon = ReplanDaemon(db, out, debounce_s=2.0, batch_size=2, workers=0, clock=clock)
+
+        # a burst of edits to u1, plus two other users
+        for weight in (61, 62, 63):
+            store.save("u1", _profile(weight))
+        store.save("u2", _profile(70))
+        store.save("u3", _profile(80))
+        daemon.step()
+        assert daemon.metrics()["queue_depth"] == 3
+        assert daemon.replanned == 0
+
+        clock.now += 1.5
+        store.save("u3", _profile(81))  # restarts u3's window
+        daemon.step()
+        clock.now += 1.0
+        daemon.step()
+        m = daemon.metrics()
+        assert (m["replanned"], m["batches"], m["queue_depth"]) == (2, 1, 1)
+        assert m["lag_s"] == 2.5
+
+        daemon.save_index(background=True)  # written from a snapshot while the daemon carries on
+        clock.now += 2.0
+        daemon.step()
+        daemon.close()
+
+    m = daemon.metrics()
+    assert (m["replanned"], m["batches"], m["queue_depth"], m["errors"]) == (3, 2, 0, 0)
+    assert m["changes_seen"] == 4 and m["lag_s"] == 0.0
+    assert not (tmp_path / "plans" / "u0").exists()  # unchanged since start-up
+    for user_id in ("u1", "u2", "u3"):
+        for name in ("meal_plan.json", "workout_plan.json", "grocery_list.json"):
+            assert (tmp_path / "plans" / user_id / name).exists()
+    plan = json.loads((tmp_path / "plans" / "u1" / "meal_plan.json").read_text())
+    assert plan["user"]["name"] == "Asha" and len(plan["days"]) == 7
+    index = PlanIndex.load(str(tmp_path / "plans" / "plan_index.bin"))
+    assert sorted(index.users_matching("meal:lunch")) == ["u1", "u2", "u3"]
+    assert len(index) == 3 * 35
+
+
+def test_from_revision_zero_replans_everyone(tmp_path):
+    db, out = str(tmp_path / "p.db"), str(tmp_path / "plans")
+    with ProfileStore(db) as store:
+        store.upsert_rows([(f"u{i}", *vars(_profile(60 + i)).values()) for i in range(5)])
+    daemon = ReplanDaemon(db, out, debounce_s=0, batch_size=2, workers=0, from_revision=0)
+    daemon.run(max_iterations=1, report_every_s=0)
+    assert daemon.replanned == 5 and daemon.batches_done == 3
@@ -0,0 +1,49 @@
+# tests/test_report_agent.py
+from src.agents.coordinator import summarize_profile
+from src.agents.diet_agent import generate_week_plan
+from src.agents.grocery_agent import generate_grocery_list, optimize_basket
+from src.agents.report_agent import build_report_context, render_member_reports, render_report
+from src.agents.workout_agent import generate_weekly_workout
+from src.core.user_profile import UserProfile
+
+def make_profile(name="Asha"):
+    return UserProfile(name, 30, "female", 160.0, 65.0, "light", "lose_weight", 0.5, "vegetarian")
+
+def test_report_contains_every_section():
+    profile = make_profile("Asha <script>")
+    summary = summarize_profile(profile)
+    plan = generate_week_plan(profile, summary["calorie_target"])
+    grocery = generate_grocery_list(plan)
+    context = build_report_context(summary, plan, generate_weekly_workout("lose_weight", 4, "gym"),
+                                   grocery, optimize_basket(grocery))
+
+    md = render_report(context, "md")
+    assert md.count("### Day ") == 7 and md.count("### Session ") == 4
+    assert plan["days"][0]["meals"][0]["recipe"]["name"] in md
+    assert "Whole wheat flour (atta)" in md and "Estimated basket: GBP" in md
+    assert "\n\n|" not in md.split("## Grocery list")[1].split("###")[0].strip()  # table rows stay together
+
+    page = render_report(context, "html")
+    assert "Asha &lt;script&gt;" in page and "<script>" not in page
+    assert page.count("<h3>Day ") == 7
+
+    context["preferences"] = "vegetarian | no onion"
+    assert "| Dietary preferences | vegetarian \\| no onion |" in render_report(context, "md")
+
+def test_bulk_reports_are_written_per_member(tmp_path):
+    members = [(f"m/{i}", make_profile(f"Member {i}")) for i in range(5)]
+    stats = render_member_reports(members, str(tmp_path), formats=("md", "html"), workers=0)
+    assert (stats["members"], stats["files"], stats["failed"]) == (5, 10, 0)
+    for i in range(5):
+        text = (tmp_path / f"m_{i}" / "report_week1.md").read_text(encoding="utf-8")
+        assert text.startswith(f"# DesiFit weekly plan: Member {i}")
+        assert (tmp_path / f"m_{i}" / "report_week1.html").exists()
+
+def test_pooled_reports_match_inline(tmp_path):
+    members = [(f"m{i}", make_profile(f"Member {i}")) for i in range(3)]
+    render_member_reports(members, str(tmp_path / "inline"), formats=("md",), workers=0)
+    stats = render_member_reports(members, str(tmp_path / "pool"), formats=("md",), workers=2, chunksize=1)
+    assert (stats["members"], stats["failed"]) == (3, 0)
+    for user_id, _ in members:
+        inline = (tmp_path / "inline" / user_id / "report_week1.md").read_text(encoding="utf-8")
+        assert (tmp_path / "pool" / user_id / "report_week1.md").read_text(encoding="utf-8") == inline
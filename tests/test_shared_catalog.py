@@ -0,0 +1,60 @@
+# tests/test_shared_catalog.py
+import multiprocessing
+
+import pytest
+
+from src.agents import diet_agent
+from src.agents.diet_agent import SAMPLE_RECIPES, recipe_index_for
+from src.agents.workout_agent import exercise_catalogs, generate_workout_day
+from src.tools.recipe_similarity import RecipeIndex
+from src.tools import shared_catalog
+from src.tools.shared_catalog import SharedCatalog, attached_catalog, init_worker
+
+@pytest.fixture
+def catalog():
+    cat = SharedCatalog.create(SAMPLE_RECIPES, exercise_catalogs())
+    yield cat
+    cat.close()
+    cat.unlink()
+
+def test_attached_catalog_matches_source(catalog):
+    view = SharedCatalog.attach(catalog.name)
+    try:
+        for meal_type, recipes in SAMPLE_RECIPES.items():
+            assert list(view.recipes(meal_type)) == recipes
+            local = RecipeIndex(recipes)
+            for r in recipes:
+                assert view.index(meal_type).nearest(r, k=3) == local.nearest(r, k=3)
+        assert view.exercises("home") == exercise_catalogs()["home"]
+        with pytest.raises(TypeError):
+            view.index("lunch").nutrients[0] = 1.0
+    finally:
+        view.close()
+
+def _worker_lookup(meal_type):
+    catalog = attached_catalog()
+    query = SAMPLE_RECIPES[meal_type][0]
+    names = [r["name"] for _, r in recipe_index_for(meal_type).nearest(query, k=2)]
+    day = generate_workout_day("maintain", "gym", 0)
+    return catalog is not None, names, day["exercises"][0]["name"]
+
+def test_pool_workers_attach(catalog):
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(2, initializer=init_worker, initargs=(catalog.name,)) as pool:
+        results = pool.map(_worker_lookup, ["lunch", "dinner"])
+    for (attached, names, exercise), meal_type in zip(results, ["lunch", "dinner"]):
+        assert attached
+        local = RecipeIndex(SAMPLE_RECIPES[meal_type]).nearest(SAMPLE_RECIPES[meal_type][0], k=2)
+        assert names == [r["name"] for _, r in local]
+        assert exercise == exercise_catalogs()["gym"]["full_body"][0]
+
+def test_recipe_pool_reads_the_attached_catalog(catalog, monkeypatch):
+    expected = diet_agent._recipe_pool("lunch", "vegetarian")
+    monkeypatch.setattr(shared_catalog, "_ATTACHED", None)
+    init_worker(catalog.name)
+    try:
+        monkeypatch.setitem(SAMPLE_RECIPES, "lunch", [])  # only the shared block has lunches now
+        assert diet_agent._recipe_pool("lunch", "vegetarian") == expected
+        assert len(diet_agent._recipe_pool("lunch", None)) == len(attached_catalog().recipes("lunch"))
+    finally:
+        attached_catalog().close()